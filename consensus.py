@@ -652,6 +652,29 @@ class RaftConsensus:
     def log_transaction(self, tx_hash: str) -> None:
         self.record_event(tx_hash, "Хеш транзакции получен", self.node_id, "TX")
 
+    def get_events_for_block(self, block_hash: str, limit: int = 200) -> List[ConsensusEvent]:
+        rows = self.db.execute(
+            """
+            SELECT block_hash, event, actor, state, created_at
+            FROM consensus_events
+            WHERE block_hash = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (block_hash, limit),
+            fetchall=True,
+        )
+        return [
+            ConsensusEvent(
+                block_hash=row["block_hash"],
+                event=row["event"],
+                actor=row["actor"],
+                state=row["state"],
+                created_at=row["created_at"],
+            )
+            for row in rows
+        ]
+
     def get_recent_events(self, limit: int = 50) -> List[ConsensusEvent]:
         rows = self.db.execute(
             """
@@ -674,6 +697,13 @@ class RaftConsensus:
             for row in rows
         ]
 
+    def version(self) -> int:
+        row = self.db.execute(
+            "SELECT COALESCE(MAX(id), 0) as version FROM consensus_events",
+            fetchone=True,
+        )
+        return row["version"] if row else 0
+
     def stats(self) -> dict:
         count_row = self.db.execute(
             "SELECT COUNT(DISTINCT block_hash) as cnt FROM consensus_events",
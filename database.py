@@ -1,5 +1,7 @@
+import itertools
 import json
 import os
+import re
 import shutil
 import sqlite3
 import sys
@@ -8,18 +10,46 @@ from pathlib import Path
 from threading import RLock
 from typing import Any, Iterable
 
+_READ_PREFIXES = ("SELECT", "WITH", "PRAGMA", "EXPLAIN")
+_WRITE_TABLE_RE = re.compile(
+    r"\s*(?:INSERT|REPLACE|UPDATE|DELETE)(?:\s+OR\s+\w+)?(?:\s+INTO|\s+FROM)?\s+(?:\w+\.)?[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+_WRITE_COUNTER = itertools.count(1)
+
 
 class DatabaseManager:
-    def __init__(self, db_name: str = "digital_ruble.db") -> None:
+    _table_versions: dict[str, int] = {}
+
+    def __init__(self, db_name: str = "digital_ruble.db", read_only: bool = False) -> None:
         self.db_path = self._resolve_db_path(db_name)
         self._lock = RLock()
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._read_only = read_only
+        self._in_transaction = False
+        self._pending_writes = set()
+        if read_only:
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path.as_posix()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=256,
+            )
+        else:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
         self._conn.row_factory = sqlite3.Row
-        with self._lock:
-            self._conn.execute("PRAGMA foreign_keys = ON;")
         
         self._is_cbr_db = self._is_central_bank_database()
+        with self._lock:
+            self._conn.execute("PRAGMA foreign_keys = ON;")
+            if not read_only:
+                self._conn.execute("PRAGMA journal_mode = WAL;")
+                self._conn.execute("PRAGMA synchronous = NORMAL;")
+            self._conn.execute(f"PRAGMA cache_size = {-65536 if self._is_cbr_db else -20000};")
+            self._conn.execute("PRAGMA temp_store = MEMORY;")
+            self._conn.execute("PRAGMA busy_timeout = 5000;")
         
+        if read_only:
+            return
         self._bootstrap_schema()
         self._backfill_legacy_schema()
         self._create_indexes()
@@ -62,12 +92,50 @@ class DatabaseManager:
             cur = self._conn.cursor()
             try:
                 yield cur
+                if not self._in_transaction:
+                    self._conn.commit()
+            except Exception:
+                if not self._in_transaction:
+                    self._conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    @contextmanager
+    def transaction(self, mode: str = "DEFERRED"):
+        with self._lock:
+            if self._in_transaction:
+                yield self
+                return
+            self._conn.execute(f"BEGIN {mode}")
+            self._in_transaction = True
+            try:
+                yield self
                 self._conn.commit()
             except Exception:
                 self._conn.rollback()
+                self._pending_writes.clear()
                 raise
             finally:
-                cur.close()
+                self._in_transaction = False
+            pending, self._pending_writes = self._pending_writes, set()
+            for table in pending:
+                DatabaseManager._table_versions[table] = next(_WRITE_COUNTER)
+
+    @classmethod
+    def table_versions(cls, tables: Iterable[str]) -> tuple:
+        versions = cls._table_versions
+        return (versions.get("*", 0), *(versions.get(table, 0) for table in tables))
+
+    def _record_write(self, query: str) -> None:
+        if query.lstrip()[:7].upper().startswith(_READ_PREFIXES):
+            return
+        match = _WRITE_TABLE_RE.match(query)
+        table = match.group(1).lower() if match else "*"
+        if self._in_transaction:
+            self._pending_writes.add(table)
+        else:
+            DatabaseManager._table_versions[table] = next(_WRITE_COUNTER)
 
     def execute(
         self,
@@ -80,14 +148,36 @@ class DatabaseManager:
         with self._cursor() as cur:
             cur.execute(query, params)
             if fetchone:
-                return cur.fetchone()
-            if fetchall:
-                return cur.fetchall()
-            return cur
+                result = cur.fetchone()
+            elif fetchall:
+                result = cur.fetchall()
+            else:
+                result = cur
+        self._record_write(query)
+        return result
 
     def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]) -> None:
         with self._cursor() as cur:
             cur.executemany(query, seq_of_params)
+        self._record_write(query)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def attach(self, path: Path | str, schema: str) -> None:
+        with self._lock:
+            self._conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+
+    def detach(self, schema: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DETACH DATABASE {schema}")
+
+    def attach_limit(self) -> int:
+        try:
+            return self._conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        except AttributeError:
+            return 10
 
     def table_to_json(self, table: str) -> str:
         rows = self.execute(f"SELECT * FROM {table}", fetchall=True)
@@ -464,11 +554,13 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_transactions_bank ON transactions(bank_id)",
             "CREATE INDEX IF NOT EXISTS idx_blocks_previous_hash ON blocks(previous_hash)",
             "CREATE INDEX IF NOT EXISTS idx_blocks_height ON blocks(height)",
-            "CREATE INDEX IF NOT EXISTS idx_block_transactions_block_id ON block_transactions(block_id)",
+            "DROP INDEX IF EXISTS idx_block_transactions_block_id",
+            "CREATE INDEX IF NOT EXISTS idx_block_transactions_block_tx ON block_transactions(block_id, tx_id)",
             "CREATE INDEX IF NOT EXISTS idx_block_transactions_tx_id ON block_transactions(tx_id)",
             "CREATE INDEX IF NOT EXISTS idx_utxos_owner_status ON utxos(owner_id, status)",
             "CREATE INDEX IF NOT EXISTS idx_utxos_created_tx ON utxos(created_tx_id)",
             "CREATE INDEX IF NOT EXISTS idx_utxos_spent_tx ON utxos(spent_tx_id)",
+            "CREATE INDEX IF NOT EXISTS idx_utxos_created_at ON utxos(created_at)",
             "CREATE INDEX IF NOT EXISTS idx_smart_contracts_status ON smart_contracts(status)",
             "CREATE INDEX IF NOT EXISTS idx_smart_contracts_next_execution ON smart_contracts(next_execution)",
             "CREATE INDEX IF NOT EXISTS idx_activity_log_created_at ON activity_log(created_at)",
@@ -484,6 +576,8 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_smart_contracts_beneficiary ON smart_contracts(beneficiary_id)",
             "CREATE INDEX IF NOT EXISTS idx_failed_transactions_created_at ON failed_transactions(created_at)",
             "CREATE INDEX IF NOT EXISTS idx_failed_transactions_resolved ON failed_transactions(resolved)",
+            "CREATE INDEX IF NOT EXISTS idx_system_errors_created_at ON system_errors(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_issuance_requests_requested_at ON issuance_requests(requested_at)",
         ]
         with self._cursor() as cur:
             for index_sql in indexes:
@@ -1,13 +1,934 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
 import json
+import operator
+import re
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from tkinter import filedialog, messagebox, ttk
 import tkinter.font as tkfont
+from weakref import WeakKeyDictionary
 
 from consensus import MasterchainConsensus
+from database import DatabaseManager
 from platform import DigitalRublePlatform, _hash_str
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_USER_TYPE_LABELS = {
+    "INDIVIDUAL": "Физическое лицо",
+    "BUSINESS": "Юридическое лицо",
+    "GOVERNMENT": "Государственное учреждение",
+}
+
+CHANNEL_RULES = {
+    "C2C": (("INDIVIDUAL",), ("INDIVIDUAL",)),
+    "C2B": (("INDIVIDUAL",), ("BUSINESS",)),
+    "B2C": (("BUSINESS",), ("INDIVIDUAL",)),
+    "B2B": (("BUSINESS",), ("BUSINESS",)),
+    "G2B": (("GOVERNMENT",), ("BUSINESS",)),
+    "B2G": (("BUSINESS",), ("GOVERNMENT",)),
+    "C2G": (("INDIVIDUAL",), ("GOVERNMENT",)),
+    "G2C": (("GOVERNMENT",), ("INDIVIDUAL",)),
+}
+
+_TX_TYPE_LABELS = {
+    "ONLINE": "Онлайн",
+    "OFFLINE": "Оффлайн",
+    "EXCHANGE": "Обмен",
+    "CONTRACT": "Смарт-контракт",
+}
+
+_CHANNEL_LABELS = {
+    "C2C": "ФЛ → ФЛ",
+    "C2B": "ФЛ → ЮЛ",
+    "B2C": "ЮЛ → ФЛ",
+    "B2B": "ЮЛ → ЮЛ",
+    "G2B": "Гос → ЮЛ",
+    "B2G": "ЮЛ → Гос",
+    "C2G": "ФЛ → Гос",
+    "G2C": "Гос → ФЛ",
+    "FIAT2DR": "Пополнение цифрового кошелька",
+    "OFFLINE_FUND": "Пополнение оффлайн кошелька",
+}
+
+_WALLET_STATUS_LABELS = {
+    "OPEN": "Открыт",
+    "CLOSED": "Закрыт",
+}
+
+_STATUS_LABELS = {
+    "UNSPENT": "Незатрачен",
+    "SPENT": "Затрачен",
+    "CONFIRMED": "Подтверждена",
+    "OFFLINE_BUFFER": "Оффлайн буфер",
+    "SCHEDULED": "Запланирован",
+    "EXECUTED": "Исполнен",
+    "PENDING": "Ожидает",
+    "APPROVED": "Одобрено",
+    "REJECTED": "Отклонено",
+    "ОФФЛАЙН": "Оффлайн",
+    "ПОСТУПИЛО В ОБРАБОТКУ": "В обработке",
+    "ОБРАБОТАНА": "Обработана",
+    "КОНФЛИКТ": "Конфликт",
+}
+
+_CONTRACT_STATUS_LABELS = {
+    "EXECUTED": "Исполнен",
+    "SCHEDULED": "Запланирован",
+    "FAILED": "Ошибка",
+}
+
+_CONTEXT_DISPLAY_NAMES = {
+    "Транзакция": "📝 ТРАНЗАКЦИЯ",
+    "Оффлайн-транзакция": "📱 ОФФЛАЙН-ТРАНЗАКЦИЯ",
+    "Смарт-контракт": "📄 СМАРТ-КОНТРАКТ",
+    "Эмиссия": "💰 ЭМИССИЯ",
+    "Блок": "🔗 БЛОК",
+    "Консенсус": "🤝 КОНСЕНСУС",
+    "Репликация": "🔄 РЕПЛИКАЦИЯ",
+    "Распределенный реестр": "📚 РАСПРЕДЕЛЕННЫЙ РЕЕСТР",
+    "Общее": "⚙️ ОБЩЕЕ",
+}
+
+_CONSENSUS_STATE_LABELS = {
+    "LEADER": "Лидер (ЦБ РФ)",
+    "FOLLOWER": "Последователь",
+    "SIGN_REQUEST": "Запрос подписи",
+    "VOTE_REQUEST": "Запрос подтверждения корректности блока",
+    "VOTE_GRANTED": "Голос получен",
+    "APPEND_ENTRIES": "Добавление записей",
+    "ENTRY_APPLIED": "Запись применена",
+    "REPLICATION": "Репликация",
+    "COMMITTED": "Зафиксировано",
+    "LEADER_APPEND": "Лидер добавил запись",
+    "TX": "Транзакция",
+    "LAG": "Задержка",
+    "FAULT": "Ошибка",
+    "CBR_RECOVERED": "Отказ ЦБ",
+    "NORMAL_OPERATION_RESUMED": "ЦБ вернулся в штатный режим работы",
+    "REPLICATION_START": "старт репликации",
+    "BLOCKS_RECEPTION_START": "Спинятие данных от временного лидера",
+    "QUORUM_REACHED": "Кворум достигнут",
+}
+
+_ELECTION_STATES = frozenset({"CANDIDATE", "ELECTION_START", "LEADER_ELECTED", "ELECTION_FAILED"})
+
+_REFRESH_SECTIONS = (
+    "lists",
+    "users",
+    "tx",
+    "offline",
+    "contracts",
+    "blocks",
+    "utxo",
+    "bank",
+    "issuance",
+    "consensus",
+    "activity",
+    "canvas",
+    "cbr_log",
+)
+
+_REFRESH_INTERVAL_MS = 100
+
+_SECTION_TABLES = {
+    "lists": ("users", "banks"),
+    "users": ("users", "banks"),
+    "tx": ("transactions", "users", "banks"),
+    "offline": ("offline_transactions", "transactions", "users", "banks"),
+    "contracts": ("smart_contracts", "users", "banks"),
+    "blocks": ("blocks",),
+    "utxo": ("utxos", "wallets", "users", "banks"),
+    "issuance": ("issuance_requests", "banks"),
+    "consensus": ("consensus_events", "network_nodes", "banks"),
+    "activity": ("activity_log",),
+    "cbr_log": ("activity_log", "failed_transactions", "system_errors"),
+}
+
+_TREE_BULK_INSERT_PROC = "::dr_tree_bulk_insert"
+_TREE_BULK_INSERT_SCRIPT = """
+proc ::dr_tree_bulk_insert {tree rows} {
+    foreach {iid values} $rows {
+        $tree insert {} end -id $iid -values $values
+    }
+}
+"""
+_CLIPBOARD_SET_PROC = "::dr_clipboard_set"
+_CLIPBOARD_SET_SCRIPT = """
+proc ::dr_clipboard_set {window text} {
+    clipboard clear -displayof $window
+    clipboard append -displayof $window -- $text
+}
+"""
+_LOG_PAGE_SIZE = 200
+_LOG_EXPORT_HEADER = ("Время", "Контекст", "Этап", "Актор", "Детали")
+_LOG_EXPORT_ROW = operator.itemgetter("created_at", "context", "stage", "actor", "details")
+_LOG_EXPORT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_LOG_EXPORT_BATCH = 512
+
+_LOG_FILTER_CONTEXTS = {
+    "Транзакции": ("Транзакция",),
+    "Смарт-контракты": ("Смарт-контракт", "Смарт-контракты"),
+    "Эмиссия": ("Эмиссия",),
+    "Блоки": ("Блок",),
+    "Консенсус": ("Консенсус",),
+}
+
+_FILTER_CATEGORIES = ("Все", *_LOG_FILTER_CONTEXTS)
+
+_ACTIVITY_TAG_FONTS = {
+    "header": (1.25, "bold"),
+    "subheader": (1.1, "bold"),
+    "conflict": (1.1, "bold"),
+    "stage": (1.0, "normal"),
+    "details": (0.9, "normal"),
+    "separator": (0.9, "normal"),
+    "time": (0.9, "normal"),
+    "context": (1.0, "bold"),
+    "actor": (1.0, "normal"),
+}
+
+_ACTIVITY_TAG_COLORS = {
+    "header": "#1e40af",
+    "subheader": "#059669",
+    "conflict": "red",
+    "stage": "#4b5563",
+    "details": "#6b7280",
+    "separator": "#9ca3af",
+    "time": "#9ca3af",
+    "context": "#7c3aed",
+    "actor": "#059669",
+}
+
+_CBR_LOG_TAG_FONTS = {
+    "header": (1.1, "bold"),
+    "stage": (1.1, "bold"),
+    "details": (0.9, "normal"),
+    "time": (0.9, "normal"),
+    "actor": (0.9, "normal"),
+    "context": (1.0, "bold"),
+    "separator": (0.9, "normal"),
+}
+
+_CBR_LOG_TAG_COLORS = {
+    "header": "#1e40af",
+    "stage": "#059669",
+    "details": "#4b5563",
+    "time": "#9ca3af",
+    "actor": "#7c3aed",
+    "context": "#dc2626",
+    "separator": "#9ca3af",
+}
+
+
+_TX_NARRATIVE_TEMPLATE = """\
+Жизненный цикл транзакции {id}
+============================================================
+
+ЭТАП 1: ИНИЦИАЦИЯ ТРАНЗАКЦИИ
+  • Отправитель: {sender_name} (ID {sender_id})
+  • Получатель: {receiver_name} (ID {receiver_id})
+  • Сумма: {amount:.2f} ЦР
+  • Банк (ФО): {bank_name} (ID {bank_id})
+  • Тип транзакции: {tx_type}
+  • Временная метка: {timestamp}
+
+ЭТАП 2: ФОРМИРОВАНИЕ КАНОНИЧЕСКОЙ СТРОКИ
+  Формируется строка core, содержащая основные данные транзакции:
+    core = {core}
+
+ЭТАП 3: ВЫЧИСЛЕНИЕ ХЕША ТРАНЗАКЦИИ
+  Хеш вычисляется по алгоритму Streebog-256 (ГОСТ Р 34.11-2018):
+    H = Streebog-256(core)
+    tx.hash = {hash}
+  Хеш транзакции используется для:
+    • идентификации транзакции в распределенном реестре
+    • вычисления Merkle-корня блока
+    • связи блоков через previous_hash
+
+ЭТАП 4: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) ПОЛЬЗОВАТЕЛЯ
+  Алгоритм подписания по ГОСТ 34.10-2018:
+    1. Вычисляется хеш для подписи: H_sig = Streebog-256(core)
+       Хеш для подписи: {hash_for_sig}
+    2. Выбирается эллиптическая кривая с параметрами:
+       • Модуль p (простое число)
+       • Порядок группы q
+       • Коэффициенты a, b уравнения кривой
+       • Генерирующая точка P
+    3. Генерируется случайное число k ∈ [1, q-1]
+    4. Вычисляется точка эллиптической кривой: C = k * P
+    5. Вычисляется r = Cx mod q
+       Если r = 0, выбирается новое k и повторяется шаг 4
+    6. Вычисляется s = (r * d + k * H_sig) mod q
+       где d - приватный ключ пользователя
+       Если s = 0, выбирается новое k и повторяется шаг 4
+    7. ЭЦП = (r, s) - пара 256-битных чисел
+{user_sig_section}
+
+ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ БАНКА (ФО)
+{bank_sig_section}
+
+ЭТАП 6: ВАЛИДАЦИЯ ПОДПИСЕЙ
+  Система проверяет валидность подписей:
+    • Проверка ЭЦП пользователя: верификация подписи по публичному ключу отправителя
+    • Проверка электронной цифровой подписи банка (ФО): верификация подписи по публичному ключу банка
+    • При невалидной подписи транзакция отклоняется
+
+ЭТАП 7: ОБРАБОТКА ТРАНЗАКЦИИ
+{processing_section}
+
+ЭТАП 8: ВКЛЮЧЕНИЕ В БЛОК РАСПРЕДЕЛЁННОГО РЕЕСТРА
+{block_section}
+
+ЭТАП 9: РЕПЛИКАЦИЯ НА УЗЛЫ
+{replication_section}
+
+ЭТАП 10: ФИНАЛИЗАЦИЯ
+  Транзакция считается завершённой после:
+    • Включения в блок распределённого реестра
+    • Репликации на все узлы сети
+    • Подтверждения консенсусом (RAFT)"""
+
+_TX_BANK_SIG_SECTION = """\
+  Банк формирует ЭЦП по тому же хешу транзакции:
+    Хеш для подписи: {hash_for_sig}
+  Процесс идентичен процессу для пользователя:
+    1. Вычисляется хеш сообщения: H_sig = Streebog-256(core)
+    2. Генерируется случайное число k ∈ [1, q-1]
+    3. Вычисляется точка эллиптической кривой: C = k * P
+    4. Вычисляется r = Cx mod q (если r=0, повторяется с новым k)
+    5. Вычисляется s = (r * d_bank + k * H_sig) mod q (если s=0, повторяется)
+    6. ЭЦП банка = (r, s)
+  Электронная цифровая подпись банка (ФО) сохранена
+    Формат: JSON строка с полями 'r' и 's' (256-битные числа)"""
+
+_TX_OFFLINE_PROCESSING_SECTION = """\
+  Для оффлайн-транзакций:
+    • Проверка UTXO отправителя
+    • Выбор UTXO для покрытия суммы
+    • Создание выходных UTXO для получателя и сдачи"""
+
+_TX_ONLINE_PROCESSING_SECTION = """\
+  Для онлайн-транзакций:
+    • Проверка баланса отправителя
+    • Списание средств с баланса отправителя
+    • Зачисление средств на баланс получателя"""
+
+_OFFLINE_TX_NARRATIVE_TEMPLATE = """\
+Жизненный цикл оффлайн-транзакции {id}
+============================================================
+
+ЭТАП 1: ПОДГОТОВКА ОФФЛАЙН‑КОШЕЛЬКА И UTXO
+  Отправитель: {sender_name} (ID {sender_id})
+  Статус оффлайн‑кошелька: {wallet_status}
+  Активация: {activated_at}
+  Окончание: {expires_at}
+
+ЭТАП 2: ФОРМИРОВАНИЕ ОФФЛАЙН‑ТРАНЗАКЦИИ
+  Отправитель: {sender_name} (ID {sender_id})
+  Получатель: {receiver_name} (ID {receiver_id})
+  Банк (ФО): {bank_name}
+  Сумма: {amount:.2f} ЦР
+  Процесс формирования:
+    • Выбор параметров: отправитель, получатель, банк, сумма
+    • Выбор UTXO для покрытия суммы (один UTXO в диапазоне [amount, 2*amount])
+    • Расчёт сдачи (change = UTXO_amount - amount)
+    • Формирование offline_tx_core с входами, выходами и метаданными
+
+ЭТАП 3: ВЫБОР UTXO (ВХОДЫ)
+{inputs_section}
+
+ЭТАП 4: СОЗДАНИЕ ВЫХОДНЫХ UTXO
+{outputs_section}
+
+ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) ОФФЛАЙН‑ТРАНЗАКЦИИ
+  Процесс подписания по ГОСТ 34.10-2018:
+    1. Формирование канонической строки (core):
+       core = {core}
+    2. Вычисление хеша сообщения:
+       H_sig = Streebog-256(core) = {hash_for_sig}
+    3. Генерация ЭЦП пользователя:
+       • Выбирается эллиптическая кривая с параметрами (p, q, a, b, P)
+       • Генерируется случайное число k ∈ [1, q-1]
+       • Вычисляется точка C = k * P
+       • Вычисляется r = Cx mod q (если r=0, повторяется с новым k)
+       • Вычисляется s = (r * d_user + k * H_sig) mod q (если s=0, повторяется)
+       • ЭЦП пользователя = (r, s)
+{signatures_section}
+  Важно: хеш транзакции НЕ изменяется при подписании ЭЦП
+
+ЭТАП 6: ЛОКАЛЬНОЕ ХРАНЕНИЕ
+  Оффлайн-транзакция сохраняется локально на устройстве пользователя
+  Статус: CREATED (ожидает синхронизации)
+
+ЭТАП 7: СИНХРОНИЗАЦИЯ С ЦБ
+  Процесс синхронизации:
+    1. Отправка батча оффлайн-транзакций на ЦБ
+    2. Расшифровка и проверка на стороне ЦБ:
+       • Расшифровка offline_tx_core и sig_user_offline
+       • Проверка ЭЦП пользователя
+       • Проверка, что UTXO не были потрачены ранее (защита от двойной траты)
+    3. Подтверждение или отклонение:
+       • При успехе: создаётся транзакция в общем реестре (тип OFFLINE_SYNC)
+       • При конфликте: транзакция отклоняется с указанием причины
+  Статус: {offline_status}
+  Время синхронизации: {synced_at}{conflict_section}
+
+ЭТАП 8: ВКЛЮЧЕНИЕ В БЛОК РАСПРЕДЕЛЁННОГО РЕЕСТРА
+{block_section}
+
+ЭТАП 9: РЕПЛИКАЦИЯ НА УЗЛЫ
+{replication_section}
+
+ЭТАП 10: ФИНАЛИЗАЦИЯ
+  Оффлайн-транзакция считается завершённой после:
+    • Синхронизации с ЦБ
+    • Включения в блок распределённого реестра
+    • Репликации на все узлы сети
+    • Подтверждения консенсусом (RAFT)"""
+
+
+def _render_block_section(block_row, pending_note: str) -> str:
+    if block_row:
+        return (
+            f"  Транзакция включена в блок #{block_row['height']}\n"
+            f"    Хеш блока: {block_row['hash']}\n"
+            "    Связь транзакции с блоком устанавливается через block_transactions"
+        )
+    return f"  Транзакция включена в блок (обработка выполняется автоматически)\n    {pending_note}"
+
+
+def _render_replication_section(banks) -> str:
+    total_nodes = 1 + len(banks)
+    return "\n".join([
+        "  Распределение блока по узлам сети:",
+        "    • Центральный банк РФ (главный реестр): блок присутствует ✓",
+        *(f"    • {bank['name']} (ФО): блок присутствует ✓" for bank in banks),
+        f"  Всего узлов с блоком: {total_nodes}/{total_nodes}",
+    ])
+
+
+def _tx_core(tx) -> str:
+    return f"{tx['id']}:{tx['sender_id']}:{tx['receiver_id']}:{tx['amount']}:{tx['timestamp']}"
+
+
+def _render_tx_narrative(tx, sender_name, receiver_name, bank_name, hash_for_sig, block_row, banks) -> str:
+    if tx.get("user_sig"):
+        user_sig_section = (
+            "  Результат: ЭЦП пользователя сохранена\n"
+            "    Формат: JSON строка с полями 'r' и 's'\n"
+            f"    Значение: {tx['user_sig'][:100]}..."
+        )
+    else:
+        user_sig_section = "  ЭЦП пользователя отсутствует (демонстрационный режим)."
+    if tx.get("bank_sig"):
+        bank_sig_section = _TX_BANK_SIG_SECTION.format(hash_for_sig=hash_for_sig)
+    else:
+        bank_sig_section = "  Электронная цифровая подпись банка (ФО) отсутствует (демонстрационный режим)."
+    return _TX_NARRATIVE_TEMPLATE.format_map({
+        "id": tx["id"],
+        "sender_name": sender_name,
+        "sender_id": tx["sender_id"],
+        "receiver_name": receiver_name,
+        "receiver_id": tx["receiver_id"],
+        "amount": tx["amount"],
+        "bank_name": bank_name,
+        "bank_id": tx["bank_id"],
+        "tx_type": tx.get("tx_type", "ONLINE"),
+        "timestamp": tx["timestamp"],
+        "core": _tx_core(tx),
+        "hash": tx["hash"],
+        "hash_for_sig": hash_for_sig,
+        "user_sig_section": user_sig_section,
+        "bank_sig_section": bank_sig_section,
+        "processing_section": (
+            _TX_OFFLINE_PROCESSING_SECTION if tx.get("tx_type") == "OFFLINE" else _TX_ONLINE_PROCESSING_SECTION
+        ),
+        "block_section": _render_block_section(
+            block_row, "Все транзакции со статусом CONFIRMED автоматически включаются в блок"
+        ),
+        "replication_section": _render_replication_section(banks),
+    })
+
+
+def _render_offline_tx_narrative(tx, sender, receiver, bank, wallet_status, hash_for_sig, block_row, utxos_in, utxos_out, banks) -> str:
+    total_in = sum(u["amount"] for u in utxos_in)
+    if utxos_in:
+        inputs = [f"  UTXO {u['id']} на сумму {u['amount']:.2f} ЦР" for u in utxos_in]
+    else:
+        inputs = ["  Для этой транзакции не найдено списанных UTXO"]
+    inputs.append(f"  Итого по входам: {total_in:.2f} ЦР")
+    if utxos_out:
+        outputs = [
+            f"  UTXO {u['id']} на сумму {u['amount']:.2f} ЦР (owner_id={u['owner_id']})" for u in utxos_out
+        ]
+        outputs.append("  Создаётся один выходной UTXO для получателя на сумму транзакции")
+        outputs.append("  Если есть сдача, создаётся дополнительный UTXO для отправителя")
+    else:
+        outputs = ["  Новые UTXO по этой транзакции ещё не созданы (ожидание синхронизации)."]
+    signatures = []
+    if tx.get("user_sig"):
+        signatures.append(f"    4. ЭЦП пользователя сохранена: {tx['user_sig'][:80]}...")
+    signatures.append("    5. Электронная цифровая подпись банка (ФО) формируется аналогично")
+    if tx.get("bank_sig"):
+        signatures.append(f"    6. Электронная цифровая подпись банка (ФО) сохранена: {tx['bank_sig'][:80]}...")
+    return _OFFLINE_TX_NARRATIVE_TEMPLATE.format_map({
+        "id": tx["id"],
+        "sender_name": sender["name"],
+        "sender_id": sender["id"],
+        "wallet_status": wallet_status,
+        "activated_at": sender.get("offline_activated_at") or "-",
+        "expires_at": sender.get("offline_expires_at") or "-",
+        "receiver_name": receiver["name"],
+        "receiver_id": receiver["id"],
+        "bank_name": bank["name"],
+        "amount": tx["amount"],
+        "inputs_section": "\n".join(inputs),
+        "outputs_section": "\n".join(outputs),
+        "core": _tx_core(tx),
+        "hash_for_sig": hash_for_sig,
+        "signatures_section": "\n".join(signatures),
+        "offline_status": tx.get("offline_status", "-"),
+        "synced_at": tx.get("synced_at") or "-",
+        "conflict_section": (
+            f"\n  Причина конфликта: {tx['conflict_reason']}" if tx.get("conflict_reason") else ""
+        ),
+        "block_section": _render_block_section(
+            block_row, "После синхронизации с ЦБ транзакция автоматически включается в блок"
+        ),
+        "replication_section": _render_replication_section(banks),
+    })
+
+
+_NARRATIVE_SEP = "=" * 60
+
+_CONTRACT_HEADER_TEMPLATE = """\
+Жизненный цикл смарт‑контракта {contract_id}
+============================================================
+
+ЭТАП 1: СОЗДАНИЕ СМАРТ‑КОНТРАКТА
+  Плательщик: {creator_name} (ID {creator_id})
+  Получатель: {beneficiary_name} (ID {beneficiary_id})
+  Банк (ФО): {bank_name}
+  Сумма: {amount:.2f} ЦР
+  Описание: {description}
+  График (schedule): {schedule}
+  Следующее исполнение (next_execution): {next_execution}"""
+
+_CONTRACT_SIGNING_TEMPLATE = """\
+  Процесс подписания по ГОСТ 34.10-2018:
+    1. Формирование канонической строки (core):
+       core = {core}
+    2. Вычисление хеша сообщения:
+       H = Streebog-256(core) = {contract_hash}"""
+
+_BLOCK_HEADER_TEMPLATE = """\
+
+ЭТАП 2: ФОРМИРОВАНИЕ СТРУКТУРЫ БЛОКА
+  Заголовок блока содержит:
+    • height (высота): {height}
+    • previous_hash: {previous_hash}
+    • timestamp: {timestamp}
+    • nonce: {nonce}
+    • signer (подписант): {signer}
+
+ЭТАП 3: ВЫЧИСЛЕНИЕ MERKLE-КОРНЯ
+  Заголовок блока содержит:
+    • height (высота): {height}
+    • previous_hash: {previous_hash}
+    • timestamp: {timestamp}
+    • nonce: {nonce}
+    • signer (подписант): {signer}
+
+ЭТАП 3: ВЫЧИСЛЕНИЕ MERKLE-КОРНЯ
+  merkle_root: {merkle_root}"""
+
+_BLOCK_HASH_TEMPLATE = """\
+
+ЭТАП 4: ВЫЧИСЛЕНИЕ ХЕША БЛОКА
+  hash блока: {hash}
+  Хеш вычисляется по алгоритму Streebog-256:
+    hash = Streebog-256({{height, timestamp, previous_hash, signer, nonce, merkle_root, tx_hashes}})
+  Взаимосвязь блоков по хешу:
+    • previous_hash = {previous_hash}"""
+
+_BLOCK_REPLICATION_HEADER = """\
+
+ЭТАП 7: ПОЛНАЯ РЕПЛИКАЦИЯ НА ВСЕ УЗЛЫ
+  Центральный банк РФ (главный реестр): блок присутствует ✓
+  Полная репликация: блок хранится на ВСЕХ узлах (ФО) независимо от транзакций
+  Процесс репликации:
+    1. ЦБ отправляет блок и все его транзакции на каждый узел
+    2. Каждый узел проверяет валидность блока
+    3. Узел сохраняет блок в локальную БД (bank_*.db)
+    4. Узел сохраняет все транзакции блока в локальную БД
+    5. Узел создаёт связи block_transactions в локальной БД
+  Статус репликации:
+    Блок присутствует в:
+      • Центральный банк РФ (главный реестр)"""
+
+_BLOCK_FINALIZATION_TEXT = """\
+
+ЭТАП 8: ФИНАЛИЗАЦИЯ БЛОКА
+  Блок считается финализированным после:
+    • Включения в главный реестр (центральная БД)
+    • Подтверждения консенсусом (RAFT)
+    • Полной репликации на все узлы сети
+    • Создания связей block_transactions во всех узлах"""
+
+_CONTRACT_CREATION_STEPS = (
+    "  Процесс создания:",
+    "    • Ввод параметров: плательщик, получатель, сумма, условия, периодичность",
+    "    • Формирование объекта contract_core с идентификатором и параметрами графика",
+    "    • Связывание с участниками и их кошельками",
+    "",
+    "ЭТАП 2: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) СМАРТ‑КОНТРАКТА",
+)
+
+_CONTRACT_SIGNING_AND_EXECUTION_STEPS = (
+    "    3. Генерация ЭЦП создателя:",
+    "       • Выбирается эллиптическая кривая с параметрами (p, q, a, b, P)",
+    "       • Генерируется случайное число k ∈ [1, q-1]",
+    "       • Вычисляется точка C = k * P",
+    "       • Вычисляется r = Cx mod q (если r=0, повторяется)",
+    "       • Вычисляется s = (r * d_creator + k * H) mod q (если s=0, повторяется)",
+    "       • ЭЦП создателя = (r, s)",
+    "    4. Электронная цифровая подпись банка (ФО) формируется аналогично",
+    "       Банк подтверждает регистрацию контракта своей подписью",
+    "",
+    "ЭТАП 3: РЕГИСТРАЦИЯ СМАРТ‑КОНТРАКТА",
+    "  Смарт-контракт регистрируется в системе со статусом SCHEDULED",
+    "  Устанавливается следующее время исполнения (next_execution)",
+    "",
+    "ЭТАП 4: ИСПОЛНЕНИЕ СМАРТ‑КОНТРАКТА",
+    "  Процесс исполнения:",
+    "    1. Выбор контрактов, подлежащих исполнению:",
+    "       • Проверка расписания (next_execution <= текущее время)",
+    "       • Проверка статуса контракта (SCHEDULED)",
+    "    2. Проверка условий:",
+    "       • Проверка достаточности digital_balance плательщика",
+    "       • Проверка срока действия контракта",
+    "    3. Формирование транзакции типа CONTRACT:",
+    "       • Создание транзакции с параметрами контракта",
+    "       • Обработка через _finalize_transaction",
+    "    4. Обновление статуса контракта:",
+    "       • При успехе: статус EXECUTED, обновление next_execution",
+    "       • При ошибке: статус FAILED, ошибка регистрируется в системе",
+)
+
+_BLOCK_SELECTION_STEPS = (
+    "  Процесс подбора:",
+    "    • Система собирает все транзакции со статусом CONFIRMED",
+    "    • Транзакции упорядочиваются по времени создания",
+    "    • Отбираются транзакции, ещё не включённые в блоки",
+)
+
+_BLOCK_MERKLE_STEPS = (
+    "  Алгоритм построения Merkle-дерева:",
+    "    • Обозначим через h_i = Streebog-256(tx_hash_i) хэш i-й транзакции блока",
+    "    • На каждом уровне k берём пары (h_{k,2j-1}, h_{k,2j})",
+    "    • Вычисляем h_{k+1,j} = Streebog-256(h_{k,2j-1} || h_{k,2j})",
+    "    • При нечётном числе элементов последний хэш дублируется: h_{k,2m} = h_{k,2m-1}",
+    "    • Корневой хэш merkle_root = h_{L,1}, где L — номер последнего уровня дерева",
+    "  Математическая запись:",
+    "    h_i = Streebog-256(tx_hash_i) для i = 1, 2, ..., n",
+    "    h_{k+1,j} = Streebog-256(h_{k,2j-1} || h_{k,2j}) для j = 1, 2, ..., ⌈n/2⌉",
+    "    merkle_root = h_{L,1}",
+)
+
+_BLOCK_HASH_CHAIN_STEPS = (
+    "    • Каждый блок связан с предыдущим через previous_hash",
+    "    • Формируется цепочка блоков (распределенный реестр)",
+    "  Восстановление блоков:",
+    "    • get_block_by_hash(hash) - восстановление блока по хешу",
+    "    • get_block_by_previous_hash(previous_hash) - восстановление следующего блока",
+    "    • restore_chain_from_hash(start_hash) - восстановление цепочки блоков",
+    "",
+    "ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ БЛОКА ЦБ",
+)
+
+_BLOCK_SIGNATURE_AND_CONSENSUS_STEPS = (
+    "  Процесс подписания:",
+    "    1. Вычисляется хеш блока: H_block = Streebog-256(block_header)",
+    "    2. ЦБ формирует ЭЦП по ГОСТ 34.10-2018:",
+    "       • Генерируется случайное число k ∈ [1, q-1]",
+    "       • Вычисляется точка эллиптической кривой: C = k * P",
+    "       • Вычисляется r = Cx mod q",
+    "       • Вычисляется s = (r * d_cbr + k * H_block) mod q",
+    "       • ЭЦП блока = (r, s)",
+    "    3. ЭЦП блока сохраняется в связанных транзакциях (cbr_sig)",
+    "  Электронная цифровая подпись подтверждает:",
+    "    • Подлинность блока",
+    "    • Целостность данных блока",
+    "    • Авторизацию ЦБ как создателя блока",
+    "",
+    "ЭТАП 6: КОНСЕНСУС (RAFT) И РАСПРЕДЕЛЁННОЕ ГОЛОСОВАНИЕ",
+    "  Лидер консенсуса: Центральный банк РФ (ЦБ РФ)",
+    "  Этапы консенсуса для блока:",
+    "    1. Запрос на подтверждение:",
+    "       • ЦБ формирует предложение AppendEntries с данными блока",
+    "       • Предложение рассылается всем узлам (ФО)",
+    "    2. Голосование:",
+    "       • Каждый узел (ФО) проверяет валидность блока",
+    "       • Узлы возвращают ответы: VOTE_GRANTED (согласие) или REPLICATION (репликация)",
+    "    3. Фиксация кворума:",
+    "       • ЦБ подсчитывает количество положительных ответов",
+    "       • При достижении кворума (большинство узлов) блок считается принятым",
+    "    4. Сохранение:",
+    "       • Запись помечается как COMMITTED в таблице consensus_events",
+    "       • Каждый узел применяет запись: ENTRY_APPLIED",
+)
+
+_UTXO_ROLE_STEPS = (
+    "",
+    "3. Техническая роль UTXO в модели",
+    "  Запись UTXO хранит (id, owner_id, amount, status, created_tx_id, spent_tx_id, created_at, spent_at).",
+    "  При формировании транзакции набор UTXO выбирается как вход (input set), помечается статусом SPENT,",
+    "  а при необходимости создаётся одно новое UTXO на сдачу. При оффлайн‑сценариях именно по полям",
+    "  owner_id, status и spent_tx_id моделируется ошибка двойной траты и проверяется достаточность средств.",
+)
+
+
+_BLOCK_FOR_TX_SQL = """
+    SELECT b.height, b.hash
+    FROM blocks b
+    JOIN block_transactions bt ON bt.block_id = b.id
+    WHERE bt.tx_id = ?
+    ORDER BY b.height ASC
+    LIMIT 1
+"""
+
+_BLOCK_AT_HEIGHT_SQL = "SELECT height, hash FROM blocks WHERE height = ?"
+
+_CONTRACT_CONTEXT_SQL = """
+    WITH bank_users AS ({users})
+    SELECT sc.*,
+           b.name AS bank_name,
+           (SELECT name FROM bank_users WHERE id = sc.creator_id LIMIT 1) AS creator_name,
+           (SELECT name FROM bank_users WHERE id = sc.beneficiary_id LIMIT 1) AS beneficiary_name
+    FROM smart_contracts sc
+    LEFT JOIN banks b ON b.id = sc.bank_id
+    WHERE sc.id = ?
+"""
+
+
+_NODE_NUMBER_RE = re.compile(r"(\d+)")
+
+_ISO_TS_RE = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?(?:Z|[+-]\d{2}:\d{2})?$")
+
+
+@functools.lru_cache(maxsize=8192)
+def _log_time_parts(created_at):
+    if not isinstance(created_at, str):
+        return None
+    match = _ISO_TS_RE.match(created_at)
+    if match:
+        date, clock, fraction = match.groups()
+        return date, clock, ((fraction or "") + "000")[:3]
+    try:
+        dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M:%S"), f"{dt.microsecond:06d}"[:3]
+
+
+def _node_number(node_name: str) -> int:
+    match = _NODE_NUMBER_RE.search(node_name)
+    return int(match.group(1)) if match else 999
+
+
+@functools.lru_cache(maxsize=64)
+def _consensus_node_layout(width: int, bank_nodes: tuple, node_radius: int) -> tuple:
+    sorted_bank_nodes = sorted(bank_nodes, key=_node_number)
+    spacing = max(width // (len(sorted_bank_nodes) + 1), 80)
+    total_width = spacing * len(sorted_bank_nodes)
+    start_x = (width - total_width) // 2
+    layout = []
+    for idx, node in enumerate(sorted_bank_nodes, start=1):
+        x = spacing * idx
+        if x + node_radius > width - 10:
+            x = start_x + spacing * (idx - 1) + spacing // 2
+        layout.append((node, x))
+    return tuple(layout)
+
+
+class VirtualTree:
+    def __init__(self, tree, scrollbar, sync) -> None:
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.rows = []
+        self.offset = 0
+        self.selected = set()
+        self._sync = sync
+        self._row_height = None
+        tree.configure(yscrollcommand="")
+        scrollbar.configure(command=self._on_scroll)
+        tree.bind("<Configure>", lambda e: self.render())
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", self._on_wheel)
+        tree.bind("<Button-5>", self._on_wheel)
+        tree.bind("<Button-1>", self._on_click)
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        for key in ("Up", "Down", "Prior", "Next", "Home", "End"):
+            tree.bind(f"<{key}>", self._on_key)
+            tree.bind(f"<Shift-{key}>", self._on_key)
+
+    def invalidate_row_height(self) -> None:
+        self._row_height = None
+        self.render()
+
+    def _page_size(self) -> int:
+        if self._row_height is None:
+            style_height = ttk.Style(self.tree).lookup("Treeview", "rowheight")
+            try:
+                self._row_height = max(1, int(style_height))
+            except (TypeError, ValueError):
+                self._row_height = max(20, tkfont.nametofont("TkDefaultFont").metrics("linespace") + 4)
+        return max(1, self.tree.winfo_height() // self._row_height - 1)
+
+    def set_rows(self, rows) -> None:
+        self.rows = list(rows)
+        keys = {str(key) for key, _values in self.rows}
+        self.selected &= keys
+        self.render()
+
+    def render(self) -> None:
+        total = len(self.rows)
+        page = self._page_size()
+        self.offset = max(0, min(self.offset, total - page))
+        window = self.rows[self.offset:self.offset + page]
+        self._sync(self.tree, window)
+        self.tree.yview_moveto(0)
+        visible = [str(key) for key, _values in window if str(key) in self.selected]
+        if set(visible) != set(self.tree.selection()):
+            self.tree.selection_set(visible)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + page) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def selected_rows(self) -> list:
+        return [(key, values) for key, values in self.rows if str(key) in self.selected]
+
+    def scroll_to(self, offset: int) -> None:
+        offset = max(0, min(offset, len(self.rows) - self._page_size()))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def _on_scroll(self, *args) -> None:
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._page_size()
+            self.scroll_to(self.offset + step)
+
+    def _on_wheel(self, event):
+        if event.state & 0x4:
+            return None
+        if getattr(event, "num", None) == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def _on_click(self, event) -> None:
+        # A plain click replaces the selection, including rows scrolled out of the window.
+        if not event.state & 0x5:
+            self.selected.clear()
+
+    def _on_select(self, _event=None) -> None:
+        visible = set(self.tree.get_children())
+        self.selected = (self.selected - visible) | set(self.tree.selection())
+
+    def _on_key(self, event):
+        if not self.rows:
+            return "break"
+        page = self._page_size()
+        focus = self.tree.focus()
+        try:
+            current = self.offset + self.tree.index(focus) if focus else self.offset
+        except tk.TclError:
+            current = self.offset
+        step = {"Up": -1, "Down": 1, "Prior": -page, "Next": page}.get(event.keysym)
+        if event.keysym == "Home":
+            target = 0
+        elif event.keysym == "End":
+            target = len(self.rows) - 1
+        else:
+            target = current + step
+        target = max(0, min(target, len(self.rows) - 1))
+        if target < self.offset:
+            self.scroll_to(target)
+        elif target >= self.offset + page:
+            self.scroll_to(target - page + 1)
+        iid = str(self.rows[target][0])
+        if not self.tree.exists(iid):
+            return "break"
+        self.tree.focus(iid)
+        if event.state & 0x1:
+            self.tree.selection_add(iid)
+        else:
+            self.selected = {iid}
+            self.tree.selection_set(iid)
+        self.tree.see(iid)
+        return "break"
+
+
+class PagedLog:
+    def __init__(self, widget, scrollbar, render_page, append) -> None:
+        self.widget = widget
+        self.scrollbar = scrollbar
+        self.entries = []
+        self.rendered = 0
+        self.state = None
+        self._render_page = render_page
+        self._append = append
+        self._load_job = None
+        widget.configure(yscrollcommand=self._on_yscroll)
+
+    def show(self, chunks) -> None:
+        self.entries = []
+        self.rendered = 0
+        self._append(self.widget, chunks, replace=True)
+
+    def full_text(self) -> str:
+        chunks, _state = self._render_page(self.entries, None)
+        return "".join(text for text, _tags in chunks)
+
+    def set_entries(self, entries) -> None:
+        self.entries = entries
+        self.rendered = 0
+        self.state = None
+        self._load_more(replace=True)
+
+    def _load_more(self, replace: bool = False) -> None:
+        self._load_job = None
+        page = self.entries[self.rendered:self.rendered + _LOG_PAGE_SIZE]
+        if not page and not replace:
+            return
+        chunks, self.state = self._render_page(page, self.state)
+        self.rendered += len(page)
+        self._append(self.widget, chunks, replace=replace)
+
+    def _on_yscroll(self, first, last) -> None:
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if float(last) >= 0.95 and self.rendered < len(self.entries) and self._load_job is None:
+            self._load_job = self.widget.after_idle(self._load_more)
+
 
 class DigitalRubleApp(tk.Tk):
     def __init__(self) -> None:
@@ -20,25 +941,41 @@ class DigitalRubleApp(tk.Tk):
         self.option_add("*Font", default_font)
         heading_font = tkfont.nametofont("TkHeadingFont")
         heading_font.configure(size=12, weight="bold")
+        self._table_font = tkfont.Font(self, name="AppTableFont", font=default_font)
+        self._text_font = tkfont.Font(self, name="AppTextFont", font="TkFixedFont")
+        self._style = ttk.Style(self)
+        self._style.configure("Treeview", font="AppTableFont", rowheight=self._table_font.metrics("linespace") + 4)
+        self._style.configure("Treeview.Heading", font="TkHeadingFont")
+        self._style.configure("Header.TLabel", font=("TkDefaultFont", 11, "bold"))
         try:
             self.platform = DigitalRublePlatform()
-            self.notebook = ttk.Notebook(self)
-            self.notebook.pack(fill=tk.BOTH, expand=True)
-            self._init_state()
-            self._setup_zoom()
+        except Exception as e:
+            self._show_init_error(e)
+            raise
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self._init_state()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._setup_zoom()
+        try:
             self._build_tabs()
-            self.refresh_all()
         except Exception as e:
-            import traceback
-            error_msg = f"Ошибка при инициализации приложения: {e}\n\n{traceback.format_exc()}"
-            print(error_msg)
-            try:
-                messagebox.showerror("Ошибка инициализации", error_msg)
-            except:
-                pass
+            self._show_init_error(e)
             raise
+        self.refresh_all()
+
+    def _show_init_error(self, exc: Exception) -> None:
+        import traceback
+        error_msg = f"Ошибка при инициализации приложения: {exc}\n\n{traceback.format_exc()}"
+        print(error_msg)
+        try:
+            messagebox.showerror("Ошибка инициализации", error_msg)
+        except:
+            pass
 
     def _init_state(self) -> None:
+        self.tk.eval(_TREE_BULK_INSERT_SCRIPT)
+        self.tk.eval(_CLIPBOARD_SET_SCRIPT)
         self.user_table = None
         self.tx_table = None
         self.offline_table = None
@@ -69,8 +1006,8 @@ class DigitalRubleApp(tk.Tk):
         self.bank_combo = None
         self.online_bank_combo = None
         self.offline_bank_combo = None
-        self._consensus_anim_events = []
-        self._consensus_anim_index = 0
+        self._consensus_anim_iter = iter(())
+        self._consensus_seen_events = []
         self._consensus_anim_job = None
         self._consensus_active_actor = None
         self._consensus_active_state = None
@@ -80,22 +1017,145 @@ class DigitalRubleApp(tk.Tk):
         self._consensus_total_banks = None
         self._consensus_active_nodes = set()
         self._ledger_last_rows = []
+        self._consensus_layout_key = None
+        self._consensus_canvas_key = None
+        self._consensus_stage_key = None
+        self._consensus_canvas_inputs_cache = None
+        self._forced_consensus_stage = None
+        self._forced_consensus_job = None
         self._ledger_active_height = None
         self._zoom_factor = 1.0
+        self._zoom_job = None
         self._base_font_size = 11
         self._base_heading_font_size = 12
-        self._text_zoom_factors = {}
+        self._text_zoom_factors: WeakKeyDictionary[tk.Text, dict] = WeakKeyDictionary()
+        self._table_state = {}
+        self._combo_values = {}
+        self._section_versions = {}
+        self._virtual_tables = {}
+        self._paged_logs = {}
+        self._bank_client_iids = {}
+        self._lazy_tabs = {}
+        self._user_combos = []
+        self._receiver_combos = []
+        self._bank_combos = []
+        self._user_labels = {code: () for code in _USER_TYPE_LABELS}
+        self._refresh_pending = None
+        self._dirty_sections = set()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._read_executor = ThreadPoolExecutor(max_workers=1)
+        self._export_executor = ThreadPoolExecutor(max_workers=1)
+        self._log_export_future = None
+        self._log_export_buttons = []
+        self._pending_narratives = set()
+        self._platform_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._pump_job = None
+        self._steps_win = None
+        self._steps_text = None
+        self._activity_entries = None
+        self._cbr_log_entries = None
+        self._cbr_filtered_entries = None
+        self._activity_view = None
+        self._cbr_log_view = None
+        self._search_job = None
+        self._bank_db_cache = {}
+        self._bank_db_lock = threading.Lock()
+        self._attached_banks = {}
+        self._refresh_index = {}
+        self._attach_lock = threading.Lock()
+        self._bank_cache = functools.lru_cache(maxsize=128)(self.platform._get_bank)
+        self._user_cache = functools.lru_cache(maxsize=1024)(self.platform.get_user)
+        self._tx_signing_hash = functools.lru_cache(maxsize=512)(
+            self.platform._get_transaction_hash_for_signing
+        )
+
+    def _on_close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._read_executor.shutdown(wait=False, cancel_futures=True)
+        self._export_executor.shutdown(wait=False, cancel_futures=True)
+        self._close_bank_dbs()
+        self.destroy()
+
+    def _bank_db(self, bank_id: int) -> DatabaseManager:
+        with self._bank_db_lock:
+            bank_db = self._bank_db_cache.get(bank_id)
+            if bank_db is None:
+                bank_db = DatabaseManager(f"bank_{bank_id}.db")
+                self._bank_db_cache[bank_id] = bank_db
+            return bank_db
+
+    def _close_bank_dbs(self) -> None:
+        with self._bank_db_lock:
+            bank_dbs = list(self._bank_db_cache.values())
+            self._bank_db_cache.clear()
+        for bank_db in bank_dbs:
+            try:
+                bank_db.close()
+            except Exception:
+                pass
+        with self._attach_lock:
+            for schema in self._attached_banks.values():
+                try:
+                    self.platform.db_ro.detach(schema)
+                except Exception:
+                    pass
+            self._attached_banks.clear()
+
+    def _attached_bank_schema(self, bank_id) -> str | None:
+        with self._attach_lock:
+            schema = self._attached_banks.get(bank_id)
+            if schema is not None:
+                return schema
+            if len(self._attached_banks) >= self.platform.db_ro.attach_limit():
+                return None
+            path = self.platform.db_ro.db_path.with_name(f"bank_{bank_id}.db")
+            if not path.exists():
+                return None
+            schema = f"bank_{int(bank_id)}"
+            self.platform.db_ro.attach(path, schema)
+            self._attached_banks[bank_id] = schema
+            return schema
+
+    def _run_async(self, coro):
+        task = self._loop.create_task(coro)
+        if self._pump_job is None:
+            self._pump_job = self.after(10, self._pump_asyncio)
+        return task
+
+    def _pump_asyncio(self) -> None:
+        if not self._loop.is_running():
+            self._loop.call_soon(self._loop.stop)
+            self._loop.run_forever()
+        if asyncio.all_tasks(self._loop):
+            self._pump_job = self.after(10, self._pump_asyncio)
+        else:
+            self._pump_job = None
+
+    def _run_in_background(self, work, on_done, executor=None):
+        async def runner() -> None:
+            future = self._loop.run_in_executor(executor or self._executor, work)
+            await asyncio.wait([future])
+            self.after_idle(on_done, future)
+
+        return self._run_async(runner())
+
+    @contextlib.contextmanager
+    def _platform_operation(self):
+        if not self._platform_lock.acquire(blocking=False):
+            raise RuntimeError("Выполняется другая операция с данными модели. Повторите после её завершения.")
+        try:
+            yield
+        finally:
+            self._platform_lock.release()
 
     def _user_type_label(self, code: str) -> str:
-        mapping = {
-            "INDIVIDUAL": "Физическое лицо",
-            "BUSINESS": "Юридическое лицо",
-            "GOVERNMENT": "Государственное учреждение",
-        }
-        return mapping.get(code, code)
+        return _USER_TYPE_LABELS.get(code, code)
 
     def _setup_zoom(self) -> None:
         def on_mousewheel(event):
+            if not event.state & 0x4:
+                return
             delta = 0
             if hasattr(event, 'delta') and event.delta != 0:
                 delta = event.delta
@@ -109,29 +1169,27 @@ class DigitalRubleApp(tk.Tk):
             else:
                 return
             
-            self._apply_zoom()
+            self._schedule_zoom()
             return "break"
         
-        self.bind("<Control-MouseWheel>", on_mousewheel)
-        self.notebook.bind("<Control-MouseWheel>", on_mousewheel)
-        
-        self.bind("<Control-Button-4>", on_mousewheel)
-        self.bind("<Control-Button-5>", on_mousewheel)
-        self.notebook.bind("<Control-Button-4>", on_mousewheel)
-        self.notebook.bind("<Control-Button-5>", on_mousewheel)
-        
         self.bind_all("<Control-MouseWheel>", on_mousewheel)
         self.bind_all("<Control-Button-4>", on_mousewheel)
         self.bind_all("<Control-Button-5>", on_mousewheel)
 
-    def _setup_text_zoom(self, text_widget) -> None:
-        widget_id = id(text_widget)
-        if widget_id not in self._text_zoom_factors:
-            self._text_zoom_factors[widget_id] = {
-                'widget': text_widget,
+    def _setup_text_zoom(self, text_widget, tag_fonts) -> None:
+        if text_widget not in self._text_zoom_factors:
+            fonts = {}
+            for tag, spec in tag_fonts.items():
+                if spec not in fonts:
+                    fonts[spec] = tkfont.Font(weight=spec[1])
+                text_widget.tag_configure(tag, font=fonts[spec])
+            self._text_zoom_factors[text_widget] = {
                 'zoom_factor': 1.0,
-                'base_font_size': 8
+                'base_font_size': 8,
+                'fonts': fonts,
+                'job': None,
             }
+            self._apply_text_zoom(text_widget)
         
         def on_text_mousewheel(event):
             delta = 0
@@ -140,149 +1198,129 @@ class DigitalRubleApp(tk.Tk):
             elif hasattr(event, 'num'):
                 delta = 1 if event.num == 4 else -1
             
+            zoom_data = self._text_zoom_factors[event.widget]
             if delta > 0:
-                self._text_zoom_factors[widget_id]['zoom_factor'] = min(
-                    self._text_zoom_factors[widget_id]['zoom_factor'] * 1.1, 3.0
-                )
+                zoom_data['zoom_factor'] = min(zoom_data['zoom_factor'] * 1.1, 3.0)
             elif delta < 0:
-                self._text_zoom_factors[widget_id]['zoom_factor'] = max(
-                    self._text_zoom_factors[widget_id]['zoom_factor'] / 1.1, 0.5
-                )
+                zoom_data['zoom_factor'] = max(zoom_data['zoom_factor'] / 1.1, 0.5)
             else:
                 return
             
-            self._apply_text_zoom(widget_id)
+            if zoom_data['job'] is not None:
+                self.after_cancel(zoom_data['job'])
+            zoom_data['job'] = self.after(30, self._apply_text_zoom_now, event.widget)
             return "break"
         
         text_widget.bind("<Control-MouseWheel>", on_text_mousewheel)
         text_widget.bind("<Control-Button-4>", on_text_mousewheel)
         text_widget.bind("<Control-Button-5>", on_text_mousewheel)
 
-    def _apply_text_zoom(self, widget_id: int) -> None:
-        if widget_id not in self._text_zoom_factors:
+    def _apply_text_zoom_now(self, widget: tk.Text) -> None:
+        zoom_data = self._text_zoom_factors.get(widget)
+        if zoom_data is None:
+            return
+        zoom_data['job'] = None
+        self._apply_text_zoom(widget)
+
+    def _apply_text_zoom(self, widget: tk.Text) -> None:
+        zoom_data = self._text_zoom_factors.get(widget)
+        if zoom_data is None:
             return
         
-        zoom_data = self._text_zoom_factors[widget_id]
-        widget = zoom_data['widget']
         zoom_factor = zoom_data['zoom_factor']
         base_size = zoom_data['base_font_size']
         
         new_font_size = max(6, int(base_size * zoom_factor))
+        if zoom_data.get('font_size') == new_font_size:
+            return
+        zoom_data['font_size'] = new_font_size
         
         try:
-            if widget == self.activity_text:
-                header_font = tkfont.Font(size=int(new_font_size * 1.25), weight="bold")
-                subheader_font = tkfont.Font(size=int(new_font_size * 1.1), weight="bold")
-                normal_font = tkfont.Font(size=new_font_size)
-                normal_bold_font = tkfont.Font(size=new_font_size, weight="bold")
-                small_font = tkfont.Font(size=int(new_font_size * 0.9))
-                
-                widget.tag_configure("header", font=header_font)
-                widget.tag_configure("subheader", font=subheader_font)
-                widget.tag_configure("conflict", font=subheader_font)
-                widget.tag_configure("stage", font=normal_font)
-                widget.tag_configure("details", font=small_font)
-                widget.tag_configure("separator", font=small_font)
-                widget.tag_configure("time", font=small_font)
-                widget.tag_configure("context", font=normal_bold_font)
-                widget.tag_configure("actor", font=normal_font)
-            elif widget == self.cbr_log:
-                header_font = tkfont.Font(size=int(new_font_size * 1.1), weight="bold")
-                normal_font = tkfont.Font(size=new_font_size)
-                normal_bold_font = tkfont.Font(size=new_font_size, weight="bold")
-                small_font = tkfont.Font(size=int(new_font_size * 0.9))
-                
-                widget.tag_configure("header", font=header_font)
-                widget.tag_configure("stage", font=header_font)
-                widget.tag_configure("details", font=small_font)
-                widget.tag_configure("time", font=small_font)
-                widget.tag_configure("actor", font=small_font)
-                widget.tag_configure("context", font=normal_bold_font)
-                widget.tag_configure("separator", font=small_font)
+            for (scale, _weight), font in zoom_data['fonts'].items():
+                font.configure(size=int(new_font_size * scale))
         except Exception as e:
             print(f"Ошибка при применении масштаба к текстовому виджету: {e}")
 
+    def _schedule_zoom(self) -> None:
+        if self._zoom_job is not None:
+            self.after_cancel(self._zoom_job)
+        self._zoom_job = self.after(30, self._apply_zoom_now)
+
+    def _apply_zoom_now(self) -> None:
+        self._zoom_job = None
+        self._apply_zoom()
+
     def _apply_zoom(self) -> None:
         new_font_size = max(6, int(self._base_font_size * self._zoom_factor))
         new_heading_font_size = max(7, int(self._base_heading_font_size * self._zoom_factor))
         
-        default_font = tkfont.nametofont("TkDefaultFont")
-        default_font.configure(size=new_font_size)
-        
-        heading_font = tkfont.nametofont("TkHeadingFont")
-        heading_font.configure(size=new_heading_font_size)
-        
-        self._update_widget_fonts(new_font_size, new_heading_font_size)
-
-    def _update_widget_fonts(self, font_size: int, heading_font_size: int) -> None:
-        text_widgets = []
-        if self.activity_text:
-            text_widgets.append(self.activity_text)
-        if self.cbr_log:
-            text_widgets.append(self.cbr_log)
-        
-        for widget in text_widgets:
-            try:
-                current_font = widget.cget("font")
-                if isinstance(current_font, str):
-                    font_obj = tkfont.Font(font=current_font)
-                    font_obj.configure(size=int(font_size * 0.9))
-                    widget.configure(font=font_obj)
-                elif isinstance(current_font, tkfont.Font):
-                    current_font.configure(size=int(font_size * 0.9))
-            except Exception:
-                pass
-        
-        tables = [
-            self.user_table, self.tx_table, self.offline_table,
-            self.contract_table, self.consensus_table, self.block_table,
-            self.utxo_table, self.errors_table, self.bank_tx_table, self.bank_blocks_table,
-            self.issuance_table
-        ]
-        
-        for table in tables:
-            if table:
-                try:
-                    table_font = tkfont.Font(size=font_size)
-                    table.configure(font=table_font)
-                except Exception:
-                    pass
+        tkfont.nametofont("TkDefaultFont").configure(size=new_font_size)
+        tkfont.nametofont("TkHeadingFont").configure(size=new_heading_font_size)
+        self._table_font.configure(size=new_font_size)
+        self._text_font.configure(size=int(new_font_size * 0.9))
+        self._style.configure("Treeview", rowheight=self._table_font.metrics("linespace") + 4)
+        for virtual in self._virtual_tables.values():
+            virtual.invalidate_row_height()
 
     def _build_tabs(self) -> None:
-        self._build_management_tab()
-        self._build_user_tab()
-        self._build_bank_tab()
-        self._build_cbr_tab()
-        self._build_user_data_tab()
-        self._build_tx_data_tab()
-        self._build_offline_tab()
-        self._build_contracts_tab()
-        self._build_consensus_tab()
-        self._build_ledger_tab()
-        self._build_activity_tab()
+        tab_builders = [
+            ("Управление", self._build_management_tab),
+            ("Пользователь", self._build_user_tab),
+            ("Финансовая организация", self._build_bank_tab),
+            ("Центральный банк", self._build_cbr_tab),
+            ("Данные о пользователях", self._build_user_data_tab),
+            ("Данные о транзакциях", self._build_tx_data_tab),
+            ("Оффлайн-транзакции", self._build_offline_tab),
+            ("Смарт-контракты", self._build_contracts_tab),
+            ("Консенсус", self._build_consensus_tab),
+            ("Распределенный реестр", self._build_ledger_tab),
+            ("Информация о событиях системы", self._build_activity_tab),
+        ]
+        for title, builder in tab_builders:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=title)
+            self._lazy_tabs[str(frame)] = builder
+        current = self.notebook.select()
+        self._lazy_tabs.pop(current)(self.notebook.nametowidget(current))
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
+    def _on_tab_changed(self, event=None) -> None:
+        tab_id = self.notebook.select()
+        builder = self._lazy_tabs.pop(tab_id, None)
+        if builder is not None:
+            builder(self.notebook.nametowidget(tab_id))
+            self._section_versions.clear()
+            self._schedule_refresh()
 
     def _show_steps_window(
         self,
         title: str,
-        lines: list[str],
+        lines: list[str] | str,
         export_handler=None,
         export_plain_handler=None,
     ) -> None:
-        win = tk.Toplevel(self)
-        win.title(title)
-        win.geometry("700x500")
-        frame = ttk.Frame(win)
-        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        text = tk.Text(frame, wrap="word")
-        scroll = ttk.Scrollbar(frame, orient="vertical", command=text.yview)
-        text.configure(yscrollcommand=scroll.set)
-        text.grid(row=0, column=0, sticky="nsew")
-        scroll.grid(row=0, column=1, sticky="ns")
-        frame.rowconfigure(0, weight=1)
-        frame.columnconfigure(0, weight=1)
-        text.insert(tk.END, "\n".join(lines))
-        text.config(state="disabled")
-        self._add_copy_menu(text)
+        if self._steps_win is None or not self._steps_win.winfo_exists():
+            self._steps_win = tk.Toplevel(self)
+            self._steps_win.geometry("700x500")
+            self._steps_win.protocol("WM_DELETE_WINDOW", self._steps_win.withdraw)
+            frame = ttk.Frame(self._steps_win)
+            frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            self._steps_text = tk.Text(frame, wrap="word", undo=False)
+            scroll = ttk.Scrollbar(frame, orient="vertical", command=self._steps_text.yview)
+            self._steps_text.configure(yscrollcommand=scroll.set)
+            self._steps_text.grid(row=0, column=0, sticky="nsew")
+            scroll.grid(row=0, column=1, sticky="ns")
+            frame.rowconfigure(0, weight=1)
+            frame.columnconfigure(0, weight=1)
+            self._add_copy_menu(self._steps_text)
+        self._steps_win.title(title)
+        self._steps_text.config(state="normal")
+        self._steps_text.delete("1.0", tk.END)
+        self._steps_text.insert(tk.END, lines if isinstance(lines, str) else "\n".join(lines))
+        self._steps_text.config(state="disabled")
+        self._steps_text.yview_moveto(0)
+        self._steps_win.deiconify()
+        self._steps_win.lift()
 
     def _export_encrypted_json(self, default_name: str, payload: dict, bank_id: int | None) -> None:
         self._export_plain_json(default_name, payload)
@@ -297,15 +1335,30 @@ class DigitalRubleApp(tk.Tk):
             )
             if not filename:
                 return
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
-            messagebox.showinfo("Экспорт", f"JSON сохранён в файл:\n{filename}")
         except Exception as exc:
             messagebox.showerror("Экспорт", f"Ошибка экспорта JSON: {exc}")
+            return
+
+        def write_json() -> None:
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                with open(filename, "wb") as f:
+                    f.write(data)
+            else:
+                with open(filename, "w", encoding="utf-8") as f:
+                    json.dump(payload, f, ensure_ascii=False, indent=2)
+
+        def on_written(future) -> None:
+            try:
+                future.result()
+            except Exception as exc:
+                messagebox.showerror("Экспорт", f"Ошибка экспорта JSON: {exc}")
+                return
+            messagebox.showinfo("Экспорт", f"JSON сохранён в файл:\n{filename}")
 
-    def _build_management_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Управление")
+        self._run_in_background(write_json, on_written, self._export_executor)
+
+    def _build_management_tab(self, tab) -> None:
         controls = ttk.LabelFrame(tab, text="Создание участников")
         controls.pack(fill=tk.X, padx=10, pady=10)
 
@@ -333,27 +1386,46 @@ class DigitalRubleApp(tk.Tk):
         fo_entry.grid(row=0, column=7, padx=5, pady=5)
         self._add_entry_menu(fo_entry)
 
-        def seed_entities() -> None:
-            try:
-                fo_count = int(fo_entry.get())
+        def seed_work(fo_count: int, fl_count: int, yl_count: int, gov_count: int) -> None:
+            with self._platform_lock:
                 if fo_count > 0:
                     self.platform.create_banks(fo_count)
-                    banks = self.platform.list_banks()
-                    if not banks:
-                        messagebox.showerror("Ошибка", "Не удалось создать банки")
-                        return
-                
-                self.platform.create_users(int(fl_entry.get()), "INDIVIDUAL")
-                self.platform.create_users(int(yl_entry.get()), "BUSINESS")
-                self.platform.create_government_institutions(int(gov_entry.get()))
-                self.refresh_all()
-                messagebox.showinfo("Управление", "Данные успешно сгенерированы")
+                    if not self.platform.list_banks():
+                        raise RuntimeError("Не удалось создать банки")
+                self.platform.create_users(fl_count, "INDIVIDUAL")
+                self.platform.create_users(yl_count, "BUSINESS")
+                self.platform.create_government_institutions(gov_count)
+
+        def seed_done(future) -> None:
+            seed_button.configure(state=tk.NORMAL)
+            reset_button.configure(state=tk.NORMAL)
+            self.configure(cursor="")
+            self._schedule_refresh()
+            try:
+                future.result()
             except Exception as exc:
                 messagebox.showerror("Ошибка", str(exc))
+                return
+            messagebox.showinfo("Управление", "Данные успешно сгенерированы")
 
-        ttk.Button(controls, text="Создать", command=seed_entities).grid(
-            row=0, column=8, padx=10, pady=5
-        )
+        def seed_entities() -> None:
+            try:
+                counts = (
+                    int(fo_entry.get()),
+                    int(fl_entry.get()),
+                    int(yl_entry.get()),
+                    int(gov_entry.get()),
+                )
+            except ValueError as exc:
+                messagebox.showerror("Ошибка", str(exc))
+                return
+            seed_button.configure(state=tk.DISABLED)
+            reset_button.configure(state=tk.DISABLED)
+            self.configure(cursor="watch")
+            self._run_in_background(lambda: seed_work(*counts), seed_done)
+
+        seed_button = ttk.Button(controls, text="Создать", command=seed_entities)
+        seed_button.grid(row=0, column=8, padx=10, pady=5)
 
         def reset_entities() -> None:
             if not messagebox.askyesno(
@@ -363,19 +1435,18 @@ class DigitalRubleApp(tk.Tk):
             ):
                 return
             try:
-                self.platform.reset_state()
-                self.refresh_all()
+                with self._platform_operation():
+                    self._close_bank_dbs()
+                    self.platform.reset_state()
+                self._schedule_refresh()
                 messagebox.showinfo("Сброс модели", "Все данные имитационной модели очищены")
             except Exception as exc:
                 messagebox.showerror("Ошибка", str(exc))
 
-        ttk.Button(controls, text="Очистить данные", command=reset_entities).grid(
-            row=0, column=9, padx=10, pady=5
-        )
+        reset_button = ttk.Button(controls, text="Очистить данные", command=reset_entities)
+        reset_button.grid(row=0, column=9, padx=10, pady=5)
 
-    def _build_user_tab(self) -> None:
-        outer_tab = ttk.Frame(self.notebook)
-        self.notebook.add(outer_tab, text="Пользователь")
+    def _build_user_tab(self, outer_tab) -> None:
         outer_tab.columnconfigure(0, weight=1)
         outer_tab.rowconfigure(0, weight=1)
         canvas = tk.Canvas(outer_tab)
@@ -402,6 +1473,7 @@ class DigitalRubleApp(tk.Tk):
             row=0, column=0, padx=5, pady=5, sticky="w"
         )
         self.wallet_user_combo = ttk.Combobox(wallet_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._user_combos.append(self.wallet_user_combo)
         self.wallet_user_combo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Button(wallet_frame, text="Открыть кошелек", command=self._ui_open_wallet).grid(
@@ -438,6 +1510,7 @@ class DigitalRubleApp(tk.Tk):
             row=2, column=0, padx=5, pady=5, sticky="w"
         )
         self.online_bank_combo = ttk.Combobox(online_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._bank_combos.append(self.online_bank_combo)
         self.online_bank_combo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(online_frame, text="Тип перевода:", width=LABEL_WIDTH//10).grid(
@@ -445,7 +1518,7 @@ class DigitalRubleApp(tk.Tk):
         )
         self.channel_combo = ttk.Combobox(
             online_frame,
-            values=["C2C", "C2B", "B2C", "B2B", "G2B", "B2G", "C2G", "G2C"],
+            values=tuple(CHANNEL_RULES),
             state="readonly",
             width=FIELD_WIDTH//10,
         )
@@ -472,6 +1545,7 @@ class DigitalRubleApp(tk.Tk):
             row=0, column=0, padx=5, pady=5, sticky="w"
         )
         self.offline_user_combo = ttk.Combobox(offline_wallet_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._user_combos.append(self.offline_user_combo)
         self.offline_user_combo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         ttk.Button(
             offline_wallet_frame, text="Открыть оффлайн кошелек", command=self._ui_open_offline
@@ -496,17 +1570,20 @@ class DigitalRubleApp(tk.Tk):
             row=0, column=0, padx=5, pady=5, sticky="w"
         )
         self.offline_sender_combo = ttk.Combobox(offline_tx_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._user_combos.append(self.offline_sender_combo)
         self.offline_sender_combo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(offline_tx_frame, text="Получатель:", width=LABEL_WIDTH//10).grid(
             row=1, column=0, padx=5, pady=5, sticky="w"
         )
         self.offline_receiver_combo = ttk.Combobox(offline_tx_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._user_combos.append(self.offline_receiver_combo)
         self.offline_receiver_combo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
         ttk.Label(offline_tx_frame, text="Банк:", width=LABEL_WIDTH//10).grid(
             row=2, column=0, padx=5, pady=5, sticky="w"
         )
         self.offline_bank_combo = ttk.Combobox(offline_tx_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._bank_combos.append(self.offline_bank_combo)
         self.offline_bank_combo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(offline_tx_frame, text="Сумма:", width=LABEL_WIDTH//10).grid(
@@ -528,18 +1605,21 @@ class DigitalRubleApp(tk.Tk):
             row=0, column=0, padx=5, pady=5, sticky="w"
         )
         self.contract_sender_combo = ttk.Combobox(contract_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._user_combos.append(self.contract_sender_combo)
         self.contract_sender_combo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(contract_frame, text="ЮЛ/Гос получатель:", width=LABEL_WIDTH//10).grid(
             row=1, column=0, padx=5, pady=5, sticky="w"
         )
         self.contract_receiver_combo = ttk.Combobox(contract_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._receiver_combos.append(self.contract_receiver_combo)
         self.contract_receiver_combo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(contract_frame, text="Банк:", width=LABEL_WIDTH//10).grid(
             row=2, column=0, padx=5, pady=5, sticky="w"
         )
         self.contract_bank_combo = ttk.Combobox(contract_frame, state="readonly", width=FIELD_WIDTH//10)
+        self._bank_combos.append(self.contract_bank_combo)
         self.contract_bank_combo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
 
         ttk.Label(contract_frame, text="Сумма:", width=LABEL_WIDTH//10).grid(
@@ -580,9 +1660,7 @@ class DigitalRubleApp(tk.Tk):
             contract_frame, text="Создать смарт-контракт", command=self._ui_create_contract
         ).grid(row=7, column=0, columnspan=2, pady=10, sticky="ew")
 
-    def _build_bank_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Финансовая организация")
+    def _build_bank_tab(self, tab) -> None:
         tab.columnconfigure(0, weight=1)
         tab.rowconfigure(3, weight=1)
         tab.rowconfigure(6, weight=1)
@@ -592,6 +1670,7 @@ class DigitalRubleApp(tk.Tk):
 
         ttk.Label(request_frame, text="Банк:").grid(row=0, column=0, padx=5, pady=5)
         self.bank_combo = ttk.Combobox(request_frame, state="readonly")
+        self._bank_combos.append(self.bank_combo)
         self.bank_combo.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(request_frame, text="Сумма ЦР:").grid(row=0, column=2, padx=5, pady=5)
@@ -607,13 +1686,14 @@ class DigitalRubleApp(tk.Tk):
         filter_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=5)
         ttk.Label(filter_frame, text="Выберите банк:").grid(row=0, column=0, padx=5, pady=5)
         self.bank_filter_combo = ttk.Combobox(filter_frame, state="readonly", width=30)
+        self._bank_combos.append(self.bank_filter_combo)
         self.bank_filter_combo.grid(row=0, column=1, padx=5, pady=5)
-        self.bank_filter_combo.bind("<<ComboboxSelected>>", lambda e: self._refresh_bank_data_and_blocks())
+        self.bank_filter_combo.bind("<<ComboboxSelected>>", self._on_bank_filter_change)
         ttk.Button(filter_frame, text="Обновить данные", command=self._refresh_bank_data_and_blocks).grid(
             row=0, column=2, padx=5, pady=5
         )
 
-        ttk.Label(tab, text="Данные, хращиеся в финансовой организации", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(tab, text="Данные, хращиеся в финансовой организации", style="Header.TLabel").grid(
             row=2, column=0, sticky="w", padx=10, pady=(10, 5)
         )
         table_frame = ttk.Frame(tab)
@@ -631,7 +1711,7 @@ class DigitalRubleApp(tk.Tk):
         ttk.Button(export_frame, text="Экспортировать полный лог транзакций выбранного клиента", 
                    command=self._ui_export_client_transactions).pack(side=tk.LEFT, padx=5)
         
-        ttk.Label(tab, text="Блоки распределенного реестра", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(tab, text="Блоки распределенного реестра", style="Header.TLabel").grid(
             row=5, column=0, sticky="w", padx=10, pady=(10, 5)
         )
         blocks_frame = ttk.Frame(tab)
@@ -642,9 +1722,7 @@ class DigitalRubleApp(tk.Tk):
             stretch=True,
         )
 
-    def _build_cbr_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Центральный банк")
+    def _build_cbr_tab(self, tab) -> None:
         tab.columnconfigure(0, weight=1)
 
         ttk.Label(tab, text="Запросы на эмиссию").grid(row=0, column=0, sticky="w", padx=10, pady=5)
@@ -677,29 +1755,33 @@ class DigitalRubleApp(tk.Tk):
         filter_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
         
         ttk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT, padx=(0, 5))
-        self.cbr_filter_combo = ttk.Combobox(filter_frame, values=["Все", "Транзакции", "Смарт-контракты", "Эмиссия", "Блоки", "Консенсус"], state="readonly", width=15)
+        self.cbr_filter_combo = ttk.Combobox(filter_frame, values=_FILTER_CATEGORIES, state="readonly", width=15)
         self.cbr_filter_combo.pack(side=tk.LEFT, padx=5)
         self.cbr_filter_combo.set("Все")
-        self.cbr_filter_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_all())
+        self.cbr_filter_combo.bind("<<ComboboxSelected>>", lambda e: self._apply_cbr_filter())
         
         ttk.Label(filter_frame, text="Поиск:").pack(side=tk.LEFT, padx=(10, 5))
         self.cbr_search_entry = ttk.Entry(filter_frame, width=20)
         self.cbr_search_entry.pack(side=tk.LEFT, padx=5)
-        self.cbr_search_entry.bind("<KeyRelease>", lambda e: self.refresh_all())
+        self.cbr_search_entry.bind("<KeyRelease>", lambda e: self._schedule_search_refresh(self._apply_cbr_filter))
         self._add_entry_menu(self.cbr_search_entry)
         
-        ttk.Button(filter_frame, text="Экспорт CSV", command=lambda: self._export_cbr_log_csv()).pack(side=tk.LEFT, padx=5)
-        ttk.Button(filter_frame, text="Экспорт JSON", command=lambda: self._export_cbr_log_json()).pack(side=tk.LEFT, padx=5)
+        for text, command in (("Экспорт CSV", self._export_cbr_log_csv), ("Экспорт JSON", self._export_cbr_log_json)):
+            button = ttk.Button(filter_frame, text=text, command=command)
+            button.pack(side=tk.LEFT, padx=5)
+            self._log_export_buttons.append(button)
         
-        self.cbr_log = tk.Text(tab, height=18)
+        self.cbr_log = tk.Text(tab, height=18, font="AppTextFont", undo=False, state=tk.DISABLED)
         self.cbr_log.grid(row=4, column=0, sticky="nsew", padx=10, pady=5)
         tab.rowconfigure(4, weight=1)
         self._add_copy_menu(self.cbr_log)
-        self._setup_text_zoom(self.cbr_log)
+        for tag, color in _CBR_LOG_TAG_COLORS.items():
+            self.cbr_log.tag_configure(tag, foreground=color)
+        self._setup_text_zoom(self.cbr_log, _CBR_LOG_TAG_FONTS)
+        self._cbr_log_view = PagedLog(self.cbr_log, None, self._cbr_log_chunks, self._append_log)
+        self._paged_logs[id(self.cbr_log)] = self._cbr_log_view
 
-    def _build_user_data_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Данные о пользователях")
+    def _build_user_data_tab(self, tab) -> None:
         columns = [
             "ID",
             "Тип",
@@ -713,9 +1795,7 @@ class DigitalRubleApp(tk.Tk):
         ]
         self.user_table = self._make_table(tab, columns, stretch=True)
 
-    def _build_tx_data_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Данные о транзакциях")
+    def _build_tx_data_tab(self, tab) -> None:
         columns = [
             "ID",
             "Отправитель",
@@ -725,12 +1805,10 @@ class DigitalRubleApp(tk.Tk):
             "Время",
             "Банк",
         ]
-        self.tx_table = self._make_table(tab, columns, stretch=True)
+        self.tx_table = self._make_table(tab, columns, stretch=True, virtual=True)
         self.tx_table.bind("<Double-1>", self._on_tx_row_double_click)
 
-    def _build_offline_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Оффлайн-транзакции")
+    def _build_offline_tab(self, tab) -> None:
         tab.rowconfigure(0, weight=1)
         tab.columnconfigure(0, weight=1)
         table_frame = ttk.Frame(tab)
@@ -750,9 +1828,7 @@ class DigitalRubleApp(tk.Tk):
             row=1, column=0, pady=5
         )
 
-    def _build_contracts_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Смарт-контракты")
+    def _build_contracts_tab(self, tab) -> None:
         tab.rowconfigure(0, weight=1)
         tab.columnconfigure(0, weight=1)
         columns = [
@@ -767,16 +1843,14 @@ class DigitalRubleApp(tk.Tk):
         ]
         self.contract_table = self._make_table(tab, columns, stretch=True)
         self.contract_table.bind("<Double-1>", self._on_contract_row_double_click)
-        ttk.Button(tab, text="Обновить данные", command=self.refresh_all).grid(
+        ttk.Button(tab, text="Обновить данные", command=lambda: self.refresh_all(force=True)).grid(
             row=1, column=0, pady=5
         )
         ttk.Button(
             tab, text="Исполнить запланированные", command=self._ui_run_contracts
         ).grid(row=2, column=0, pady=5, sticky="ew")
 
-    def _build_consensus_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Консенсус")
+    def _build_consensus_tab(self, tab) -> None:
         tab.columnconfigure(0, weight=1)
         tab.rowconfigure(0, weight=1)
         tab.rowconfigure(1, weight=1)
@@ -796,7 +1870,7 @@ class DigitalRubleApp(tk.Tk):
         bottom_frame.columnconfigure(0, weight=1)
         bottom_frame.rowconfigure(1, weight=1)
         
-        ttk.Label(bottom_frame, text="События консенсуса", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(bottom_frame, text="События консенсуса", style="Header.TLabel").grid(
             row=0, column=0, sticky="w", padx=10, pady=(0, 5)
         )
         columns = ["Блок/Транзакция", "Событие", "Узел", "Состояние", "Время"]
@@ -842,14 +1916,12 @@ class DigitalRubleApp(tk.Tk):
             command=self._ui_export_failure_recovery_log,
         ).pack(side=tk.LEFT, padx=5, pady=5)
 
-    def _build_ledger_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Распределенный реестр")
+    def _build_ledger_tab(self, tab) -> None:
         tab.columnconfigure(0, weight=1)
         tab.rowconfigure(1, weight=1)
         tab.rowconfigure(3, weight=1)
 
-        ttk.Label(tab, text="Блоки распределенного реестра", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(tab, text="Блоки распределенного реестра", style="Header.TLabel").grid(
             row=0, column=0, sticky="w", padx=10, pady=(10, 5)
         )
         table_frame = ttk.Frame(tab)
@@ -861,10 +1933,11 @@ class DigitalRubleApp(tk.Tk):
             table_frame,
             ["Номер блока", "Хеш блока", "Хеш родителя", "Количество транзакций", "Время создания"],
             stretch=True,
+            virtual=True,
         )
         self.block_table.bind("<Double-1>", self._on_block_row_double_click)
 
-        ttk.Label(tab, text="UTXO (Незатраченные выходы транзакций)", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(tab, text="UTXO (Незатраченные выходы транзакций)", style="Header.TLabel").grid(
             row=2, column=0, sticky="w", padx=10, pady=(10, 5)
         )
         utxo_frame = ttk.Frame(tab)
@@ -875,6 +1948,7 @@ class DigitalRubleApp(tk.Tk):
             utxo_frame,
             ["ID", "Владелец", "Сумма", "Статус", "Транзакция создания", "Транзакция списания"],
             stretch=True,
+            virtual=True,
         )
         self.utxo_table.bind("<Double-1>", self._on_utxo_row_double_click)
 
@@ -882,9 +1956,7 @@ class DigitalRubleApp(tk.Tk):
             row=4, column=0, pady=5
         )
 
-    def _build_activity_tab(self) -> None:
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Информация о событиях системы")
+    def _build_activity_tab(self, tab) -> None:
         tab.rowconfigure(1, weight=1)
         tab.columnconfigure(0, weight=1)
 
@@ -892,7 +1964,7 @@ class DigitalRubleApp(tk.Tk):
         control_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 5))
         control_frame.columnconfigure(1, weight=1)
         
-        ttk.Label(control_frame, text="Журнал активности", font=("TkDefaultFont", 11, "bold")).grid(
+        ttk.Label(control_frame, text="Журнал активности", style="Header.TLabel").grid(
             row=0, column=0, sticky="w"
         )
         
@@ -900,19 +1972,21 @@ class DigitalRubleApp(tk.Tk):
         filter_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
         
         ttk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT, padx=(0, 5))
-        self.activity_filter_combo = ttk.Combobox(filter_frame, values=["Все", "Транзакции", "Смарт-контракты", "Эмиссия", "Блоки", "Консенсус"], state="readonly", width=15)
+        self.activity_filter_combo = ttk.Combobox(filter_frame, values=_FILTER_CATEGORIES, state="readonly", width=15)
         self.activity_filter_combo.pack(side=tk.LEFT, padx=5)
         self.activity_filter_combo.set("Все")
-        self.activity_filter_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh_all())
+        self.activity_filter_combo.bind("<<ComboboxSelected>>", lambda e: self._apply_activity_filter())
         
         ttk.Label(filter_frame, text="Поиск:").pack(side=tk.LEFT, padx=(10, 5))
         self.activity_search_entry = ttk.Entry(filter_frame, width=20)
         self.activity_search_entry.pack(side=tk.LEFT, padx=5)
-        self.activity_search_entry.bind("<KeyRelease>", lambda e: self.refresh_all())
+        self.activity_search_entry.bind("<KeyRelease>", lambda e: self._schedule_search_refresh(self._apply_activity_filter))
         self._add_entry_menu(self.activity_search_entry)
         
-        ttk.Button(filter_frame, text="Экспорт CSV", command=lambda: self._export_activity_log_csv()).pack(side=tk.LEFT, padx=5)
-        ttk.Button(filter_frame, text="Экспорт JSON", command=lambda: self._export_activity_log_json()).pack(side=tk.LEFT, padx=5)
+        for text, command in (("Экспорт CSV", self._export_activity_log_csv), ("Экспорт JSON", self._export_activity_log_json)):
+            button = ttk.Button(filter_frame, text=text, command=command)
+            button.pack(side=tk.LEFT, padx=5)
+            self._log_export_buttons.append(button)
         
         container = ttk.Frame(tab)
         container.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
@@ -920,11 +1994,17 @@ class DigitalRubleApp(tk.Tk):
         container.rowconfigure(0, weight=1)
         y_scroll = ttk.Scrollbar(container, orient="vertical")
         y_scroll.grid(row=0, column=1, sticky="ns")
-        self.activity_text = tk.Text(container, yscrollcommand=y_scroll.set)
+        self.activity_text = tk.Text(
+            container, yscrollcommand=y_scroll.set, font="AppTextFont", undo=False, state=tk.DISABLED
+        )
         self.activity_text.grid(row=0, column=0, sticky="nsew")
         y_scroll.config(command=self.activity_text.yview)
         self._add_copy_menu(self.activity_text)
-        self._setup_text_zoom(self.activity_text)
+        for tag, color in _ACTIVITY_TAG_COLORS.items():
+            self.activity_text.tag_configure(tag, foreground=color)
+        self._setup_text_zoom(self.activity_text, _ACTIVITY_TAG_FONTS)
+        self._activity_view = PagedLog(self.activity_text, y_scroll, self._activity_log_chunks, self._append_log)
+        self._paged_logs[id(self.activity_text)] = self._activity_view
         self.errors_table = None
 
     def _on_tx_row_double_click(self, event) -> None:
@@ -933,171 +2013,74 @@ class DigitalRubleApp(tk.Tk):
         item_id = self.tx_table.focus()
         if not item_id:
             return
-        values = self.tx_table.item(item_id, "values")
+        values = self._row_values(self.tx_table, item_id)
         if not values:
             return
         tx_id = values[0]
-        try:
-            tx = self.platform.get_transaction(tx_id)
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-            return
+        self._open_narrative(
+            self.tx_table,
+            tx_id,
+            lambda: self._collect_tx_narrative_data(tx_id),
+            "Этапы обработки транзакции",
+        )
+
+    def _collect_tx_narrative_data(self, tx_id) -> str:
+        tx = self.platform.get_transaction(tx_id)
         
         try:
-            sender_obj = self.platform.get_user(tx["sender_id"])
+            sender_obj = self._user_cache(tx["sender_id"])
             sender_name = sender_obj["name"]
         except (ValueError, KeyError):
             sender_name = f"ID {tx['sender_id']} (не найден)"
         
         try:
-            receiver_obj = self.platform.get_user(tx["receiver_id"])
+            receiver_obj = self._user_cache(tx["receiver_id"])
             receiver_name = receiver_obj["name"]
         except (ValueError, KeyError):
             receiver_name = f"ID {tx['receiver_id']} (не найден)"
         
         try:
-            bank_obj = self.platform._get_bank(tx["bank_id"])
+            bank_obj = self._bank_cache(tx["bank_id"])
             bank_name = bank_obj["name"]
         except (ValueError, KeyError):
             bank_name = f"ID {tx['bank_id']} (не найден)"
         
-        core_str = f"{tx['id']}:{tx['sender_id']}:{tx['receiver_id']}:{tx['amount']}:{tx['timestamp']}"
-        tx_hash_for_sig = self.platform._get_transaction_hash_for_signing(
+        tx_hash_for_sig = self._tx_signing_hash(
             tx['id'], tx['sender_id'], tx['receiver_id'], tx['amount'], tx['timestamp']
         )
-        block_row = self.platform.db.execute(
-            """
-            SELECT b.height, b.hash
-            FROM blocks b
-            JOIN block_transactions bt ON bt.block_id = b.id
-            WHERE bt.tx_id = ?
-            ORDER BY b.height ASC
-            LIMIT 1
-            """,
+        block_row = self.platform.db_ro.execute(
+            _BLOCK_FOR_TX_SQL,
             (tx["id"],),
             fetchone=True,
         )
-        lines: list[str] = []
-        lines.append(f"Жизненный цикл транзакции {tx['id']}")
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append("ЭТАП 1: ИНИЦИАЦИЯ ТРАНЗАКЦИИ")
-        lines.append(f"  • Отправитель: {sender_name} (ID {tx['sender_id']})")
-        lines.append(f"  • Получатель: {receiver_name} (ID {tx['receiver_id']})")
-        lines.append(f"  • Сумма: {tx['amount']:.2f} ЦР")
-        lines.append(f"  • Банк (ФО): {bank_name} (ID {tx['bank_id']})")
-        lines.append(f"  • Тип транзакции: {tx.get('tx_type', 'ONLINE')}")
-        lines.append(f"  • Временная метка: {tx['timestamp']}")
-        lines.append("")
-        lines.append("ЭТАП 2: ФОРМИРОВАНИЕ КАНОНИЧЕСКОЙ СТРОКИ")
-        lines.append("  Формируется строка core, содержащая основные данные транзакции:")
-        lines.append(f"    core = {tx['id']}:{tx['sender_id']}:{tx['receiver_id']}:{tx['amount']}:{tx['timestamp']}")
-        lines.append("")
-        lines.append("ЭТАП 3: ВЫЧИСЛЕНИЕ ХЕША ТРАНЗАКЦИИ")
-        lines.append("  Хеш вычисляется по алгоритму Streebog-256 (ГОСТ Р 34.11-2018):")
-        lines.append(f"    H = Streebog-256(core)")
-        lines.append(f"    tx.hash = {tx['hash']}")
-        lines.append("  Хеш транзакции используется для:")
-        lines.append("    • идентификации транзакции в распределенном реестре")
-        lines.append("    • вычисления Merkle-корня блока")
-        lines.append("    • связи блоков через previous_hash")
-        lines.append("")
-        lines.append("ЭТАП 4: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) ПОЛЬЗОВАТЕЛЯ")
-        lines.append("  Алгоритм подписания по ГОСТ 34.10-2018:")
-        lines.append("    1. Вычисляется хеш для подписи: H_sig = Streebog-256(core)")
-        lines.append(f"       Хеш для подписи: {tx_hash_for_sig}")
-        lines.append("    2. Выбирается эллиптическая кривая с параметрами:")
-        lines.append("       • Модуль p (простое число)")
-        lines.append("       • Порядок группы q")
-        lines.append("       • Коэффициенты a, b уравнения кривой")
-        lines.append("       • Генерирующая точка P")
-        lines.append("    3. Генерируется случайное число k ∈ [1, q-1]")
-        lines.append("    4. Вычисляется точка эллиптической кривой: C = k * P")
-        lines.append("    5. Вычисляется r = Cx mod q")
-        lines.append("       Если r = 0, выбирается новое k и повторяется шаг 4")
-        lines.append("    6. Вычисляется s = (r * d + k * H_sig) mod q")
-        lines.append("       где d - приватный ключ пользователя")
-        lines.append("       Если s = 0, выбирается новое k и повторяется шаг 4")
-        lines.append("    7. ЭЦП = (r, s) - пара 256-битных чисел")
-        if tx.get("user_sig"):
-            lines.append(f"  Результат: ЭЦП пользователя сохранена")
-            lines.append(f"    Формат: JSON строка с полями 'r' и 's'")
-            lines.append(f"    Значение: {tx['user_sig'][:100]}...")
-        else:
-            lines.append("  ЭЦП пользователя отсутствует (демонстрационный режим).")
-        lines.append("")
-        lines.append("ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ БАНКА (ФО)")
-        if tx.get("bank_sig"):
-            lines.append("  Банк формирует ЭЦП по тому же хешу транзакции:")
-            lines.append(f"    Хеш для подписи: {tx_hash_for_sig}")
-            lines.append("  Процесс идентичен процессу для пользователя:")
-            lines.append("    1. Вычисляется хеш сообщения: H_sig = Streebog-256(core)")
-            lines.append("    2. Генерируется случайное число k ∈ [1, q-1]")
-            lines.append("    3. Вычисляется точка эллиптической кривой: C = k * P")
-            lines.append("    4. Вычисляется r = Cx mod q (если r=0, повторяется с новым k)")
-            lines.append("    5. Вычисляется s = (r * d_bank + k * H_sig) mod q (если s=0, повторяется)")
-            lines.append("    6. ЭЦП банка = (r, s)")
-            lines.append(f"  Электронная цифровая подпись банка (ФО) сохранена")
-            lines.append(f"    Формат: JSON строка с полями 'r' и 's' (256-битные числа)")
-        else:
-            lines.append("  Электронная цифровая подпись банка (ФО) отсутствует (демонстрационный режим).")
-        lines.append("")
-        lines.append("ЭТАП 6: ВАЛИДАЦИЯ ПОДПИСЕЙ")
-        lines.append("  Система проверяет валидность подписей:")
-        lines.append("    • Проверка ЭЦП пользователя: верификация подписи по публичному ключу отправителя")
-        lines.append("    • Проверка электронной цифровой подписи банка (ФО): верификация подписи по публичному ключу банка")
-        lines.append("    • При невалидной подписи транзакция отклоняется")
-        lines.append("")
-        lines.append("ЭТАП 7: ОБРАБОТКА ТРАНЗАКЦИИ")
-        if tx.get('tx_type') == 'OFFLINE':
-            lines.append("  Для оффлайн-транзакций:")
-            lines.append("    • Проверка UTXO отправителя")
-            lines.append("    • Выбор UTXO для покрытия суммы")
-            lines.append("    • Создание выходных UTXO для получателя и сдачи")
-        else:
-            lines.append("  Для онлайн-транзакций:")
-            lines.append("    • Проверка баланса отправителя")
-            lines.append("    • Списание средств с баланса отправителя")
-            lines.append("    • Зачисление средств на баланс получателя")
-        lines.append("")
-        lines.append("ЭТАП 8: ВКЛЮЧЕНИЕ В БЛОК РАСПРЕДЕЛЁННОГО РЕЕСТРА")
-        if block_row:
-            lines.append(f"  Транзакция включена в блок #{block_row['height']}")
-            lines.append(f"    Хеш блока: {block_row['hash']}")
-            lines.append("    Связь транзакции с блоком устанавливается через block_transactions")
-        else:
-            lines.append("  Транзакция включена в блок (обработка выполняется автоматически)")
-            lines.append("    Все транзакции со статусом CONFIRMED автоматически включаются в блок")
-        lines.append("")
-        lines.append("ЭТАП 9: РЕПЛИКАЦИЯ НА УЗЛЫ")
-        lines.append("  Распределение блока по узлам сети:")
-        lines.append("    • Центральный банк РФ (главный реестр): блок присутствует ✓")
-        banks = self.platform.list_banks()
-        for bank in banks:
-            lines.append(f"    • {bank['name']} (ФО): блок присутствует ✓")
-        total_nodes = 1 + len(banks)
-        lines.append(f"  Всего узлов с блоком: {total_nodes}/{total_nodes}")
-        lines.append("")
-        lines.append("ЭТАП 10: ФИНАЛИЗАЦИЯ")
-        lines.append("  Транзакция считается завершённой после:")
-        lines.append("    • Включения в блок распределённого реестра")
-        lines.append("    • Репликации на все узлы сети")
-        lines.append("    • Подтверждения консенсусом (RAFT)")
-        export_payload = {
-            "type": "transaction",
-            "id": tx["id"],
-            "sender_id": tx["sender_id"],
-            "receiver_id": tx["receiver_id"],
-            "amount": tx["amount"],
-            "tx_type": tx["tx_type"],
-            "channel": tx["channel"],
-            "bank_id": tx["bank_id"],
-            "timestamp": tx["timestamp"],
-            "hash": tx["hash"],
-        }
+        return _render_tx_narrative(
+            tx, sender_name, receiver_name, bank_name, tx_hash_for_sig, block_row, self.platform.list_banks()
+        )
+
+    def _open_narrative(self, table, row_id, collect, title: str) -> None:
+        key = (id(table), row_id)
+        if key in self._pending_narratives:
+            return
+        self._pending_narratives.add(key)
+        table.configure(cursor="watch")
+
+        def on_done(future) -> None:
+            self._pending_narratives.discard(key)
+            if not any(pending[0] == id(table) for pending in self._pending_narratives):
+                table.configure(cursor="")
+            self._display_narrative(title, future)
+
+        self._run_in_background(collect, on_done, self._read_executor)
+
+    def _display_narrative(self, title: str, future) -> None:
+        try:
+            text = future.result()
+        except Exception as exc:
+            messagebox.showerror("Ошибка", str(exc))
+            return
         self._show_steps_window(
-            "Этапы обработки транзакции",
-            lines,
+            title,
+            text,
             export_handler=None,
             export_plain_handler=None,
         )
@@ -1108,17 +2091,21 @@ class DigitalRubleApp(tk.Tk):
         item_id = self.offline_table.focus()
         if not item_id:
             return
-        values = self.offline_table.item(item_id, "values")
+        values = self._row_values(self.offline_table, item_id)
         if not values:
             return
         tx_id = values[0]
+        self._open_narrative(
+            self.offline_table,
+            tx_id,
+            lambda: self._collect_offline_tx_narrative_data(tx_id),
+            "Этапы оффлайн‑транзакции",
+        )
+
+    def _collect_offline_tx_narrative_data(self, tx_id) -> str:
+        tx = self.platform.get_offline_transaction(tx_id)
         try:
-            tx = self.platform.get_offline_transaction(tx_id)
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-            return
-        try:
-            sender = self.platform.get_user(tx["sender_id"])
+            sender = self._user_cache(tx["sender_id"])
         except (ValueError, KeyError):
             sender = {
                 "id": tx["sender_id"],
@@ -1129,7 +2116,7 @@ class DigitalRubleApp(tk.Tk):
             }
 
         try:
-            receiver = self.platform.get_user(tx["receiver_id"])
+            receiver = self._user_cache(tx["receiver_id"])
         except (ValueError, KeyError):
             receiver = {
                 "id": tx["receiver_id"],
@@ -1137,158 +2124,69 @@ class DigitalRubleApp(tk.Tk):
             }
 
         try:
-            bank = self.platform._get_bank(tx["bank_id"])
+            bank = self._bank_cache(tx["bank_id"])
         except (ValueError, KeyError):
             bank = {
                 "id": tx["bank_id"],
                 "name": f"ID {tx['bank_id']} (не найден)",
             }
-        block_row = self.platform.db.execute(
-            """
-            SELECT b.height, b.hash
-            FROM blocks b
-            JOIN block_transactions bt ON bt.block_id = b.id
-            WHERE bt.tx_id = ?
-            ORDER BY b.height ASC
-            LIMIT 1
-            """,
+        block_row = self.platform.db_ro.execute(
+            _BLOCK_FOR_TX_SQL,
             (tx["id"],),
             fetchone=True,
         )
-        utxos_in = self.platform.db.execute(
-            "SELECT * FROM utxos WHERE spent_tx_id = ? ORDER BY created_at ASC",
-            (tx_id,),
-            fetchall=True,
-        ) or []
-        utxos_out = self.platform.db.execute(
-            "SELECT * FROM utxos WHERE created_tx_id = ? ORDER BY created_at ASC",
-            (tx_id,),
+        utxo_rows = self.platform.db_ro.execute(
+            """
+            SELECT *, CASE WHEN spent_tx_id = ? THEN 'in' ELSE 'out' END AS side
+            FROM utxos
+            WHERE spent_tx_id = ? OR created_tx_id = ?
+            ORDER BY created_at ASC
+            """,
+            (tx_id, tx_id, tx_id),
             fetchall=True,
         ) or []
-        lines: list[str] = []
-        lines.append(f"Жизненный цикл оффлайн-транзакции {tx_id}")
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append("ЭТАП 1: ПОДГОТОВКА ОФФЛАЙН‑КОШЕЛЬКА И UTXO")
-        lines.append(f"  Отправитель: {sender['name']} (ID {sender['id']})")
-        lines.append(f"  Статус оффлайн‑кошелька: {self._translate_wallet_status(sender['offline_status'])}")
-        lines.append(f"  Активация: {sender.get('offline_activated_at') or '-'}")
-        lines.append(f"  Окончание: {sender.get('offline_expires_at') or '-'}")
-        lines.append("")
-        lines.append("ЭТАП 2: ФОРМИРОВАНИЕ ОФФЛАЙН‑ТРАНЗАКЦИИ")
-        lines.append(f"  Отправитель: {sender['name']} (ID {sender['id']})")
-        lines.append(f"  Получатель: {receiver['name']} (ID {receiver['id']})")
-        lines.append(f"  Банк (ФО): {bank['name']}")
-        lines.append(f"  Сумма: {tx['amount']:.2f} ЦР")
-        lines.append("  Процесс формирования:")
-        lines.append("    • Выбор параметров: отправитель, получатель, банк, сумма")
-        lines.append("    • Выбор UTXO для покрытия суммы (один UTXO в диапазоне [amount, 2*amount])")
-        lines.append("    • Расчёт сдачи (change = UTXO_amount - amount)")
-        lines.append("    • Формирование offline_tx_core с входами, выходами и метаданными")
-        lines.append("")
-        lines.append("ЭТАП 3: ВЫБОР UTXO (ВХОДЫ)")
-        total_in = 0.0
-        if utxos_in:
-            for u in utxos_in:
-                lines.append(f"  UTXO {u['id']} на сумму {u['amount']:.2f} ЦР")
-                total_in += u["amount"]
-        else:
-            lines.append("  Для этой транзакции не найдено списанных UTXO")
-        lines.append(f"  Итого по входам: {total_in:.2f} ЦР")
-        lines.append("")
-        lines.append("ЭТАП 4: СОЗДАНИЕ ВЫХОДНЫХ UTXO")
-        if utxos_out:
-            for u in utxos_out:
-                lines.append(f"  UTXO {u['id']} на сумму {u['amount']:.2f} ЦР (owner_id={u['owner_id']})")
-            lines.append("  Создаётся один выходной UTXO для получателя на сумму транзакции")
-            lines.append("  Если есть сдача, создаётся дополнительный UTXO для отправителя")
-        else:
-            lines.append("  Новые UTXO по этой транзакции ещё не созданы (ожидание синхронизации).")
-        lines.append("")
-        lines.append("ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) ОФФЛАЙН‑ТРАНЗАКЦИИ")
-        tx_hash_for_sig = self.platform._get_transaction_hash_for_signing(
+        utxos_in = [u for u in utxo_rows if u["side"] == "in"]
+        utxos_out = [u for u in utxo_rows if u["side"] == "out"]
+        tx_hash_for_sig = self._tx_signing_hash(
             tx['id'], tx['sender_id'], tx['receiver_id'], tx['amount'], tx['timestamp']
         )
-        lines.append("  Процесс подписания по ГОСТ 34.10-2018:")
-        lines.append("    1. Формирование канонической строки (core):")
-        lines.append(f"       core = {tx['id']}:{tx['sender_id']}:{tx['receiver_id']}:{tx['amount']}:{tx['timestamp']}")
-        lines.append("    2. Вычисление хеша сообщения:")
-        lines.append(f"       H_sig = Streebog-256(core) = {tx_hash_for_sig}")
-        lines.append("    3. Генерация ЭЦП пользователя:")
-        lines.append("       • Выбирается эллиптическая кривая с параметрами (p, q, a, b, P)")
-        lines.append("       • Генерируется случайное число k ∈ [1, q-1]")
-        lines.append("       • Вычисляется точка C = k * P")
-        lines.append("       • Вычисляется r = Cx mod q (если r=0, повторяется с новым k)")
-        lines.append("       • Вычисляется s = (r * d_user + k * H_sig) mod q (если s=0, повторяется)")
-        lines.append("       • ЭЦП пользователя = (r, s)")
-        if tx.get("user_sig"):
-            lines.append(f"    4. ЭЦП пользователя сохранена: {tx['user_sig'][:80]}...")
-        lines.append("    5. Электронная цифровая подпись банка (ФО) формируется аналогично")
-        if tx.get("bank_sig"):
-            lines.append(f"    6. Электронная цифровая подпись банка (ФО) сохранена: {tx['bank_sig'][:80]}...")
-        lines.append("  Важно: хеш транзакции НЕ изменяется при подписании ЭЦП")
-        lines.append("")
-        lines.append("ЭТАП 6: ЛОКАЛЬНОЕ ХРАНЕНИЕ")
-        lines.append("  Оффлайн-транзакция сохраняется локально на устройстве пользователя")
-        lines.append("  Статус: CREATED (ожидает синхронизации)")
-        lines.append("")
-        lines.append("ЭТАП 7: СИНХРОНИЗАЦИЯ С ЦБ")
-        lines.append("  Процесс синхронизации:")
-        lines.append("    1. Отправка батча оффлайн-транзакций на ЦБ")
-        lines.append("    2. Расшифровка и проверка на стороне ЦБ:")
-        lines.append("       • Расшифровка offline_tx_core и sig_user_offline")
-        lines.append("       • Проверка ЭЦП пользователя")
-        lines.append("       • Проверка, что UTXO не были потрачены ранее (защита от двойной траты)")
-        lines.append("    3. Подтверждение или отклонение:")
-        lines.append("       • При успехе: создаётся транзакция в общем реестре (тип OFFLINE_SYNC)")
-        lines.append("       • При конфликте: транзакция отклоняется с указанием причины")
-        lines.append(f"  Статус: {tx.get('offline_status', '-')}")
-        lines.append(f"  Время синхронизации: {tx.get('synced_at') or '-'}")
-        if tx.get("conflict_reason"):
-            lines.append(f"  Причина конфликта: {tx['conflict_reason']}")
-        lines.append("")
-        lines.append("ЭТАП 8: ВКЛЮЧЕНИЕ В БЛОК РАСПРЕДЕЛЁННОГО РЕЕСТРА")
-        if block_row:
-            lines.append(f"  Транзакция включена в блок #{block_row['height']}")
-            lines.append(f"    Хеш блока: {block_row['hash']}")
-            lines.append("    Связь транзакции с блоком устанавливается через block_transactions")
-        else:
-            lines.append("  Транзакция включена в блок (обработка выполняется автоматически)")
-            lines.append("    После синхронизации с ЦБ транзакция автоматически включается в блок")
-        lines.append("")
-        lines.append("ЭТАП 9: РЕПЛИКАЦИЯ НА УЗЛЫ")
-        lines.append("  Распределение блока по узлам сети:")
-        lines.append("    • Центральный банк РФ (главный реестр): блок присутствует ✓")
-        banks = self.platform.list_banks()
-        for bank in banks:
-            lines.append(f"    • {bank['name']} (ФО): блок присутствует ✓")
-        total_nodes = 1 + len(banks)
-        lines.append(f"  Всего узлов с блоком: {total_nodes}/{total_nodes}")
-        lines.append("")
-        lines.append("ЭТАП 10: ФИНАЛИЗАЦИЯ")
-        lines.append("  Оффлайн-транзакция считается завершённой после:")
-        lines.append("    • Синхронизации с ЦБ")
-        lines.append("    • Включения в блок распределённого реестра")
-        lines.append("    • Репликации на все узлы сети")
-        lines.append("    • Подтверждения консенсусом (RAFT)")
-        export_payload = {
-            "type": "offline_transaction",
-            "id": tx["id"],
-            "sender_id": tx["sender_id"],
-            "receiver_id": tx["receiver_id"],
-            "amount": tx["amount"],
-            "bank_id": tx["bank_id"],
-            "timestamp": tx["timestamp"],
-            "offline_status": tx.get("offline_status"),
-            "synced_at": tx.get("synced_at"),
-            "conflict_reason": tx.get("conflict_reason"),
-        }
-        self._show_steps_window(
-            "Этапы оффлайн‑транзакции",
-            lines,
-            export_handler=None,
-            export_plain_handler=None,
+        return _render_offline_tx_narrative(
+            tx,
+            sender,
+            receiver,
+            bank,
+            self._translate_wallet_status(sender['offline_status']),
+            tx_hash_for_sig,
+            block_row,
+            utxos_in,
+            utxos_out,
+            self.platform.list_banks(),
+        )
+
+    def _fetch_contract_context(self, contract_id):
+        schemas = []
+        for bank in self.platform.list_banks():
+            try:
+                schema = self._attached_bank_schema(bank['id'])
+            except Exception:
+                schema = None
+            if schema:
+                schemas.append(schema)
+        users_sql = " UNION ALL ".join(f"SELECT id, name FROM {schema}.users" for schema in schemas)
+        row = self.platform.db_ro.execute(
+            _CONTRACT_CONTEXT_SQL.format(users=users_sql or "SELECT NULL AS id, NULL AS name WHERE 0"),
+            (contract_id,),
+            fetchone=True,
         )
+        if not row:
+            raise ValueError("Смарт-контракт не найден")
+        return row
+
+    def _user_name_fallback(self, user_id) -> str:
+        try:
+            return self._user_cache(user_id)["name"]
+        except (ValueError, KeyError):
+            return f"ID {user_id} (не найден)"
 
     def _on_contract_row_double_click(self, event) -> None:
         if not self.contract_table:
@@ -1296,104 +2194,79 @@ class DigitalRubleApp(tk.Tk):
         item_id = self.contract_table.focus()
         if not item_id:
             return
-        values = self.contract_table.item(item_id, "values")
+        values = self._row_values(self.contract_table, item_id)
         if not values:
             return
         contract_id = values[0]
-        try:
-            sc = self.platform.get_smart_contract(contract_id)
-        except Exception as exc:
-            messagebox.showerror("Ошибка", str(exc))
-            return
-        try:
-            creator = self.platform.get_user(sc["creator_id"])
-        except (ValueError, KeyError):
-            creator = {
-                "id": sc["creator_id"],
-                "name": f"ID {sc['creator_id']} (не найден)",
-            }
-        
-        try:
-            beneficiary = self.platform.get_user(sc["beneficiary_id"])
-        except (ValueError, KeyError):
-            beneficiary = {
-                "id": sc["beneficiary_id"],
-                "name": f"ID {sc['beneficiary_id']} (не найден)",
-            }
-        
-        try:
-            bank = self.platform._get_bank(sc["bank_id"])
-        except (ValueError, KeyError):
-            bank = {
-                "id": sc["bank_id"],
-                "name": f"ID {sc['bank_id']} (не найден)",
-            }
-        lines: list[str] = []
-        lines.append(f"Жизненный цикл смарт‑контракта {contract_id}")
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append("ЭТАП 1: СОЗДАНИЕ СМАРТ‑КОНТРАКТА")
-        lines.append(f"  Плательщик: {creator['name']} (ID {creator['id']})")
-        lines.append(f"  Получатель: {beneficiary['name']} (ID {beneficiary['id']})")
-        lines.append(f"  Банк (ФО): {bank['name']}")
-        lines.append(f"  Сумма: {sc['amount']:.2f} ЦР")
-        lines.append(f"  Описание: {sc['description']}")
-        lines.append(f"  График (schedule): {sc['schedule']}")
-        lines.append(f"  Следующее исполнение (next_execution): {sc['next_execution']}")
-        lines.append("  Процесс создания:")
-        lines.append("    • Ввод параметров: плательщик, получатель, сумма, условия, периодичность")
-        lines.append("    • Формирование объекта contract_core с идентификатором и параметрами графика")
-        lines.append("    • Связывание с участниками и их кошельками")
-        lines.append("")
-        lines.append("ЭТАП 2: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ (ЭЦП) СМАРТ‑КОНТРАКТА")
-        contract_hash = _hash_str(f"{contract_id}:{sc['creator_id']}:{sc['beneficiary_id']}:{sc['amount']}:{sc['next_execution']}")
-        lines.append("  Процесс подписания по ГОСТ 34.10-2018:")
-        lines.append("    1. Формирование канонической строки (core):")
-        lines.append(f"       core = {contract_id}:{sc['creator_id']}:{sc['beneficiary_id']}:{sc['amount']}:{sc['next_execution']}")
-        lines.append("    2. Вычисление хеша сообщения:")
-        lines.append(f"       H = Streebog-256(core) = {contract_hash}")
-        lines.append("    3. Генерация ЭЦП создателя:")
-        lines.append("       • Выбирается эллиптическая кривая с параметрами (p, q, a, b, P)")
-        lines.append("       • Генерируется случайное число k ∈ [1, q-1]")
-        lines.append("       • Вычисляется точка C = k * P")
-        lines.append("       • Вычисляется r = Cx mod q (если r=0, повторяется)")
-        lines.append("       • Вычисляется s = (r * d_creator + k * H) mod q (если s=0, повторяется)")
-        lines.append("       • ЭЦП создателя = (r, s)")
-        lines.append("    4. Электронная цифровая подпись банка (ФО) формируется аналогично")
-        lines.append("       Банк подтверждает регистрацию контракта своей подписью")
-        lines.append("")
-        lines.append("ЭТАП 3: РЕГИСТРАЦИЯ СМАРТ‑КОНТРАКТА")
-        lines.append("  Смарт-контракт регистрируется в системе со статусом SCHEDULED")
-        lines.append("  Устанавливается следующее время исполнения (next_execution)")
-        lines.append("")
-        lines.append("ЭТАП 4: ИСПОЛНЕНИЕ СМАРТ‑КОНТРАКТА")
-        lines.append("  Процесс исполнения:")
-        lines.append("    1. Выбор контрактов, подлежащих исполнению:")
-        lines.append("       • Проверка расписания (next_execution <= текущее время)")
-        lines.append("       • Проверка статуса контракта (SCHEDULED)")
-        lines.append("    2. Проверка условий:")
-        lines.append("       • Проверка достаточности digital_balance плательщика")
-        lines.append("       • Проверка срока действия контракта")
-        lines.append("    3. Формирование транзакции типа CONTRACT:")
-        lines.append("       • Создание транзакции с параметрами контракта")
-        lines.append("       • Обработка через _finalize_transaction")
-        lines.append("    4. Обновление статуса контракта:")
-        lines.append("       • При успехе: статус EXECUTED, обновление next_execution")
-        lines.append("       • При ошибке: статус FAILED, ошибка регистрируется в системе")
-        last_tx_id = sc.get("last_tx_id")
+        self._open_narrative(
+            self.contract_table,
+            contract_id,
+            lambda: self._collect_contract_narrative_data(contract_id),
+            "Этапы работы смарт‑контракта",
+        )
+
+    def _collect_contract_narrative_data(self, contract_id) -> str:
+        sc = self._fetch_contract_context(contract_id)
+        creator = {
+            "id": sc["creator_id"],
+            "name": sc["creator_name"] or self._user_name_fallback(sc["creator_id"]),
+        }
+        beneficiary = {
+            "id": sc["beneficiary_id"],
+            "name": sc["beneficiary_name"] or self._user_name_fallback(sc["beneficiary_id"]),
+        }
+        bank = {
+            "id": sc["bank_id"],
+            "name": sc["bank_name"] or f"ID {sc['bank_id']} (не найден)",
+        }
+        lines: list[str] = [
+            _CONTRACT_HEADER_TEMPLATE.format(
+                contract_id=contract_id,
+                creator_name=creator['name'],
+                creator_id=creator['id'],
+                beneficiary_name=beneficiary['name'],
+                beneficiary_id=beneficiary['id'],
+                bank_name=bank['name'],
+                amount=sc['amount'],
+                description=sc['description'],
+                schedule=sc['schedule'],
+                next_execution=sc['next_execution'],
+            ),
+            *_CONTRACT_CREATION_STEPS,
+        ]
+        contract_core = f"{contract_id}:{sc['creator_id']}:{sc['beneficiary_id']}:{sc['amount']}:{sc['next_execution']}"
+        lines.append(_CONTRACT_SIGNING_TEMPLATE.format(core=contract_core, contract_hash=_hash_str(contract_core)))
+        lines.extend(_CONTRACT_SIGNING_AND_EXECUTION_STEPS)
+        last_tx_id = sc["last_tx_id"]
         if last_tx_id:
-            block_row = self.platform.db.execute(
-                """
-                SELECT b.height, b.hash
-                FROM blocks b
-                JOIN block_transactions bt ON bt.block_id = b.id
-                WHERE bt.tx_id = ?
-                ORDER BY b.height ASC
-                LIMIT 1
-                """,
-                (last_tx_id,),
-                fetchone=True,
+            sources = [("Центральный банк РФ (главный реестр)", "main")]
+            for bank in self.platform.list_banks():
+                try:
+                    schema = self._attached_bank_schema(bank['id'])
+                except Exception:
+                    schema = None
+                sources.append((f"{bank['name']} (ФО)", schema, bank['id']))
+            attached = [(idx, source[1]) for idx, source in enumerate(sources) if source[1]]
+            union_sql = " UNION ALL ".join(
+                f"SELECT {idx} AS idx, hash FROM {schema}.blocks WHERE height = ?"
+                for idx, schema in attached
             )
+            found = {}
+            union_failed = False
+            with self.platform.db_ro.transaction():
+                block_row = self.platform.db_ro.execute(
+                    _BLOCK_FOR_TX_SQL,
+                    (last_tx_id,),
+                    fetchone=True,
+                )
+                if block_row:
+                    try:
+                        rows = self.platform.db_ro.execute(
+                            union_sql, (block_row['height'],) * len(attached), fetchall=True
+                        )
+                        found = {row['idx']: row['hash'] for row in rows}
+                    except Exception:
+                        union_failed = True
             lines.append("")
             lines.append("5. Связь смарт‑контракта с блоками реестра")
             lines.append(f"  Последняя транзакция исполнения (tx_id): {last_tx_id}")
@@ -1403,74 +2276,43 @@ class DigitalRubleApp(tk.Tk):
                 lines.append("    Связь транзакции с блоком устанавливается через block_transactions")
                 lines.append("")
                 lines.append("  Распределение блока по узлам сети:")
-                banks = self.platform.list_banks()
                 block_height = block_row['height']
                 block_hash = block_row['hash']
-                nodes_with_block = []
-                nodes_without_block = []
-                
-                try:
-                    cbr_block = self.platform.db.execute(
-                        "SELECT height, hash FROM blocks WHERE height = ?",
-                        (block_height,),
-                        fetchone=True
-                    )
-                    if cbr_block and cbr_block['hash'] == block_hash:
-                        nodes_with_block.append("Центральный банк РФ (главный реестр)")
-                    else:
-                        nodes_without_block.append("Центральный банк РФ (главный реестр)")
-                except Exception:
-                    nodes_without_block.append("Центральный банк РФ (главный реестр) - ошибка проверки")
                 
-                for bank in banks:
+                def check_bank(bank_id):
                     try:
-                        from database import DatabaseManager
-                        bank_db = DatabaseManager(f"bank_{bank['id']}.db")
-                        bank_block = bank_db.execute(
-                            "SELECT height, hash FROM blocks WHERE height = ?",
+                        bank_block = self._bank_db(bank_id).execute(
+                            _BLOCK_AT_HEIGHT_SQL,
                             (block_height,),
                             fetchone=True
                         )
-                        if bank_block and bank_block['hash'] == block_hash:
-                            nodes_with_block.append(f"{bank['name']} (ФО)")
-                        else:
-                            nodes_without_block.append(f"{bank['name']} (ФО)")
+                        return bool(bank_block and bank_block['hash'] == block_hash)
                     except Exception:
-                        nodes_without_block.append(f"{bank['name']} (ФО) - ошибка проверки")
-                
-                for node in nodes_with_block:
-                    lines.append(f"    • {node}: блок присутствует ✓")
+                        return None
                 
-                if nodes_without_block:
-                    for node in nodes_without_block:
-                        lines.append(f"    • {node}: блок отсутствует ✗")
+                results = []
+                for idx, (node, schema, *bank_id) in enumerate(sources):
+                    if schema:
+                        present = None if union_failed else found.get(idx) == block_hash
+                    elif self.platform.db_ro.db_path.with_name(f"bank_{bank_id[0]}.db").exists():
+                        present = check_bank(bank_id[0])
+                    else:
+                        present = False
+                    if present is None:
+                        results.append((f"{node} - ошибка проверки", False))
+                    else:
+                        results.append((node, present))
                 
-                total_nodes = len(nodes_with_block) + len(nodes_without_block)
-                lines.append(f"  Всего узлов с блоком: {len(nodes_with_block)}/{total_nodes}")
+                lines.extend(f"    • {node}: блок присутствует ✓" for node, present in results if present)
+                lines.extend(f"    • {node}: блок отсутствует ✗" for node, present in results if not present)
+                present_count = sum(1 for _node, present in results if present)
+                lines.append(f"  Всего узлов с блоком: {present_count}/{len(results)}")
             else:
                 lines.append("  Для данной транзакции исполнения ещё не найден связанный блок в главном реестре.")
-        export_payload = {
-            "type": "smart_contract",
-            "id": contract_id,
-            "creator_id": sc["creator_id"],
-            "beneficiary_id": sc["beneficiary_id"],
-            "bank_id": sc["bank_id"],
-            "amount": sc["amount"],
-            "description": sc["description"],
-            "schedule": sc["schedule"],
-            "next_execution": sc["next_execution"],
-            "last_tx_id": sc.get("last_tx_id"),
-        }
-        if sc.get("status") == "FAILED":
+        if sc["status"] == "FAILED":
             lines.append("")
             lines.append("Ошибка: недостаточно ЦР на балансе")
-        
-        self._show_steps_window(
-            "Этапы работы смарт‑контракта",
-            lines,
-            export_handler=None,
-            export_plain_handler=None,
-        )
+        return "\n".join(lines)
 
     def _on_block_row_double_click(self, event) -> None:
         if not self.block_table:
@@ -1478,131 +2320,72 @@ class DigitalRubleApp(tk.Tk):
         item_id = self.block_table.focus()
         if not item_id:
             return
-        values = self.block_table.item(item_id, "values")
+        values = self._row_values(self.block_table, item_id)
         if not values:
             return
         height = values[0]
-        block = self.platform.db.execute(
-            "SELECT * FROM blocks WHERE height = ?",
-            (height,),
-            fetchone=True,
+        self._open_narrative(
+            self.block_table,
+            height,
+            lambda: self._collect_block_narrative_data(height),
+            "Этапы формирования и репликации блока",
         )
+
+    def _collect_block_narrative_data(self, height) -> str:
+        with self.platform.db_ro.transaction():
+            block = self.platform.db_ro.execute(
+                "SELECT id, height, previous_hash, timestamp, nonce, signer, merkle_root, hash FROM blocks WHERE height = ?",
+                (height,),
+                fetchone=True,
+            )
+            if block:
+                tx_rows = self.platform.db_ro.execute(
+                    """
+                    SELECT t.id, t.tx_type, t.amount, t.bank_id FROM block_transactions bt
+                    JOIN transactions t ON t.id = bt.tx_id
+                    WHERE bt.block_id = ?
+                    ORDER BY t.timestamp ASC
+                    LIMIT 10
+                    """,
+                    (block["id"],),
+                    fetchall=True,
+                ) or []
+                tx_total = self.platform.db_ro.execute(
+                    "SELECT COUNT(*) AS c FROM block_transactions WHERE block_id = ?",
+                    (block["id"],),
+                    fetchone=True,
+                )["c"]
         if not block:
-            messagebox.showerror("Ошибка", "Блок не найден")
-            return
-        block = dict(block)
+            raise ValueError("Блок не найден")
         block_hash = block["hash"]
-        tx_rows = self.platform.db.execute(
-            """
-            SELECT t.* FROM transactions t
-            JOIN block_transactions bt ON bt.tx_id = t.id
-            JOIN blocks b ON b.id = bt.block_id
-            WHERE b.height = ?
-            ORDER BY t.timestamp ASC
-            """,
-            (height,),
-            fetchall=True,
-        ) or []
-        txs = [dict(r) for r in tx_rows]
-        events = self.platform.consensus.get_recent_events(limit=200)
-        events_for_block = [e for e in events if e.block_hash == block_hash]
+        txs = tx_rows
+        events_for_block = self.platform.consensus.get_events_for_block(block_hash, limit=200)
         lines: list[str] = []
         lines.append(f"Жизненный цикл блока #{block['height']}")
-        lines.append("=" * 60)
+        lines.append(_NARRATIVE_SEP)
         lines.append("")
         lines.append("ЭТАП 1: ПОДБОР ТРАНЗАКЦИЙ В БЛОК")
-        lines.append(f"  Количество транзакций: {len(txs)}")
-        lines.append("  Процесс подбора:")
-        lines.append("    • Система собирает все транзакции со статусом CONFIRMED")
-        lines.append("    • Транзакции упорядочиваются по времени создания")
-        lines.append("    • Отбираются транзакции, ещё не включённые в блоки")
+        lines.append(f"  Количество транзакций: {tx_total}")
+        lines.extend(_BLOCK_SELECTION_STEPS)
         if txs:
             lines.append("  Включённые транзакции:")
-            for t in txs[:10]:
+            for t in txs:
                 lines.append(
                     f"    • TX {t['id']} | тип={t['tx_type']} | сумма={t['amount']:.2f} | банк_id={t['bank_id']}"
                 )
-            if len(txs) > 10:
-                lines.append(f"    ... и ещё {len(txs) - 10} транзакций")
+            if tx_total > len(txs):
+                lines.append(f"    ... и ещё {tx_total - len(txs)} транзакций")
         else:
             lines.append("  Блок пустой (genesis блок или блок без транзакций)")
-        lines.append("")
-        lines.append("ЭТАП 2: ФОРМИРОВАНИЕ СТРУКТУРЫ БЛОКА")
-        lines.append("  Заголовок блока содержит:")
-        lines.append(f"    • height (высота): {block['height']}")
-        lines.append(f"    • previous_hash: {block['previous_hash']}")
-        lines.append(f"    • timestamp: {block['timestamp']}")
-        lines.append(f"    • nonce: {block['nonce']}")
-        lines.append(f"    • signer (подписант): {block['signer']}")
-        lines.append("")
-        lines.append("ЭТАП 3: ВЫЧИСЛЕНИЕ MERKLE-КОРНЯ")
-        lines.append("  Заголовок блока содержит:")
-        lines.append(f"    • height (высота): {block['height']}")
-        lines.append(f"    • previous_hash: {block['previous_hash']}")
-        lines.append(f"    • timestamp: {block['timestamp']}")
-        lines.append(f"    • nonce: {block['nonce']}")
-        lines.append(f"    • signer (подписант): {block['signer']}")
-        lines.append("")
-        lines.append("ЭТАП 3: ВЫЧИСЛЕНИЕ MERKLE-КОРНЯ")
-        lines.append(f"  merkle_root: {block['merkle_root']}")
+        lines.append(_BLOCK_HEADER_TEMPLATE.format_map(block))
         if txs:
-            lines.append("  Алгоритм построения Merkle-дерева:")
-            lines.append("    • Обозначим через h_i = Streebog-256(tx_hash_i) хэш i-й транзакции блока")
-            lines.append("    • На каждом уровне k берём пары (h_{k,2j-1}, h_{k,2j})")
-            lines.append("    • Вычисляем h_{k+1,j} = Streebog-256(h_{k,2j-1} || h_{k,2j})")
-            lines.append("    • При нечётном числе элементов последний хэш дублируется: h_{k,2m} = h_{k,2m-1}")
-            lines.append("    • Корневой хэш merkle_root = h_{L,1}, где L — номер последнего уровня дерева")
-            lines.append("  Математическая запись:")
-            lines.append("    h_i = Streebog-256(tx_hash_i) для i = 1, 2, ..., n")
-            lines.append("    h_{k+1,j} = Streebog-256(h_{k,2j-1} || h_{k,2j}) для j = 1, 2, ..., ⌈n/2⌉")
-            lines.append("    merkle_root = h_{L,1}")
+            lines.extend(_BLOCK_MERKLE_STEPS)
         else:
             lines.append("  Для пустого блока merkle_root вычисляется как хэш пустого списка")
-        lines.append("")
-        lines.append("ЭТАП 4: ВЫЧИСЛЕНИЕ ХЕША БЛОКА")
-        lines.append(f"  hash блока: {block_hash}")
-        lines.append("  Хеш вычисляется по алгоритму Streebog-256:")
-        lines.append("    hash = Streebog-256({height, timestamp, previous_hash, signer, nonce, merkle_root, tx_hashes})")
-        lines.append("  Взаимосвязь блоков по хешу:")
-        lines.append(f"    • previous_hash = {block['previous_hash']}")
-        lines.append("    • Каждый блок связан с предыдущим через previous_hash")
-        lines.append("    • Формируется цепочка блоков (распределенный реестр)")
-        lines.append("  Восстановление блоков:")
-        lines.append("    • get_block_by_hash(hash) - восстановление блока по хешу")
-        lines.append("    • get_block_by_previous_hash(previous_hash) - восстановление следующего блока")
-        lines.append("    • restore_chain_from_hash(start_hash) - восстановление цепочки блоков")
-        lines.append("")
-        lines.append("ЭТАП 5: ЭЛЕКТРОННАЯ ЦИФРОВАЯ ПОДПИСЬ БЛОКА ЦБ")
+        lines.append(_BLOCK_HASH_TEMPLATE.format_map(block))
+        lines.extend(_BLOCK_HASH_CHAIN_STEPS)
         lines.append(f"  Подписант (signer): {block['signer']}")
-        lines.append("  Процесс подписания:")
-        lines.append("    1. Вычисляется хеш блока: H_block = Streebog-256(block_header)")
-        lines.append("    2. ЦБ формирует ЭЦП по ГОСТ 34.10-2018:")
-        lines.append("       • Генерируется случайное число k ∈ [1, q-1]")
-        lines.append("       • Вычисляется точка эллиптической кривой: C = k * P")
-        lines.append("       • Вычисляется r = Cx mod q")
-        lines.append("       • Вычисляется s = (r * d_cbr + k * H_block) mod q")
-        lines.append("       • ЭЦП блока = (r, s)")
-        lines.append("    3. ЭЦП блока сохраняется в связанных транзакциях (cbr_sig)")
-        lines.append("  Электронная цифровая подпись подтверждает:")
-        lines.append("    • Подлинность блока")
-        lines.append("    • Целостность данных блока")
-        lines.append("    • Авторизацию ЦБ как создателя блока")
-        lines.append("")
-        lines.append("ЭТАП 6: КОНСЕНСУС (RAFT) И РАСПРЕДЕЛЁННОЕ ГОЛОСОВАНИЕ")
-        lines.append("  Лидер консенсуса: Центральный банк РФ (ЦБ РФ)")
-        lines.append("  Этапы консенсуса для блока:")
-        lines.append("    1. Запрос на подтверждение:")
-        lines.append("       • ЦБ формирует предложение AppendEntries с данными блока")
-        lines.append("       • Предложение рассылается всем узлам (ФО)")
-        lines.append("    2. Голосование:")
-        lines.append("       • Каждый узел (ФО) проверяет валидность блока")
-        lines.append("       • Узлы возвращают ответы: VOTE_GRANTED (согласие) или REPLICATION (репликация)")
-        lines.append("    3. Фиксация кворума:")
-        lines.append("       • ЦБ подсчитывает количество положительных ответов")
-        lines.append("       • При достижении кворума (большинство узлов) блок считается принятым")
-        lines.append("    4. Сохранение:")
-        lines.append("       • Запись помечается как COMMITTED в таблице consensus_events")
-        lines.append("       • Каждый узел применяет запись: ENTRY_APPLIED")
+        lines.extend(_BLOCK_SIGNATURE_AND_CONSENSUS_STEPS)
         if events_for_block:
             lines.append("  События консенсуса для этого блока:")
             for e in events_for_block[:10]:
@@ -1613,45 +2396,10 @@ class DigitalRubleApp(tk.Tk):
                 lines.append(f"    ... и ещё {len(events_for_block) - 10} событий")
         else:
             lines.append("  Для этого блока ещё нет событий в таблице consensus_events")
-        lines.append("")
-        lines.append("ЭТАП 7: ПОЛНАЯ РЕПЛИКАЦИЯ НА ВСЕ УЗЛЫ")
-        lines.append("  Центральный банк РФ (главный реестр): блок присутствует ✓")
-        lines.append("  Полная репликация: блок хранится на ВСЕХ узлах (ФО) независимо от транзакций")
-        lines.append("  Процесс репликации:")
-        lines.append("    1. ЦБ отправляет блок и все его транзакции на каждый узел")
-        lines.append("    2. Каждый узел проверяет валидность блока")
-        lines.append("    3. Узел сохраняет блок в локальную БД (bank_*.db)")
-        lines.append("    4. Узел сохраняет все транзакции блока в локальную БД")
-        lines.append("    5. Узел создаёт связи block_transactions в локальной БД")
-        lines.append("  Статус репликации:")
-        lines.append("    Блок присутствует в:")
-        lines.append("      • Центральный банк РФ (главный реестр)")
-        banks = self.platform.list_banks()
-        for bank in banks:
-            lines.append(f"      • {bank['name']} (ФО)")
-        lines.append("")
-        lines.append("ЭТАП 8: ФИНАЛИЗАЦИЯ БЛОКА")
-        lines.append("  Блок считается финализированным после:")
-        lines.append("    • Включения в главный реестр (центральная БД)")
-        lines.append("    • Подтверждения консенсусом (RAFT)")
-        lines.append("    • Полной репликации на все узлы сети")
-        lines.append("    • Создания связей block_transactions во всех узлах")
-        export_payload = {
-            "type": "block",
-            "height": block["height"],
-            "hash": block["hash"],
-            "previous_hash": block["previous_hash"],
-            "merkle_root": block["merkle_root"],
-            "timestamp": block["timestamp"],
-            "signer": block["signer"],
-            "tx_ids": [t["id"] for t in txs],
-        }
-        self._show_steps_window(
-            "Этапы формирования и репликации блока",
-            lines,
-            export_handler=None,
-            export_plain_handler=None,
-        )
+        lines.append(_BLOCK_REPLICATION_HEADER)
+        lines.extend(f"      • {bank['name']} (ФО)" for bank in self.platform.list_banks())
+        lines.append(_BLOCK_FINALIZATION_TEXT)
+        return "\n".join(lines)
 
     def _on_utxo_row_double_click(self, event) -> None:
         if not self.utxo_table:
@@ -1659,31 +2407,30 @@ class DigitalRubleApp(tk.Tk):
         item_id = self.utxo_table.focus()
         if not item_id:
             return
-        values = self.utxo_table.item(item_id, "values")
+        values = self._row_values(self.utxo_table, item_id)
         if not values:
             return
         utxo_id = values[0]
-        row = self.platform.db.execute(
-            "SELECT * FROM utxos WHERE id = ?",
+        row = self.platform.db_ro.execute(
+            "SELECT id, owner_id, amount, status, created_tx_id, spent_tx_id, created_at, spent_at FROM utxos WHERE id = ?",
             (utxo_id,),
             fetchone=True,
         )
         if not row:
             messagebox.showerror("Ошибка", "UTXO не найдено")
             return
-        u = dict(row)
+        u = row
         try:
-            wallet_row = self.platform.db.execute(
-                "SELECT * FROM wallets WHERE id = ?", (u["owner_id"],), fetchone=True
+            wallet_row = self.platform.db_ro.execute(
+                "SELECT wallet_address FROM wallets WHERE id = ?", (u["owner_id"],), fetchone=True
             )
             if wallet_row:
-                from database import DatabaseManager
                 banks = self.platform.list_banks()
                 owner_name = f"Кошелек {wallet_row['wallet_address'][:12]}..."
                 for bank in banks:
-                    bank_db = DatabaseManager(f"bank_{bank['id']}.db")
+                    bank_db = self._bank_db(bank['id'])
                     user_row = bank_db.execute(
-                        "SELECT * FROM users WHERE wallet_id = ?", (u["owner_id"],), fetchone=True
+                        "SELECT name FROM users WHERE wallet_id = ?", (u["owner_id"],), fetchone=True
                     )
                     if user_row:
                         owner_name = user_row["name"]
@@ -1700,45 +2447,26 @@ class DigitalRubleApp(tk.Tk):
         lines.append(f"  Сумма: {u['amount']:.2f} ЦР")
         lines.append(f"  Статус: {self._translate_status(u['status'])}")
         created_tx = None
-        if u.get("created_tx_id"):
-            created_tx = self.platform.db.execute(
+        if u["created_tx_id"]:
+            created_tx = self.platform.db_ro.execute(
                 "SELECT id, tx_type, channel, timestamp FROM transactions WHERE id = ?",
                 (u["created_tx_id"],),
                 fetchone=True,
             )
         if created_tx:
-            created_tx = dict(created_tx)
             lines.append(
                 f"  Создано транзакцией: {created_tx['id']} "
                 f"(тип={created_tx['tx_type']}, канал={created_tx['channel']}, время={created_tx['timestamp']})"
             )
         else:
-            lines.append(f"  Создано транзакцией: {u.get('created_tx_id') or '-'}")
+            lines.append(f"  Создано транзакцией: {u['created_tx_id'] or '-'}")
         lines.append("")
         lines.append("2. Дальнейшее использование")
-        if u.get("spent_tx_id"):
+        if u["spent_tx_id"]:
             lines.append(f"  Потрачено транзакцией: {u['spent_tx_id']}")
         else:
             lines.append("  UTXO ещё не было потрачено (UNSPENT).")
-        lines.append("")
-        lines.append("3. Техническая роль UTXO в модели")
-        lines.append("  Запись UTXO хранит (id, owner_id, amount, status, created_tx_id, spent_tx_id, created_at, spent_at).")
-        lines.append("  При формировании транзакции набор UTXO выбирается как вход (input set), помечается статусом SPENT,")
-        lines.append("  а при необходимости создаётся одно новое UTXO на сдачу. При оффлайн‑сценариях именно по полям")
-        lines.append("  owner_id, status и spent_tx_id моделируется ошибка двойной траты и проверяется достаточность средств.")
-        export_payload = {
-            "type": "utxo",
-            "id": u["id"],
-            "owner_id": u["owner_id"],
-            "amount": u["amount"],
-            "status": u["status"],
-            "created_tx_id": u["created_tx_id"],
-            "spent_tx_id": u.get("spent_tx_id"),
-        }
-        wallet_row = self.platform.db.execute(
-            "SELECT bank_id FROM wallets WHERE id = ?", (u["owner_id"],), fetchone=True
-        )
-        bank_id = wallet_row["bank_id"] if wallet_row else None
+        lines.extend(_UTXO_ROLE_STEPS)
         self._show_steps_window(
             "Этапы формирования и использования UTXO",
             lines,
@@ -1748,84 +2476,37 @@ class DigitalRubleApp(tk.Tk):
 
 
     def _translate_tx_type(self, tx_type: str) -> str:
-        mapping = {
-            "ONLINE": "Онлайн",
-            "OFFLINE": "Оффлайн",
-            "EXCHANGE": "Обмен",
-            "CONTRACT": "Смарт-контракт",
-        }
-        return mapping.get(tx_type, tx_type)
+        return _TX_TYPE_LABELS.get(tx_type, tx_type)
 
     def _translate_channel(self, channel: str) -> str:
-        mapping = {
-            "C2C": "ФЛ → ФЛ",
-            "C2B": "ФЛ → ЮЛ",
-            "B2C": "ЮЛ → ФЛ",
-            "B2B": "ЮЛ → ЮЛ",
-            "G2B": "Гос → ЮЛ",
-            "B2G": "ЮЛ → Гос",
-            "C2G": "ФЛ → Гос",
-            "G2C": "Гос → ФЛ",
-            "FIAT2DR": "Пополнение цифрового кошелька",
-            "OFFLINE_FUND": "Пополнение оффлайн кошелька",
-        }
-        return mapping.get(channel, channel)
+        return _CHANNEL_LABELS.get(channel, channel)
 
     def _translate_wallet_status(self, status: str) -> str:
-        mapping = {
-            "OPEN": "Открыт",
-            "CLOSED": "Закрыт",
-        }
-        return mapping.get(status, status)
+        return _WALLET_STATUS_LABELS.get(status, status)
 
     def _translate_status(self, status: str) -> str:
-        mapping = {
-            "UNSPENT": "Незатрачен",
-            "SPENT": "Затрачен",
-            "CONFIRMED": "Подтверждена",
-            "OFFLINE_BUFFER": "Оффлайн буфер",
-            "SCHEDULED": "Запланирован",
-            "EXECUTED": "Исполнен",
-            "PENDING": "Ожидает",
-            "APPROVED": "Одобрено",
-            "REJECTED": "Отклонено",
-            "ОФФЛАЙН": "Оффлайн",
-            "ПОСТУПИЛО В ОБРАБОТКУ": "В обработке",
-            "ОБРАБОТАНА": "Обработана",
-            "КОНФЛИКТ": "Конфликт",
-        }
-        return mapping.get(status, status)
+        return _STATUS_LABELS.get(status, status)
 
     def _translate_consensus_state(self, state: str) -> str:
-        mapping = {
-            "LEADER": "Лидер (ЦБ РФ)",
-            "FOLLOWER": "Последователь",
-            "SIGN_REQUEST": "Запрос подписи",
-            "VOTE_REQUEST": "Запрос подтверждения корректности блока",
-            "VOTE_GRANTED": "Голос получен",
-            "APPEND_ENTRIES": "Добавление записей",
-            "ENTRY_APPLIED": "Запись применена",
-            "REPLICATION": "Репликация",
-            "COMMITTED": "Зафиксировано",
-            "LEADER_APPEND": "Лидер добавил запись",
-            "TX": "Транзакция",
-            "LAG": "Задержка",
-            "FAULT": "Ошибка",
-            "CBR_RECOVERED": "Отказ ЦБ",
-            "NORMAL_OPERATION_RESUMED": "ЦБ вернулся в штатный режим работы",
-            "REPLICATION_START": "старт репликации",
-            "BLOCKS_RECEPTION_START": "Спинятие данных от временного лидера",
-            "QUORUM_REACHED": "Кворум достигнут",
-        }
-        if state in {"CANDIDATE", "ELECTION_START", "LEADER_ELECTED", "ELECTION_FAILED"}:
+        if state in _ELECTION_STATES:
             return "Лидер (ЦБ РФ)"
-        return mapping.get(state, state)
+        return _CONSENSUS_STATE_LABELS.get(state, state)
+
+    def _set_clipboard(self, text: str) -> None:
+        self.tk.call(_CLIPBOARD_SET_PROC, self._w, text)
 
     def _add_copy_menu(self, widget) -> None:
         def copy_text():
             try:
                 if isinstance(widget, tk.Text):
-                    if widget.tag_ranges(tk.SEL):
+                    paged = self._paged_logs.get(id(widget))
+                    has_selection = bool(widget.tag_ranges(tk.SEL))
+                    selects_all = has_selection and widget.compare(tk.SEL_FIRST, "==", "1.0") and widget.compare(
+                        tk.SEL_LAST, ">=", "end-1c"
+                    )
+                    if paged is not None and paged.entries and (not has_selection or selects_all):
+                        text = paged.full_text()
+                    elif has_selection:
                         text = widget.get(tk.SEL_FIRST, tk.SEL_LAST)
                     else:
                         text = widget.get("1.0", tk.END)
@@ -1838,14 +2519,24 @@ class DigitalRubleApp(tk.Tk):
                         headers = [widget.heading(col, "text") or col for col in columns]
                         lines.append("\t".join(headers))
                     
-                    if selection:
+                    virtual = self._virtual_tables.get(id(widget))
+                    if virtual is not None and virtual.selected:
+                        for _key, values in virtual.selected_rows():
+                            lines.append("\t".join(str(v) for v in values))
+                    elif selection:
                         for item_id in selection:
-                            values = widget.item(item_id, "values")
+                            values = self._row_values(widget, item_id)
                             if values:
                                 lines.append("\t".join(str(v) for v in values))
+                    elif id(widget) in self._virtual_tables:
+                        for _key, values in self._virtual_tables[id(widget)].rows:
+                            lines.append("\t".join(str(v) for v in values))
+                    elif id(widget) in self._table_state:
+                        for values in self._table_state[id(widget)].values():
+                            lines.append("\t".join(str(v) for v in values))
                     else:
                         for item_id in widget.get_children():
-                            values = widget.item(item_id, "values")
+                            values = self._row_values(widget, item_id)
                             if values:
                                 lines.append("\t".join(str(v) for v in values))
                     text = "\n".join(lines)
@@ -1853,14 +2544,17 @@ class DigitalRubleApp(tk.Tk):
                     return
                 
                 if text:
-                    self.clipboard_clear()
-                    self.clipboard_append(text)
+                    self._set_clipboard(text)
             except Exception as e:
                 print(f"Ошибка при копировании: {e}")
         
+        menu = None
+
         def show_menu(event):
-            menu = tk.Menu(self, tearoff=0)
-            menu.add_command(label="Копировать", command=copy_text)
+            nonlocal menu
+            if menu is None:
+                menu = tk.Menu(self, tearoff=0)
+                menu.add_command(label="Копировать", command=copy_text)
             try:
                 menu.tk_popup(event.x_root, event.y_root)
             finally:
@@ -1877,20 +2571,18 @@ class DigitalRubleApp(tk.Tk):
                 else:
                     text = widget.get()
                 if text:
-                    self.clipboard_clear()
-                    self.clipboard_append(text)
+                    self._set_clipboard(text)
                 return "break"
             except Exception as e:
                 print(f"Ошибка при копировании: {e}")
                 return "break"
         
         def cut_text(event=None):
+            if not widget.selection_present():
+                return "break"
             try:
-                if widget.selection_present():
-                    text = widget.selection_get()
-                    self.clipboard_clear()
-                    self.clipboard_append(text)
-                    widget.delete(tk.SEL_FIRST, tk.SEL_LAST)
+                self._set_clipboard(widget.selection_get())
+                widget.delete(tk.SEL_FIRST, tk.SEL_LAST)
                 return "break"
             except Exception as e:
                 print(f"Ошибка при вырезании: {e}")
@@ -1899,6 +2591,9 @@ class DigitalRubleApp(tk.Tk):
         def paste_text(event=None):
             try:
                 text = self.clipboard_get()
+            except tk.TclError:
+                return "break"
+            try:
                 if text:
                     if widget.selection_present():
                         widget.delete(tk.SEL_FIRST, tk.SEL_LAST)
@@ -1913,13 +2608,17 @@ class DigitalRubleApp(tk.Tk):
             widget.icursor(tk.END)
             return "break"
         
+        menu = None
+
         def show_menu(event):
-            menu = tk.Menu(self, tearoff=0)
-            menu.add_command(label="Вырезать", command=cut_text)
-            menu.add_command(label="Копировать", command=copy_text)
-            menu.add_command(label="Вставить", command=paste_text)
-            menu.add_separator()
-            menu.add_command(label="Выделить всё", command=select_all)
+            nonlocal menu
+            if menu is None:
+                menu = tk.Menu(self, tearoff=0)
+                menu.add_command(label="Вырезать", command=cut_text)
+                menu.add_command(label="Копировать", command=copy_text)
+                menu.add_command(label="Вставить", command=paste_text)
+                menu.add_separator()
+                menu.add_command(label="Выделить всё", command=select_all)
             try:
                 menu.tk_popup(event.x_root, event.y_root)
             finally:
@@ -1939,6 +2638,7 @@ class DigitalRubleApp(tk.Tk):
         column: int = 0,
         columnspan: int = 1,
         stretch: bool = False,
+        virtual: bool = False,
     ):
         tree = ttk.Treeview(parent, columns=columns, show="headings")
         for col in columns:
@@ -1951,339 +2651,342 @@ class DigitalRubleApp(tk.Tk):
         scrollbar = ttk.Scrollbar(parent, orient="vertical", command=tree.yview)
         tree.configure(yscrollcommand=scrollbar.set)
         scrollbar.grid(row=row, column=column + columnspan, sticky="ns")
+        if virtual:
+            self._virtual_tables[id(tree)] = VirtualTree(tree, scrollbar, self._sync_tree)
         self._add_copy_menu(tree)
         return tree
 
-    def refresh_all(self) -> None:
-        try:
+    def _set_table_rows(self, tree, rows) -> None:
+        virtual = self._virtual_tables.get(id(tree))
+        if virtual is None:
+            self._sync_tree(tree, rows)
+        else:
+            virtual.set_rows(rows)
+
+    def _schedule_refresh(self, *sections, interval: int = _REFRESH_INTERVAL_MS) -> None:
+        self._dirty_sections.update(sections or _REFRESH_SECTIONS)
+        if interval <= 0:
+            if self._refresh_pending is not None:
+                self.after_cancel(self._refresh_pending)
+            self._do_refresh()
+        elif self._refresh_pending is None:
+            self._refresh_pending = self.after(interval, self._do_refresh)
+
+    def _do_refresh(self) -> None:
+        if self._platform_lock.locked():
+            self._refresh_pending = self.after(100, self._do_refresh)
+            return
+        self._refresh_pending = None
+        sections, self._dirty_sections = self._dirty_sections, set()
+        self.refresh_all(sections)
+
+    def _changed_sections(self, sections) -> dict:
+        changed = {}
+        for section in _REFRESH_SECTIONS:
+            if section not in sections:
+                continue
+            tables = _SECTION_TABLES.get(section)
+            if tables is None:
+                changed[section] = None
+                continue
+            version = DatabaseManager.table_versions(tables)
+            if self._section_versions.get(section) != version:
+                changed[section] = version
+        return changed
+
+    def _refresh_section(self, section: str) -> None:
+        if section == "lists":
             self._refresh_user_lists()
-            self._refresh_tables()
-            self._refresh_consensus_canvas()
+        elif section == "canvas":
+            if not self.consensus_canvas:
+                return
+            canvas_key = (
+                self.consensus_canvas.winfo_width(),
+                self.platform.consensus.version(),
+                self._consensus_canvas_inputs()[1],
+            )
+            if canvas_key != self._consensus_canvas_key:
+                self._consensus_canvas_key = canvas_key
+                self._refresh_consensus_canvas()
+                if self._consensus_anim_job is None:
+                    self._start_consensus_animation()
+        elif section == "cbr_log":
             self._refresh_errors_table()
-            if self.consensus_canvas and self._consensus_anim_job is None:
-                self._start_consensus_animation()
-        except Exception as e:
-            import traceback
-            print(f"Ошибка при обновлении данных: {e}")
-            traceback.print_exc()
+        else:
+            self._refresh_tables((section,))
+
+    def refresh_all(self, sections=None, force: bool = False) -> None:
+        if sections is None:
+            sections = _REFRESH_SECTIONS
+        if force:
+            self._section_versions.clear()
+        changed = self._changed_sections(sections)
+        self._bank_cache.cache_clear()
+        self._user_cache.cache_clear()
+        self._refresh_index.clear()
+        for section, version in changed.items():
+            try:
+                self._refresh_section(section)
+            except Exception as e:
+                import traceback
+                print(f"Ошибка при обновлении данных: {e}")
+                traceback.print_exc()
+                continue
+            if version is not None:
+                self._section_versions[section] = version
+
+    def _refresh_users(self) -> list:
+        users = self._refresh_index.get("users")
+        if users is None:
+            users = self._refresh_index["users"] = self.platform.list_users()
+        return users
+
+    def _indexed_user_name(self, user_id) -> str:
+        by_id = self._refresh_index.get("users_by_id")
+        if by_id is None:
+            by_id = self._refresh_index["users_by_id"] = {u["id"]: u["name"] for u in self._refresh_users()}
+        return by_id.get(user_id) or f"ID {user_id} (не найден)"
+
+    def _indexed_bank_name(self, bank_id) -> str:
+        by_id = self._refresh_index.get("banks_by_id")
+        if by_id is None:
+            by_id = self._refresh_index["banks_by_id"] = {b["id"]: b["name"] for b in self.platform.list_banks()}
+        return by_id.get(bank_id) or f"ID {bank_id} (не найден)"
+
+    def _wallet_owner_index(self) -> dict:
+        by_wallet = self._refresh_index.get("users_by_wallet")
+        if by_wallet is None:
+            by_wallet = self._refresh_index["users_by_wallet"] = {}
+            for u in self._refresh_users():
+                if u.get("wallet_id") is not None:
+                    by_wallet.setdefault(u["wallet_id"], u["name"])
+        return by_wallet
 
     def _refresh_user_lists(self) -> None:
-        users = self.platform.list_users()
-        
-        individuals = sorted(
-            [u for u in users if u["user_type"] == "INDIVIDUAL"],
-            key=lambda x: x["id"]
-        )
-        businesses = sorted(
-            [u for u in users if u["user_type"] == "BUSINESS"],
-            key=lambda x: x["id"]
-        )
-        governments = sorted(
-            [u for u in users if u["user_type"] == "GOVERNMENT"],
-            key=lambda x: x["id"]
-        )
+        labels = {code: [] for code in _USER_TYPE_LABELS}
+        for u in sorted(self._refresh_users(), key=lambda x: x["id"]):
+            if u["user_type"] in labels:
+                labels[u["user_type"]].append(
+                    f"{u['id']} | {u['name']} ({_USER_TYPE_LABELS[u['user_type']]})"
+                )
+        self._user_labels = {code: tuple(values) for code, values in labels.items()}
         
-        formatted = []
-        formatted.extend([
-            f"{u['id']} | {u['name']} ({self._user_type_label(u['user_type'])})"
-            for u in individuals
-        ])
-        formatted.extend([
-            f"{u['id']} | {u['name']} ({self._user_type_label(u['user_type'])})"
-            for u in businesses
-        ])
-        formatted.extend([
-            f"{u['id']} | {u['name']} ({self._user_type_label(u['user_type'])})"
-            for u in governments
-        ])
-
-        combos = [
-            self.wallet_user_combo,
-            self.offline_user_combo,
-            self.offline_sender_combo,
-            self.contract_sender_combo,
-            self.offline_receiver_combo,
-        ]
-        for combo in combos:
-            if combo:
-                old = combo.get()
-                combo["values"] = formatted
-                if old and old in formatted:
-                    combo.set(old)
-                elif not combo.get() and formatted:
-                    combo.current(0)
+        business_labels = self._user_labels["BUSINESS"]
+        government_labels = self._user_labels["GOVERNMENT"]
+        user_labels = self._user_labels["INDIVIDUAL"] + business_labels + government_labels
+        receiver_labels = business_labels + government_labels
+        bank_labels = tuple(f"{b['id']} | {b['name']}" for b in self.platform.list_banks())
         
-        receivers = []
-        receivers.extend([
-            f"{u['id']} | {u['name']} ({self._user_type_label(u['user_type'])})"
-            for u in businesses
-        ])
-        receivers.extend([
-            f"{u['id']} | {u['name']} ({self._user_type_label(u['user_type'])})"
-            for u in governments
-        ])
-        if self.contract_receiver_combo:
-            old = self.contract_receiver_combo.get()
-            self.contract_receiver_combo["values"] = receivers
-            if old and old in receivers:
-                self.contract_receiver_combo.set(old)
-            elif not self.contract_receiver_combo.get() and receivers:
-                self.contract_receiver_combo.current(0)
-        banks = self.platform.list_banks()
-        bank_values = [f"{b['id']} | {b['name']}" for b in banks]
-        for combo in [self.bank_combo, self.contract_bank_combo, self.bank_filter_combo, self.online_bank_combo, self.offline_bank_combo]:
-            if combo:
-                old = combo.get()
-                combo["values"] = bank_values
-                if old and old in bank_values:
-                    combo.set(old)
-                elif not combo.get() and bank_values:
-                    combo.current(0)
+        for combo in self._user_combos:
+            self._set_combo_values(combo, user_labels)
+        for combo in self._receiver_combos:
+            self._set_combo_values(combo, receiver_labels)
+        for combo in self._bank_combos:
+            self._set_combo_values(combo, bank_labels)
 
         self._refresh_online_combos()
 
+    def _set_combo_values(self, combo, values) -> None:
+        if self._combo_values.get(id(combo)) == values:
+            return
+        self._combo_values[id(combo)] = values
+        old = combo.get()
+        combo["values"] = values
+        if old and old in values:
+            combo.set(old)
+        elif not combo.get() and values:
+            combo.current(0)
+
     def _clear_tree(self, tree) -> None:
         if tree:
-            for item in tree.get_children():
-                tree.delete(item)
+            self._table_state.pop(id(tree), None)
+            children = tree.get_children()
+            if children:
+                tree.delete(*children)
+
+    def _sync_tree(self, tree, rows) -> None:
+        previous = self._table_state.get(id(tree), {})
+        current = {}
+        for key, values in rows:
+            current[str(key)] = tuple(values)
+        if not previous:
+            self._bulk_insert(tree, current)
+            self._table_state[id(tree)] = current
+            return
+        stale = [iid for iid in previous if iid not in current]
+        if stale:
+            tree.delete(*stale)
+        reordered = [iid for iid in previous if iid in current] != [iid for iid in current if iid in previous]
+        for index, (iid, values) in enumerate(current.items()):
+            old_values = previous.get(iid)
+            if old_values is None:
+                tree.insert("", index, iid=iid, values=values)
+                continue
+            if old_values != values:
+                tree.item(iid, values=values)
+            if reordered:
+                tree.move(iid, "", index)
+        self._table_state[id(tree)] = current
+
+    def _bulk_insert(self, tree, rows) -> None:
+        if rows:
+            tree.tk.call(_TREE_BULK_INSERT_PROC, tree._w, tuple(item for pair in rows.items() for item in pair))
+
+    def _row_values(self, tree, iid):
+        values = self._table_state.get(id(tree), {}).get(iid)
+        if values is None:
+            values = tree.item(iid, "values")
+        return values
 
     def _on_wallet_user_change(self, event=None) -> None:
         pass
 
-    def _refresh_tables(self) -> None:
-        if self.user_table:
-            self._clear_tree(self.user_table)
-            users = self.platform.list_users()
-            
-            individuals = sorted(
-                [u for u in users if u["user_type"] == "INDIVIDUAL"],
-                key=lambda x: x["id"]
+    def _refresh_tables(self, sections=_REFRESH_SECTIONS) -> None:
+        if self.user_table and "users" in sections:
+            type_order = {"INDIVIDUAL": 0, "BUSINESS": 1, "GOVERNMENT": 2}
+            users = sorted(
+                [u for u in self._refresh_users() if u["user_type"] in type_order],
+                key=lambda x: (type_order[x["user_type"]], x["id"])
             )
-            businesses = sorted(
-                [u for u in users if u["user_type"] == "BUSINESS"],
-                key=lambda x: x["id"]
-            )
-            governments = sorted(
-                [u for u in users if u["user_type"] == "GOVERNMENT"],
-                key=lambda x: x["id"]
-            )
-            
-            for u in individuals:
-                self.user_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+            self._sync_tree(
+                self.user_table,
+                (
+                    (
                         u["id"],
-                        self._user_type_label(u["user_type"]),
-                        f"{u['fiat_balance']:.2f}",
-                        self._translate_wallet_status(u["wallet_status"]),
-                        f"{u['digital_balance']:.2f}",
-                        self._translate_wallet_status(u["offline_status"]),
-                        f"{u['offline_balance']:.2f}",
-                        u.get("offline_activated_at", "") or "-",
-                        u.get("offline_expires_at", "") or "-",
-                    ),
-                )
-            for u in businesses:
-                self.user_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        u["id"],
-                        self._user_type_label(u["user_type"]),
-                        f"{u['fiat_balance']:.2f}",
-                        self._translate_wallet_status(u["wallet_status"]),
-                        f"{u['digital_balance']:.2f}",
-                        self._translate_wallet_status(u["offline_status"]),
-                        f"{u['offline_balance']:.2f}",
-                        u.get("offline_activated_at", "") or "-",
-                        u.get("offline_expires_at", "") or "-",
-                    ),
-                )
-            for u in governments:
-                self.user_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        u["id"],
-                        self._user_type_label(u["user_type"]),
-                        f"{u['fiat_balance']:.2f}",
-                        self._translate_wallet_status(u["wallet_status"]),
-                        f"{u['digital_balance']:.2f}",
-                        self._translate_wallet_status(u["offline_status"]),
-                        f"{u['offline_balance']:.2f}",
-                        u.get("offline_activated_at", "") or "-",
-                        u.get("offline_expires_at", "") or "-",
-                    ),
-                )
+                        (
+                            u["id"],
+                            _USER_TYPE_LABELS.get(u["user_type"], u["user_type"]),
+                            f"{u['fiat_balance']:.2f}",
+                            _WALLET_STATUS_LABELS.get(u["wallet_status"], u["wallet_status"]),
+                            f"{u['digital_balance']:.2f}",
+                            _WALLET_STATUS_LABELS.get(u["offline_status"], u["offline_status"]),
+                            f"{u['offline_balance']:.2f}",
+                            u.get("offline_activated_at", "") or "-",
+                            u.get("offline_expires_at", "") or "-",
+                        ),
+                    )
+                    for u in users
+                ),
+            )
 
-        if self.tx_table:
-            self._clear_tree(self.tx_table)
+        if self.tx_table and "tx" in sections:
+            rows = []
             for tx in self.platform.get_transactions():
-                try:
-                    sender = self.platform.get_user(tx["sender_id"])
-                    sender_name = sender["name"]
-                except (ValueError, KeyError):
-                    sender_name = f"ID {tx['sender_id']} (не найден)"
-                
-                try:
-                    receiver = self.platform.get_user(tx["receiver_id"])
-                    receiver_name = receiver["name"]
-                except (ValueError, KeyError):
-                    receiver_name = f"ID {tx['receiver_id']} (не найден)"
-                
-                try:
-                    bank = self.platform._get_bank(tx["bank_id"])
-                    bank_name = bank["name"]
-                except (ValueError, KeyError):
-                    bank_name = f"ID {tx['bank_id']} (не найден)"
-                
-                self.tx_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                rows.append((
+                    tx["id"],
+                    (
                         tx["id"],
-                        sender_name,
-                        receiver_name,
+                        self._indexed_user_name(tx["sender_id"]),
+                        self._indexed_user_name(tx["receiver_id"]),
                         "Смарт-контракт" if tx['tx_type'] == "CONTRACT" else (
-                            self._translate_channel(tx['channel']) if tx['tx_type'] == "EXCHANGE" else tx['channel']
+                            _CHANNEL_LABELS.get(tx['channel'], tx['channel']) if tx['tx_type'] == "EXCHANGE" else tx['channel']
                         ),
                         f"{tx['amount']:.2f}",
                         tx["timestamp"],
-                        bank_name,
+                        self._indexed_bank_name(tx["bank_id"]),
                     ),
-                )
+                ))
+            self._set_table_rows(self.tx_table, rows)
 
-        if self.offline_table:
-            self._clear_tree(self.offline_table)
+        if self.offline_table and "offline" in sections:
+            rows = []
             for tx in self.platform.get_offline_transactions():
-                sender = self.platform.get_user(tx["sender_id"])
-                receiver = self.platform.get_user(tx["receiver_id"])
-                bank = self.platform._get_bank(tx["bank_id"])
-                self.offline_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                rows.append((
+                    tx["id"],
+                    (
                         tx["id"],
-                        sender["name"],
-                        receiver["name"],
+                        self._indexed_user_name(tx["sender_id"]),
+                        self._indexed_user_name(tx["receiver_id"]),
                         f"{tx['amount']:.2f}",
-                        bank["name"],
+                        self._indexed_bank_name(tx["bank_id"]),
                         tx["timestamp"],
-                        self._translate_status(tx["offline_status"]),
+                        _STATUS_LABELS.get(tx["offline_status"], tx["offline_status"]),
                     ),
-                )
+                ))
+            self._sync_tree(self.offline_table, rows)
 
-        if self.contract_table:
-            self._clear_tree(self.contract_table)
+        if self.contract_table and "contracts" in sections:
+            rows = []
             for sc in self.platform.get_smart_contracts():
-                try:
-                    creator = self.platform.get_user(sc["creator_id"])
-                    creator_name = creator["name"]
-                except (ValueError, KeyError):
-                    creator_name = f"ID {sc['creator_id']} (не найден)"
-                
-                try:
-                    beneficiary = self.platform.get_user(sc["beneficiary_id"])
-                    beneficiary_name = beneficiary["name"]
-                except (ValueError, KeyError):
-                    beneficiary_name = f"ID {sc['beneficiary_id']} (не найден)"
-                
-                try:
-                    bank = self.platform._get_bank(sc["bank_id"])
-                    bank_name = bank["name"]
-                except (ValueError, KeyError):
-                    bank_name = f"ID {sc['bank_id']} (не найден)"
-                status_map = {
-                    "EXECUTED": "Исполнен",
-                    "SCHEDULED": "Запланирован",
-                    "FAILED": "Ошибка",
-                }
-                status = status_map.get(sc["status"], sc["status"])
+                status = _CONTRACT_STATUS_LABELS.get(sc["status"], sc["status"])
                 if sc["status"] == "EXECUTED" and sc.get("last_execution"):
                     status = f"Исполнен ({sc['last_execution']})"
-                self.contract_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                rows.append((
+                    sc["id"],
+                    (
                         sc["id"],
-                        creator_name,
-                        beneficiary_name,
-                        bank_name,
+                        self._indexed_user_name(sc["creator_id"]),
+                        self._indexed_user_name(sc["beneficiary_id"]),
+                        self._indexed_bank_name(sc["bank_id"]),
                         sc["description"],
                         sc["next_execution"],
                         f"{sc['amount']:.2f}",
                         status,
                     ),
-                )
+                ))
+            self._sync_tree(self.contract_table, rows)
 
-        if self.block_table:
-            self._clear_tree(self.block_table)
+        if self.block_table and "blocks" in sections:
             rows = self.platform.db.execute(
-                "SELECT * FROM blocks ORDER BY height ASC", fetchall=True
+                """
+                SELECT height,
+                       substr(hash, 1, 12) || '...' AS hash_short,
+                       substr(COALESCE(previous_hash, ''), 1, 12) || '...' AS previous_short,
+                       tx_count,
+                       timestamp
+                FROM blocks
+                ORDER BY height ASC
+                """,
+                fetchall=True,
+            )
+            self._set_table_rows(
+                self.block_table,
+                ((row["height"], tuple(row)) for row in rows),
             )
-            for row in rows:
-                self.block_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        row["height"],
-                        row["hash"][:12] + "...",
-                        (row["previous_hash"] or "")[:12] + "...",
-                        row["tx_count"],
-                        row["timestamp"],
-                    ),
-                )
 
-        if self.utxo_table:
-            self._clear_tree(self.utxo_table)
+        if self.utxo_table and "utxo" in sections:
+            utxo_rows = []
             rows = self.platform.db.execute(
                 """
-                SELECT id, owner_id, amount, status, created_tx_id, COALESCE(spent_tx_id, '-') AS spent_tx_id
-                FROM utxos
-                ORDER BY created_at DESC
+                SELECT u.id,
+                       u.owner_id,
+                       u.amount,
+                       u.status,
+                       CASE WHEN u.created_tx_id = '-' THEN '-'
+                            ELSE substr(u.created_tx_id, 1, 12) || '...' END AS created_short,
+                       CASE WHEN u.spent_tx_id IS NULL OR u.spent_tx_id = '-' THEN '-'
+                            ELSE substr(u.spent_tx_id, 1, 12) || '...' END AS spent_short,
+                       w.id IS NOT NULL AS has_wallet,
+                       'Кошелек ' || substr(w.wallet_address, 1, 12) || '...' AS wallet_label
+                FROM utxos u
+                LEFT JOIN wallets w ON w.id = u.owner_id
+                ORDER BY u.created_at DESC
                 """,
                 fetchall=True,
             )
+            wallet_owners = self._wallet_owner_index()
             for row in rows or []:
-                try:
-                    wallet_row = self.platform.db.execute(
-                        "SELECT * FROM wallets WHERE id = ?", (row["owner_id"],), fetchone=True
-                    )
-                    if wallet_row:
-                        from database import DatabaseManager
-                        banks = self.platform.list_banks()
-                        owner_name = f"Кошелек {wallet_row['wallet_address'][:12]}..."
-                        for bank in banks:
-                            bank_db = DatabaseManager(f"bank_{bank['id']}.db")
-                            user_row = bank_db.execute(
-                                "SELECT * FROM users WHERE wallet_id = ?", (row["owner_id"],), fetchone=True
-                            )
-                            if user_row:
-                                owner_name = user_row["name"]
-                                break
-                    else:
-                        owner_name = f"ID {row['owner_id']} (кошелек не найден)"
-                except (ValueError, KeyError, Exception):
-                    owner_name = f"ID {row['owner_id']}"
-                self.utxo_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                if row["has_wallet"]:
+                    owner_name = wallet_owners.get(row["owner_id"]) or row["wallet_label"] or f"ID {row['owner_id']}"
+                else:
+                    owner_name = f"ID {row['owner_id']} (кошелек не найден)"
+                utxo_rows.append((
+                    row["id"],
+                    (
                         row["id"],
                         owner_name,
                         f"{row['amount']:.2f}",
-                        self._translate_status(row["status"]),
-                        row["created_tx_id"][:12] + "..." if row["created_tx_id"] != "-" else "-",
-                        row["spent_tx_id"][:12] + "..." if row["spent_tx_id"] != "-" else "-",
+                        _STATUS_LABELS.get(row["status"], row["status"]),
+                        row["created_short"],
+                        row["spent_short"],
                     ),
-                )
+                ))
+            self._set_table_rows(self.utxo_table, utxo_rows)
 
-        if self.bank_tx_table or self.bank_blocks_table:
+        if (self.bank_tx_table or self.bank_blocks_table) and "bank" in sections:
             self._refresh_bank_data_and_blocks()
 
-        if self.issuance_table:
-            self._clear_tree(self.issuance_table)
+        if self.issuance_table and "issuance" in sections:
             rows = self.platform.db.execute(
                 """
                 SELECT i.id, b.name as bank_name, i.amount, i.status
@@ -2293,20 +2996,21 @@ class DigitalRubleApp(tk.Tk):
                 """,
                 fetchall=True,
             )
-            for row in rows:
-                self.issuance_table.insert(
-                    "",
-                    tk.END,
-                    values=(row["id"], row["bank_name"], f"{row['amount']:.2f}", self._translate_status(row["status"])),
-                )
+            self._sync_tree(
+                self.issuance_table,
+                (
+                    (row["id"], (row["id"], row["bank_name"], f"{row['amount']:.2f}", _STATUS_LABELS.get(row["status"], row["status"])))
+                    for row in rows
+                ),
+            )
 
-        if self.consensus_table:
-            self._clear_tree(self.consensus_table)
+        if self.consensus_table and "consensus" in sections:
+            consensus_rows = []
             events = self.platform.consensus.get_recent_events(limit=100)
             
             blocks_dict = {}
             for event in events:
-                if event.state in {"CANDIDATE", "ELECTION_START", "LEADER_ELECTED", "ELECTION_FAILED"}:
+                if event.state in _ELECTION_STATES:
                     continue
                 
                 block_hash = event.block_hash
@@ -2394,30 +3098,22 @@ class DigitalRubleApp(tk.Tk):
                             if event.state == "COMMITTED":
                                 stage_details.append(f"ЦБ: репликация зафиксирована")
                     
-                    self.consensus_table.insert(
-                        "",
-                        tk.END,
-                        values=(
-                            block_hash[:16] + "...",
-                            stage_name,
-                            "-",
-                            "-",
-                            "-",
-                        ),
-                    )
+                    consensus_rows.append((
+                        block_hash[:16] + "...",
+                        stage_name,
+                        "-",
+                        "-",
+                        "-",
+                    ))
                     
                     for detail in stage_details:
-                        self.consensus_table.insert(
+                        consensus_rows.append((
                             "",
-                            tk.END,
-                            values=(
-                                "",
-                                detail,
-                                "-",
-                                "-",
-                                "-",
-                            ),
-                        )
+                            detail,
+                            "-",
+                            "-",
+                            "-",
+                        ))
                     
                     filtered_stage_events = stage_events
                     if stage_num == 3:
@@ -2428,162 +3124,151 @@ class DigitalRubleApp(tk.Tk):
                         filtered_stage_events = []
                     
                     for event in filtered_stage_events:
-                        try:
-                            from datetime import datetime
-                            dt = datetime.fromisoformat(event.created_at.replace('Z', '+00:00'))
-                            time_str = dt.strftime("%H:%M:%S")
-                        except:
+                        time_parts = _log_time_parts(event.created_at)
+                        if time_parts:
+                            time_str = time_parts[1]
+                        else:
                             time_str = event.created_at[-8:] if len(event.created_at) >= 8 else event.created_at
                         
                         actor_name = event.actor
                         if "CBR" in actor_name.upper() or actor_name == "CBR_0":
                             actor_name = "ЦБ"
                         
-                        self.consensus_table.insert(
+                        consensus_rows.append((
                             "",
-                            tk.END,
-                            values=(
-                                "",
-                                event.event,
-                                actor_name,
-                                self._translate_consensus_state(event.state),
-                                time_str,
-                            ),
-                        )
-        
-        if self.consensus_canvas and self._consensus_anim_job is None:
-            self._start_consensus_animation()
-
-        if self.activity_text:
-            self.activity_text.delete("1.0", tk.END)
-            
-            widget_id = id(self.activity_text)
-            zoom_factor = self._text_zoom_factors.get(widget_id, {}).get('zoom_factor', 1.0)
-            base_size = self._text_zoom_factors.get(widget_id, {}).get('base_font_size', 8)
-            font_size = max(6, int(base_size * zoom_factor))
-            
-            header_font = tkfont.Font(size=int(font_size * 1.25), weight="bold")
-            subheader_font = tkfont.Font(size=int(font_size * 1.1), weight="bold")
-            normal_font = tkfont.Font(size=font_size)
-            normal_bold_font = tkfont.Font(size=font_size, weight="bold")
-            small_font = tkfont.Font(size=int(font_size * 0.9))
+                            event.event,
+                            actor_name,
+                            self._translate_consensus_state(event.state),
+                            time_str,
+                        ))
             
-            self.activity_text.tag_configure("header", foreground="#1e40af", font=header_font)
-            self.activity_text.tag_configure("subheader", foreground="#059669", font=subheader_font)
-            self.activity_text.tag_configure("conflict", foreground="red", font=subheader_font)
-            self.activity_text.tag_configure("stage", foreground="#4b5563", font=normal_font)
-            self.activity_text.tag_configure("details", foreground="#6b7280", font=small_font)
-            self.activity_text.tag_configure("separator", foreground="#9ca3af", font=small_font)
-            self.activity_text.tag_configure("time", foreground="#9ca3af", font=small_font)
-            self.activity_text.tag_configure("context", foreground="#7c3aed", font=normal_bold_font)
-            self.activity_text.tag_configure("actor", foreground="#059669", font=normal_font)
+            self._sync_tree(self.consensus_table, enumerate(consensus_rows))
+
+        if self.activity_text and "activity" in sections:
+            self._activity_entries = None
+            self._apply_activity_filter()
+    
+    def _schedule_search_refresh(self, apply_filter) -> None:
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(200, self._run_search_refresh, apply_filter)
+
+    def _run_search_refresh(self, apply_filter) -> None:
+        self._search_job = None
+        apply_filter()
+
+    def _index_log_entries(self, entries) -> list:
+        indexed = []
+        for entry in entries:
+            try:
+                searchable = json.dumps(entry, ensure_ascii=False).casefold()
+            except Exception:
+                searchable = " ".join(
+                    str(entry.get(key, "")) for key in ("context", "stage", "details", "actor")
+                ).casefold()
+            indexed.append((entry, searchable))
+        return indexed
+
+    def _load_log_entries(self, cached, filter_value: str, limit: int):
+        if cached is not None and cached[0] == filter_value:
+            return cached
+        entries = self.platform.search_activity_log(_LOG_FILTER_CONTEXTS.get(filter_value), limit=limit)
+        return filter_value, self._index_log_entries(entries)
+
+    def _filter_log_entries(self, indexed, search_text: str) -> list:
+        if not search_text:
+            return [entry for entry, _ in indexed]
+        return [entry for entry, searchable in indexed if search_text in searchable]
+
+    def _filtered_cbr_entries(self):
+        filter_value = self.cbr_filter_combo.get() if hasattr(self, 'cbr_filter_combo') and self.cbr_filter_combo else "Все"
+        self._cbr_log_entries = self._load_log_entries(self._cbr_log_entries, filter_value, 2000)
+        search_text = self.cbr_search_entry.get().casefold() if hasattr(self, 'cbr_search_entry') and self.cbr_search_entry else ""
+        cached = self._cbr_filtered_entries
+        if cached is None or cached[0] is not self._cbr_log_entries or cached[1] != search_text:
+            entries = self._filter_log_entries(self._cbr_log_entries[1], search_text)
+            cached = self._cbr_filtered_entries = (self._cbr_log_entries, search_text, entries)
+        return filter_value, search_text, cached[2]
+
+    def _apply_activity_filter(self) -> None:
+        if not self.activity_text:
+            return
+        filter_value = self.activity_filter_combo.get() if hasattr(self, 'activity_filter_combo') and self.activity_filter_combo else "Все"
+        self._activity_entries = self._load_log_entries(self._activity_entries, filter_value, 1000)
+        if not self._activity_entries[1] and filter_value not in _LOG_FILTER_CONTEXTS:
+            self._activity_view.show([("Журнал активности пуст.\n", "details")])
+            return
+        
+        search_text = self.activity_search_entry.get().casefold() if hasattr(self, 'activity_search_entry') and self.activity_search_entry else ""
+        entries = self._filter_log_entries(self._activity_entries[1], search_text)
+        
+        if not entries:
+            self._activity_view.show(
+                [(f"Нет записей, соответствующих фильтру '{filter_value}' и поиску '{search_text}'.\n", "details")]
+            )
+            return
+        
+        self._activity_view.set_entries(entries)
+        self.activity_text.see("1.0")
+
+    def _activity_log_chunks(self, entries, state):
+        chunks = []
+        for entry in entries:
+            stage = entry.get("stage", "")
+            details = entry.get("details", "")
+            actor = entry.get("actor", "")
+            context = entry.get("context", "Общее")
+            created_at = entry.get("created_at", "")
             
-            all_entries = self.platform.get_activity_log(limit=1000)
+            time_parts = _log_time_parts(created_at)
+            if time_parts:
+                time_str = f"{time_parts[0]} {time_parts[1]}.{time_parts[2]}"
+            else:
+                time_str = created_at if created_at else ""
             
-            if not all_entries:
-                self.activity_text.insert(tk.END, "Журнал активности пуст.\n", "details")
-                return
+            lower = (stage + details).lower()
+            is_conflict = "конфликт" in lower or "двойной трат" in lower or "ошибка" in lower or "error" in lower
             
-            filter_value = self.activity_filter_combo.get() if hasattr(self, 'activity_filter_combo') and self.activity_filter_combo else "Все"
-            search_text = self.activity_search_entry.get().lower() if hasattr(self, 'activity_search_entry') and self.activity_search_entry else ""
+            log_parts = []
+            if time_str:
+                log_parts.append(f"[{time_str}]")
+            if context and context != "Общее":
+                log_parts.append(f"[{context}]")
+            if stage:
+                log_parts.append(f"[{stage}]")
+            if actor and actor != "Система":
+                log_parts.append(f"[{actor}]")
             
-            entries = []
-            for entry in all_entries:
-                context = entry.get("context", "Общее")
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "")
-                
-                if filter_value != "Все":
-                    context_map = {
-                        "Транзакции": "Транзакция",
-                        "Смарт-контракты": ["Смарт-контракт", "Смарт-контракты"],
-                        "Эмиссия": "Эмиссия",
-                        "Блоки": "Блок",
-                        "Консенсус": "Консенсус",
-                    }
-                    expected_contexts = context_map.get(filter_value)
-                    if expected_contexts:
-                        if isinstance(expected_contexts, list):
-                            if context not in expected_contexts:
-                                continue
-                        else:
-                            if expected_contexts != context:
-                                continue
-                
-                if search_text:
-                    try:
-                        import json as _json_mod
-                        searchable = _json_mod.dumps(entry, ensure_ascii=False).lower()
-                    except Exception:
-                        searchable = f"{context} {stage} {details} {actor}".lower()
-                    if search_text not in searchable:
-                        continue
-                
-                entries.append(entry)
-            
-            if not entries:
-                self.activity_text.insert(tk.END, f"Нет записей, соответствующих фильтру '{filter_value}' и поиску '{search_text}'.\n", "details")
-                return
-            
-            for entry in entries:
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "")
-                context = entry.get("context", "Общее")
-                created_at = entry.get("created_at", "")
-                
-                try:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                    time_str = dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                except:
-                    time_str = created_at if created_at else ""
-                
-                lower = (stage + details).lower()
-                is_conflict = "конфликт" in lower or "двойной трат" in lower or "ошибка" in lower or "error" in lower
-                
-                log_parts = []
-                if time_str:
-                    log_parts.append(f"[{time_str}]")
-                if context and context != "Общее":
-                    log_parts.append(f"[{context}]")
-                if stage:
-                    log_parts.append(f"[{stage}]")
-                if actor and actor != "Система":
-                    log_parts.append(f"[{actor}]")
-                
-                event_line = " ".join(log_parts)
-                if details:
-                    event_line += f" {details}"
-                
-                self.activity_text.insert(tk.END, event_line + "\n", "conflict" if is_conflict else "details")
+            event_line = " ".join(log_parts)
+            if details:
+                event_line += f" {details}"
             
-            self.activity_text.see("1.0")
+            chunks.append((event_line + "\n", "conflict" if is_conflict else "details"))
+        return chunks, state
     
+    def _append_log(self, widget, chunks, replace: bool = False) -> None:
+        widget.configure(state=tk.NORMAL)
+        if replace:
+            widget.delete("1.0", tk.END)
+        segments = [part for chunk in chunks for part in chunk]
+        if segments:
+            widget.insert(tk.END, *segments)
+        widget.configure(state=tk.DISABLED)
+
     def _format_context_name(self, context: str) -> str:
-        context_map = {
-            "Транзакция": "📝 ТРАНЗАКЦИЯ",
-            "Оффлайн-транзакция": "📱 ОФФЛАЙН-ТРАНЗАКЦИЯ",
-            "Смарт-контракт": "📄 СМАРТ-КОНТРАКТ",
-            "Эмиссия": "💰 ЭМИССИЯ",
-            "Блок": "🔗 БЛОК",
-            "Консенсус": "🤝 КОНСЕНСУС",
-            "Репликация": "🔄 РЕПЛИКАЦИЯ",
-            "Распределенный реестр": "📚 РАСПРЕДЕЛЕННЫЙ РЕЕСТР",
-            "Общее": "⚙️ ОБЩЕЕ",
-        }
-        return context_map.get(context, f"📌 {context.upper()}")
+        return _CONTEXT_DISPLAY_NAMES.get(context) or f"📌 {context.upper()}"
 
     def _refresh_errors_table(self) -> None:
+        fetch_error = None
         if self.errors_table:
-            self._clear_tree(self.errors_table)
             try:
                 failed_txs = self.platform.get_failed_transactions()
                 system_errors = self.platform.get_system_errors()
             except Exception as e:
                 failed_txs = []
                 system_errors = []
+                fetch_error = e
+            rows = []
             for ftx in failed_txs:
                 error_type = ftx['error_type']
                 tx_id = ftx.get("tx_id") or "-"
@@ -2594,182 +3279,155 @@ class DigitalRubleApp(tk.Tk):
                 else:
                     type_label = f"Транзакция {tx_id}"
                     context_str = f"TX: {tx_id}" if tx_id != "-" else "-"
-                self.errors_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                rows.append((
+                    f"failed:{ftx['id']}",
+                    (
                         f"{type_label} ({error_type})",
                         ftx["error_message"],
                         context_str,
                         ftx["created_at"],
                     ),
-                )
+                ))
             for err in system_errors:
-                self.errors_table.insert(
-                    "",
-                    tk.END,
-                    values=(
+                rows.append((
+                    f"system:{err['id']}",
+                    (
                         f"Система: {err['error_type']}",
                         err["error_message"],
                         err.get("context", "-") or "-",
                         err["created_at"],
                     ),
-                )
+                ))
+            self._set_table_rows(self.errors_table, rows)
 
         if self.cbr_log:
-            self.cbr_log.delete("1.0", tk.END)
+            self._cbr_log_entries = None
+            self._apply_cbr_filter()
+        if fetch_error is not None:
+            raise fetch_error
+
+    def _apply_cbr_filter(self) -> None:
+        if not self.cbr_log:
+            return
+        filter_value, search_text, entries = self._filtered_cbr_entries()
+        if not self._cbr_log_entries[1] and filter_value not in _LOG_FILTER_CONTEXTS:
+            self._cbr_log_view.show(
+                [("Журнал событий ЦБ пуст. Выполните действия в системе для генерации логов.\n", "details")]
+            )
+            return
+        
+        if not entries:
+            self._cbr_log_view.show(
+                [(f"Нет записей, соответствующих фильтру '{filter_value}' и поиску '{search_text}'.\n", "details")]
+            )
+            return
+        
+        self._cbr_log_view.set_entries(entries)
+        self.cbr_log.see("1.0")
+
+    def _cbr_log_chunks(self, entries, prev_context):
+        chunks = []
+        for entry in entries:
+            stage = entry.get("stage", "")
+            details = entry.get("details", "")
+            actor = entry.get("actor", "Система")
+            context = entry.get("context", "Общее")
+            created_at = entry.get("created_at", "")
             
-            widget_id = id(self.cbr_log)
-            zoom_factor = self._text_zoom_factors.get(widget_id, {}).get('zoom_factor', 1.0)
-            base_size = self._text_zoom_factors.get(widget_id, {}).get('base_font_size', 8)
-            font_size = max(6, int(base_size * zoom_factor))
+            time_parts = _log_time_parts(created_at)
+            if time_parts:
+                time_str = f"{time_parts[1]}.{time_parts[2]}"
+            else:
+                time_str = created_at[-12:] if len(created_at) >= 12 else created_at
             
-            header_font = tkfont.Font(size=int(font_size * 1.1), weight="bold")
-            normal_font = tkfont.Font(size=font_size)
-            normal_bold_font = tkfont.Font(size=font_size, weight="bold")
-            small_font = tkfont.Font(size=int(font_size * 0.9))
+            if prev_context and prev_context != context:
+                separator = f"\n{'='*100}\n"
+                chunks.append((separator, "separator"))
             
-            self.cbr_log.tag_configure("header", foreground="#1e40af", font=header_font)
-            self.cbr_log.tag_configure("stage", foreground="#059669", font=header_font)
-            self.cbr_log.tag_configure("details", foreground="#4b5563", font=small_font)
-            self.cbr_log.tag_configure("time", foreground="#9ca3af", font=small_font)
-            self.cbr_log.tag_configure("actor", foreground="#7c3aed", font=small_font)
-            self.cbr_log.tag_configure("context", foreground="#dc2626", font=normal_bold_font)
-            self.cbr_log.tag_configure("separator", foreground="#9ca3af", font=small_font)
+            if prev_context != context:
+                context_display = self._format_context_name(context)
+                header_text = f"{context_display}\n"
+                chunks.append((header_text, "header"))
             
-            all_entries = self.platform.get_activity_log(limit=2000)
+            stage_text = f"  [{time_str}] {stage}\n"
+            chunks.append((stage_text, "stage"))
             
-            if not all_entries:
-                self.cbr_log.insert(tk.END, "Журнал событий ЦБ пуст. Выполните действия в системе для генерации логов.\n", "details")
-                return
+            if actor and actor != "Система":
+                actor_text = f"    Актор: {actor}\n"
+                chunks.append((actor_text, "actor"))
             
-            filter_value = self.cbr_filter_combo.get() if hasattr(self, 'cbr_filter_combo') and self.cbr_filter_combo else "Все"
-            search_text = self.cbr_search_entry.get().lower() if hasattr(self, 'cbr_search_entry') and self.cbr_search_entry else ""
+            if details:
+                detail_lines = details.split(", ")
+                for detail_line in detail_lines:
+                    if detail_line.strip():
+                        detail_text = f"    {detail_line.strip()}\n"
+                        chunks.append((detail_text, "details"))
             
-            entries = []
-            for entry in all_entries:
-                context = entry.get("context", "Общее")
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "")
-                
-                if filter_value != "Все":
-                    context_map = {
-                        "Транзакции": "Транзакция",
-                        "Смарт-контракты": ["Смарт-контракт", "Смарт-контракты"],
-                        "Эмиссия": "Эмиссия",
-                        "Блоки": "Блок",
-                        "Консенсус": "Консенсус",
-                    }
-                    expected_contexts = context_map.get(filter_value)
-                    if expected_contexts:
-                        if isinstance(expected_contexts, list):
-                            if context not in expected_contexts:
-                                continue
-                        else:
-                            if expected_contexts != context:
-                                continue
-                
-                if search_text:
-                    try:
-                        import json as _json_mod
-                        searchable = _json_mod.dumps(entry, ensure_ascii=False).lower()
-                    except Exception:
-                        searchable = f"{context} {stage} {details} {actor}".lower()
-                    if search_text not in searchable:
-                        continue
-                
-                entries.append(entry)
+            chunks.append(("\n", "separator"))
             
-            if not entries:
-                self.cbr_log.insert(tk.END, f"Нет записей, соответствующих фильтру '{filter_value}' и поиску '{search_text}'.\n", "details")
+            prev_context = context
+        return chunks, prev_context
+
+    def _write_log_csv(self, filename: str, entries) -> None:
+        import csv
+        with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(_LOG_EXPORT_HEADER)
+            writer.writerows(map(_LOG_EXPORT_ROW, entries))
+
+    def _write_log_json(self, filename: str, entries) -> None:
+        if ORJSON_AVAILABLE:
+            with open(filename, "wb") as f:
+                f.write(orjson.dumps(entries))
+            return
+        encode = _LOG_EXPORT_ENCODER.encode
+        with open(filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write("[")
+            for start in range(0, len(entries), _LOG_EXPORT_BATCH):
+                batch = entries[start:start + _LOG_EXPORT_BATCH]
+                f.write(("," if start else "") + "\n" + ",\n".join(map(encode, batch)))
+            f.write("\n]" if entries else "]")
+
+    def _log_export_running(self) -> bool:
+        if self._log_export_future is None:
+            return False
+        messagebox.showinfo("Экспорт", "Экспорт журнала уже выполняется, дождитесь его завершения")
+        return True
+
+    def _set_log_export_state(self, state) -> None:
+        for button in self._log_export_buttons:
+            try:
+                button.configure(state=state)
+            except tk.TclError:
+                pass
+
+    def _write_log_export(self, write, filename: str, entries, message: str) -> None:
+        if self._log_export_running():
+            return
+
+        def on_written(future) -> None:
+            self._log_export_future = None
+            self._set_log_export_state(tk.NORMAL)
+            try:
+                future.result()
+            except Exception as exc:
+                messagebox.showerror("Ошибка экспорта", f"Ошибка при экспорте: {exc}")
                 return
-            
-            prev_context = None
-            
-            for entry in entries:
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "Система")
-                context = entry.get("context", "Общее")
-                created_at = entry.get("created_at", "")
-                
-                try:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                    time_str = dt.strftime("%H:%M:%S.%f")[:-3]
-                except:
-                    time_str = created_at[-12:] if len(created_at) >= 12 else created_at
-                
-                if prev_context and prev_context != context:
-                    separator = f"\n{'='*100}\n"
-                    self.cbr_log.insert(tk.END, separator, "separator")
-                
-                if prev_context != context:
-                    context_display = self._format_context_name(context)
-                    header_text = f"{context_display}\n"
-                    self.cbr_log.insert(tk.END, header_text, "header")
-                
-                stage_text = f"  [{time_str}] {stage}\n"
-                self.cbr_log.insert(tk.END, stage_text, "stage")
-                
-                if actor and actor != "Система":
-                    actor_text = f"    Актор: {actor}\n"
-                    self.cbr_log.insert(tk.END, actor_text, "actor")
-                
-                if details:
-                    detail_lines = details.split(", ")
-                    for detail_line in detail_lines:
-                        if detail_line.strip():
-                            detail_text = f"    {detail_line.strip()}\n"
-                            self.cbr_log.insert(tk.END, detail_text, "details")
-                
-                self.cbr_log.insert(tk.END, "\n", "separator")
-                
-                prev_context = context
-            
-            self.cbr_log.see("1.0")
-    
+            messagebox.showinfo("Экспорт", message)
+
+        self._set_log_export_state(tk.DISABLED)
+        self._log_export_future = self._run_in_background(
+            functools.partial(write, filename, entries), on_written, self._export_executor
+        )
+
     def _export_cbr_log_csv(self) -> None:
-        try:
-            all_entries = self.platform.get_activity_log(limit=2000)
-            if not all_entries:
-                messagebox.showinfo("Экспорт", "Нет данных для экспорта")
-                return
-            
-            filter_value = self.cbr_filter_combo.get() if hasattr(self, 'cbr_filter_combo') and self.cbr_filter_combo else "Все"
-            search_text = self.cbr_search_entry.get().lower() if hasattr(self, 'cbr_search_entry') and self.cbr_search_entry else ""
-            
-            entries = []
-            for entry in all_entries:
-                context = entry.get("context", "Общее")
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "")
-                
-                if filter_value != "Все":
-                    context_map = {
-                        "Транзакции": "Транзакция",
-                        "Смарт-контракты": ["Смарт-контракт", "Смарт-контракты"],
-                        "Эмиссия": "Эмиссия",
-                        "Блоки": "Блок",
-                        "Консенсус": "Консенсус",
-                    }
-                    expected_contexts = context_map.get(filter_value)
-                    if expected_contexts:
-                        if isinstance(expected_contexts, list):
-                            if context not in expected_contexts:
-                                continue
-                        else:
-                            if expected_contexts != context:
-                                continue
-                
-                if search_text:
-                    searchable = f"{context} {stage} {details} {actor}".lower()
-                    if search_text not in searchable:
-                        continue
-                
-                entries.append(entry)
+        if self._log_export_running():
+            return
+        try:
+            filter_value, search_text, entries = self._filtered_cbr_entries()
+            if not self._cbr_log_entries[1] and filter_value not in _LOG_FILTER_CONTEXTS:
+                messagebox.showinfo("Экспорт", "Нет данных для экспорта")
+                return
             
             if not entries:
                 messagebox.showinfo("Экспорт", "Нет данных для экспорта с примененными фильтрами")
@@ -2783,63 +3441,19 @@ class DigitalRubleApp(tk.Tk):
             if not filename:
                 return
             
-            import csv
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Время", "Контекст", "Этап", "Актор", "Детали"])
-                for entry in entries:
-                    writer.writerow([
-                        entry.get("created_at", ""),
-                        entry.get("context", ""),
-                        entry.get("stage", ""),
-                        entry.get("actor", ""),
-                        entry.get("details", "")
-                    ])
-            messagebox.showinfo("Экспорт", f"Журнал ЦБ экспортирован в {filename} ({len(entries)} записей)")
+            self._write_log_export(self._write_log_csv, filename, entries, f"Журнал ЦБ экспортирован в {filename} ({len(entries)} записей)")
         except Exception as e:
             messagebox.showerror("Ошибка экспорта", f"Ошибка при экспорте: {e}")
     
     def _export_cbr_log_json(self) -> None:
+        if self._log_export_running():
+            return
         try:
-            all_entries = self.platform.get_activity_log(limit=2000)
-            if not all_entries:
+            filter_value, search_text, entries = self._filtered_cbr_entries()
+            if not self._cbr_log_entries[1] and filter_value not in _LOG_FILTER_CONTEXTS:
                 messagebox.showinfo("Экспорт", "Нет данных для экспорта")
                 return
             
-            filter_value = self.cbr_filter_combo.get() if hasattr(self, 'cbr_filter_combo') and self.cbr_filter_combo else "Все"
-            search_text = self.cbr_search_entry.get().lower() if hasattr(self, 'cbr_search_entry') and self.cbr_search_entry else ""
-            
-            entries = []
-            for entry in all_entries:
-                context = entry.get("context", "Общее")
-                stage = entry.get("stage", "")
-                details = entry.get("details", "")
-                actor = entry.get("actor", "")
-                
-                if filter_value != "Все":
-                    context_map = {
-                        "Транзакции": "Транзакция",
-                        "Смарт-контракты": ["Смарт-контракт", "Смарт-контракты"],
-                        "Эмиссия": "Эмиссия",
-                        "Блоки": "Блок",
-                        "Консенсус": "Консенсус",
-                    }
-                    expected_contexts = context_map.get(filter_value)
-                    if expected_contexts:
-                        if isinstance(expected_contexts, list):
-                            if context not in expected_contexts:
-                                continue
-                        else:
-                            if expected_contexts != context:
-                                continue
-                
-                if search_text:
-                    searchable = f"{context} {stage} {details} {actor}".lower()
-                    if search_text not in searchable:
-                        continue
-                
-                entries.append(entry)
-            
             if not entries:
                 messagebox.showinfo("Экспорт", "Нет данных для экспорта с примененными фильтрами")
                 return
@@ -2852,13 +3466,13 @@ class DigitalRubleApp(tk.Tk):
             if not filename:
                 return
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, ensure_ascii=False, indent=2)
-            messagebox.showinfo("Экспорт", f"Журнал ЦБ экспортирован в {filename} ({len(entries)} записей)")
+            self._write_log_export(self._write_log_json, filename, entries, f"Журнал ЦБ экспортирован в {filename} ({len(entries)} записей)")
         except Exception as e:
             messagebox.showerror("Ошибка экспорта", f"Ошибка при экспорте: {e}")
     
     def _export_activity_log_csv(self) -> None:
+        if self._log_export_running():
+            return
         try:
             entries = self.platform.get_activity_log(limit=1000)
             if not entries:
@@ -2873,23 +3487,13 @@ class DigitalRubleApp(tk.Tk):
             if not filename:
                 return
             
-            import csv
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Время", "Контекст", "Этап", "Актор", "Детали"])
-                for entry in entries:
-                    writer.writerow([
-                        entry.get("created_at", ""),
-                        entry.get("context", ""),
-                        entry.get("stage", ""),
-                        entry.get("actor", ""),
-                        entry.get("details", "")
-                    ])
-            messagebox.showinfo("Экспорт", f"Журнал этапов экспортирован в {filename}")
+            self._write_log_export(self._write_log_csv, filename, entries, f"Журнал этапов экспортирован в {filename}")
         except Exception as e:
             messagebox.showerror("Ошибка экспорта", f"Ошибка при экспорте: {e}")
     
     def _export_activity_log_json(self) -> None:
+        if self._log_export_running():
+            return
         try:
             entries = self.platform.get_activity_log(limit=1000)
             if not entries:
@@ -2904,73 +3508,86 @@ class DigitalRubleApp(tk.Tk):
             if not filename:
                 return
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(entries, f, ensure_ascii=False, indent=2)
-            messagebox.showinfo("Экспорт", f"Журнал этапов экспортирован в {filename}")
+            self._write_log_export(self._write_log_json, filename, entries, f"Журнал этапов экспортирован в {filename}")
         except Exception as e:
             messagebox.showerror("Ошибка экспорта", f"Ошибка при экспорте: {e}")
 
+    def _consensus_canvas_inputs(self):
+        version = DatabaseManager.table_versions(("blocks", "network_nodes", "banks"))
+        cached = self._consensus_canvas_inputs_cache
+        if cached is None or cached[0] != version:
+            blocks_count = self.platform.db.execute(
+                "SELECT COUNT(*) as count FROM blocks WHERE height > 0",
+                fetchone=True
+            )
+            has_transactions = bool(blocks_count and blocks_count["count"] > 0)
+            nodes = tuple(self.platform.consensus.get_nodes())
+            cached = self._consensus_canvas_inputs_cache = (version, has_transactions, nodes)
+        return cached[1], cached[2]
+
     def _refresh_consensus_canvas(self) -> None:
         try:
             canvas = self.consensus_canvas
             if not canvas:
                 return
-            canvas.delete("all")
             width = int(canvas.winfo_width() or 1200)
+
+            def show_message(text: str) -> None:
+                canvas.delete("all")
+                self._consensus_layout_key = None
+                self._consensus_stage_key = None
+                canvas.create_text(width // 2, 140, text=text, fill="gray", font=("TkDefaultFont", 10))
             
-            blocks_count = self.platform.db.execute(
-                "SELECT COUNT(*) as count FROM blocks WHERE height > 0",
-                fetchone=True
-            )
-            has_transactions = blocks_count and blocks_count["count"] > 0
-            
+            has_transactions, nodes = self._consensus_canvas_inputs()
             if not has_transactions:
-                canvas.create_text(
-                    width // 2,
-                    140,
-                    text="Создайте первую транзакцию, чтобы увидеть визуализацию консенсуса.",
-                    fill="gray",
-                    font=("TkDefaultFont", 10),
-                )
+                show_message("Создайте первую транзакцию, чтобы увидеть визуализацию консенсуса.")
                 return
             
-            nodes = self.platform.consensus.get_nodes()
             if not nodes or len(nodes) == 0:
-                canvas.create_text(
-                    width // 2,
-                    140,
-                    text="Нет узлов. Добавьте банки, чтобы увидеть визуализацию консенсуса.",
-                    fill="gray",
-                    font=("TkDefaultFont", 10),
-                )
+                show_message("Нет узлов. Добавьте банки, чтобы увидеть визуализацию консенсуса.")
                 return
             
             cbr_nodes = [n for n in nodes if "CBR" in n.upper() or "ЦБ" in n.upper()]
             bank_nodes = [n for n in nodes if "BANK" in n.upper() and n not in cbr_nodes]
             
             if not cbr_nodes:
-                canvas.create_text(
-                    width // 2,
-                    140,
-                    text="ЦБ не найден.",
-                    fill="gray",
-                    font=("TkDefaultFont", 10),
-                )
+                show_message("ЦБ не найден.")
                 return
             
-            current_stage = getattr(self, "_forced_consensus_stage", None) or self._determine_current_stage()
+            current_stage = self._forced_consensus_stage or self._determine_current_stage()
             stage_name = self._get_stage_name(current_stage)
             
             leader_x = width // 2
             leader_y = 90
             y_banks = 260
             
-            node_radius = 40
-            canvas.create_oval(
-                leader_x - node_radius, leader_y - node_radius, leader_x + node_radius, leader_y + node_radius, 
-                fill="#10b981", outline="#0f172a", width=2
-            )
-            canvas.create_text(leader_x, leader_y, text="ЦБ РФ", fill="black", width=100, font=("TkDefaultFont", 8, "bold"))
+            node_radius = 35
+            layout = _consensus_node_layout(width, tuple(bank_nodes), node_radius)
+            sorted_bank_nodes = [node for node, _x in layout]
+            node_positions = {node: (x, y_banks) for node, x in layout}
+            
+            layout_key = (width, tuple(cbr_nodes), tuple(sorted_bank_nodes))
+            stage_key = (layout_key, current_stage, bool(self._consensus_seen_events))
+            if stage_key == self._consensus_stage_key:
+                return
+            self._consensus_stage_key = None
+            if layout_key != self._consensus_layout_key:
+                canvas.delete("all")
+                leader_radius = 40
+                canvas.create_oval(
+                    leader_x - leader_radius, leader_y - leader_radius, leader_x + leader_radius, leader_y + leader_radius, 
+                    fill="#10b981", outline="#0f172a", width=2, tags="nodes"
+                )
+                canvas.create_text(leader_x, leader_y, text="ЦБ РФ", fill="black", width=100, font=("TkDefaultFont", 8, "bold"), tags="nodes")
+                for node, (x, y) in node_positions.items():
+                    canvas.create_oval(
+                        x - node_radius, y - node_radius, x + node_radius, y + node_radius, 
+                        fill="#2563eb", outline="#0f172a", width=2, tags="nodes"
+                    )
+                    canvas.create_text(x, y, text=node, fill="white", font=("TkDefaultFont", 8, "bold"), width=80, tags="nodes")
+                self._consensus_layout_key = layout_key
+            else:
+                canvas.delete("stage")
             
             if current_stage > 0:
                 canvas.create_text(
@@ -2978,78 +3595,51 @@ class DigitalRubleApp(tk.Tk):
                     leader_y - 60,
                     text=stage_name,
                     fill="#1f2937",
-                    font=("TkDefaultFont", 9, "bold")
-                )
-            
-            if not bank_nodes:
-                return
-            
-            def extract_number(node_name):
-                import re
-                match = re.search(r'(\d+)', node_name)
-                return int(match.group(1)) if match else 999
-            
-            sorted_bank_nodes = sorted(bank_nodes, key=extract_number)
-            
-            min_spacing = 80
-            calculated_spacing = width // (len(sorted_bank_nodes) + 1)
-            spacing = max(calculated_spacing, min_spacing)
-            
-            node_radius = 35
-            node_positions = {}
-            for idx, node in enumerate(sorted_bank_nodes, start=1):
-                x = spacing * idx
-                if x + node_radius > width - 10:
-                    total_width = spacing * len(sorted_bank_nodes)
-                    start_x = (width - total_width) // 2
-                    x = start_x + spacing * (idx - 1) + spacing // 2
-                
-                node_positions[node] = (x, y_banks)
-                
-                canvas.create_oval(
-                    x - node_radius, y_banks - node_radius, x + node_radius, y_banks + node_radius, 
-                    fill="#2563eb", outline="#0f172a", width=2
+                    font=("TkDefaultFont", 9, "bold"),
+                    tags="stage",
                 )
-                canvas.create_text(x, y_banks, text=node, fill="white", font=("TkDefaultFont", 8, "bold"), width=80)
             
-            if current_stage > 0:
+            if current_stage > 0 and sorted_bank_nodes:
                 self._draw_stage_arrows(canvas, current_stage, leader_x, leader_y, node_positions, sorted_bank_nodes, y_banks)
+                canvas.addtag_all("stage")
+                canvas.dtag("nodes", "stage")
+            self._consensus_stage_key = stage_key
             
         except Exception as e:
             import traceback
+            self._consensus_canvas_key = None
+            self._consensus_layout_key = None
+            self._consensus_stage_key = None
             print(f"Ошибка при обновлении canvas консенсуса: {e}")
             traceback.print_exc()
     
     def _determine_current_stage(self) -> int:
         """Определяет текущий этап консенсуса строго последовательно 1→6"""
-        if not hasattr(self, '_consensus_anim_events') or not self._consensus_anim_events:
-            return 0
-        
-        seen_events = self._consensus_anim_events[:self._consensus_anim_index + 1]
+        seen_events = self._consensus_seen_events
         if not seen_events:
             return 0
         
         stage = 0
         
-        if any(e.get("state") in {"APPEND_ENTRIES", "LEADER_APPEND"} for e in seen_events):
+        if any(e["state"] in {"APPEND_ENTRIES", "LEADER_APPEND"} for e in seen_events):
             stage = 1
         else:
             return stage
         
-        if any(e.get("state") in {"VOTE_REQUEST", "VOTE_GRANTED", "QUORUM_REACHED"} for e in seen_events):
+        if any(e["state"] in {"VOTE_REQUEST", "VOTE_GRANTED", "QUORUM_REACHED"} for e in seen_events):
             stage = 2
         else:
             return stage
         
-        if any(e.get("state") == "REPLICATION" for e in seen_events):
+        if any(e["state"] == "REPLICATION" for e in seen_events):
             stage = 3
         else:
             return stage
         
         if any(
-            e.get("state") == "ENTRY_APPLIED"
-            and e.get("actor")
-            and "BANK" in e.get("actor", "").upper()
+            e["state"] == "ENTRY_APPLIED"
+            and e["actor"]
+            and "BANK" in e["actor"].upper()
             for e in seen_events
         ):
             stage = 4
@@ -3057,16 +3647,16 @@ class DigitalRubleApp(tk.Tk):
             return stage
         
         if any(
-            e.get("state") == "ENTRY_APPLIED"
-            and e.get("actor")
-            and ("CBR" in e.get("actor", "").upper() or "ЦБ" in e.get("actor", "").upper())
+            e["state"] == "ENTRY_APPLIED"
+            and e["actor"]
+            and ("CBR" in e["actor"].upper() or "ЦБ" in e["actor"].upper())
             for e in seen_events
         ):
             stage = 5
         else:
             return stage
         
-        if any(e.get("state") == "COMMITTED" for e in seen_events):
+        if any(e["state"] == "COMMITTED" for e in seen_events):
             stage = 6
         
         return stage
@@ -3087,10 +3677,10 @@ class DigitalRubleApp(tk.Tk):
     def _draw_stage_arrows(self, canvas, stage: int, leader_x: int, leader_y: int, 
                           node_positions: dict, sorted_bank_nodes: list, y_banks: int) -> None:
         """Рисует стрелочки для текущего этапа"""
-        if not hasattr(self, '_consensus_anim_events') or not self._consensus_anim_events:
+        seen_events = self._consensus_seen_events
+        if not seen_events:
             return
         
-        seen_events = self._consensus_anim_events[:self._consensus_anim_index + 1]
         node_radius = 35
         leader_radius = 40
         
@@ -3183,78 +3773,52 @@ class DigitalRubleApp(tk.Tk):
         if not self.sender_combo or not self.receiver_combo:
             return
         channel = self.channel_combo.get() if self.channel_combo else "C2C"
-        mapping = {
-            "C2C": ("INDIVIDUAL", "INDIVIDUAL"),
-            "C2B": ("INDIVIDUAL", "BUSINESS"),
-            "B2C": ("BUSINESS", "INDIVIDUAL"),
-            "B2B": ("BUSINESS", "BUSINESS"),
-            "G2B": ("GOVERNMENT", "BUSINESS"),
-            "B2G": ("BUSINESS", "GOVERNMENT"),
-            "C2G": ("INDIVIDUAL", "GOVERNMENT"),
-            "G2C": ("GOVERNMENT", "INDIVIDUAL"),
-        }
-        sender_type, receiver_type = mapping.get(channel, ("INDIVIDUAL", "INDIVIDUAL"))
-        sender_users = sorted(
-            self.platform.list_users(sender_type),
-            key=lambda x: x["id"]
-        )
-        senders = [
-            f"{u['id']} | {u['name']} ({u['user_type']})"
-            for u in sender_users
-        ]
-        
-        receiver_users = sorted(
-            self.platform.list_users(receiver_type),
-            key=lambda x: x["id"]
-        )
-        receivers = [
-            f"{u['id']} | {u['name']} ({u['user_type']})"
-            for u in receiver_users
-        ]
-        old_sender = self.sender_combo.get()
-        self.sender_combo["values"] = senders
-        if old_sender in senders:
-            self.sender_combo.set(old_sender)
-        elif senders:
-            self.sender_combo.current(0)
-
-        old_receiver = self.receiver_combo.get()
-        self.receiver_combo["values"] = receivers
-        if old_receiver in receivers:
-            self.receiver_combo.set(old_receiver)
-        elif receivers:
-            self.receiver_combo.current(0)
+        sender_types, receiver_types = CHANNEL_RULES.get(channel, CHANNEL_RULES["C2C"])
+        senders = tuple(label for code in sender_types for label in self._user_labels[code])
+        receivers = tuple(label for code in receiver_types for label in self._user_labels[code])
+        for combo, values in ((self.sender_combo, senders), (self.receiver_combo, receivers)):
+            if self._combo_values.get(id(combo)) == values:
+                continue
+            self._combo_values[id(combo)] = values
+            old = combo.get()
+            combo["values"] = values
+            if old in values:
+                combo.set(old)
+            elif values:
+                combo.current(0)
+            else:
+                combo.set("")
 
     def _on_channel_change(self, event=None) -> None:
         self._refresh_online_combos()
     def _ui_refresh_consensus(self) -> None:
-        self.refresh_all()
+        self._schedule_refresh()
         self._start_consensus_animation()
     
     def _ui_simulate_cbr_failure(self) -> None:
         try:
-            self.platform.consensus.simulate_cbr_failure()
-            
-            from datetime import datetime, timezone
-            fake_block_hash = f"failure-sim-{datetime.now(timezone.utc).isoformat()}"
-            
-            banks = self.platform.list_banks()
-            for bank in banks:
-                bank_id = bank["id"]
-                try:
-                    from database import DatabaseManager
-                    bank_db = DatabaseManager(f"bank_{bank_id}.db")
-                    from consensus import RaftConsensus
-                    bank_consensus = RaftConsensus(bank_db, node_id=f"BANK_{bank_id}")
-                    bank_consensus.simulate_cbr_failure()
-                    
-                    if not bank_consensus.is_central_bank:
-                        bank_consensus.run_round(fake_block_hash)
-                except Exception as e:
-                    import logging
-                    logging.warning(f"Ошибка при имитации отказа для банка {bank_id}: {e}")
+            with self._platform_operation():
+                self.platform.consensus.simulate_cbr_failure()
+                
+                from datetime import datetime, timezone
+                fake_block_hash = f"failure-sim-{datetime.now(timezone.utc).isoformat()}"
+                
+                banks = self.platform.list_banks()
+                for bank in banks:
+                    bank_id = bank["id"]
+                    try:
+                        bank_db = self._bank_db(bank_id)
+                        from consensus import RaftConsensus
+                        bank_consensus = RaftConsensus(bank_db, node_id=f"BANK_{bank_id}")
+                        bank_consensus.simulate_cbr_failure()
+                        
+                        if not bank_consensus.is_central_bank:
+                            bank_consensus.run_round(fake_block_hash)
+                    except Exception as e:
+                        import logging
+                        logging.warning(f"Ошибка при имитации отказа для банка {bank_id}: {e}")
             
-            self.refresh_all()
+            self._schedule_refresh()
             self._start_consensus_animation()
             
             self.after(5000, self._auto_recover_cbr)
@@ -3270,24 +3834,26 @@ class DigitalRubleApp(tk.Tk):
             messagebox.showerror("Ошибка", f"Не удалось имитировать отказ ЦБ: {exc}")
     
     def _auto_recover_cbr(self) -> None:
+        if self._platform_lock.locked():
+            self.after(500, self._auto_recover_cbr)
+            return
         try:
-
-            self.platform.consensus.simulate_cbr_recovery()
-            
-            banks = self.platform.list_banks()
-            for bank in banks:
-                bank_id = bank["id"]
-                try:
-                    from database import DatabaseManager
-                    bank_db = DatabaseManager(f"bank_{bank_id}.db")
-                    from consensus import RaftConsensus
-                    bank_consensus = RaftConsensus(bank_db, node_id=f"BANK_{bank_id}")
-                    bank_consensus.simulate_cbr_recovery()
-                except Exception as e:
-                    import logging
-                    logging.warning(f"Ошибка при восстановлении для банка {bank_id}: {e}")
+            with self._platform_operation():
+                self.platform.consensus.simulate_cbr_recovery()
+                
+                banks = self.platform.list_banks()
+                for bank in banks:
+                    bank_id = bank["id"]
+                    try:
+                        bank_db = self._bank_db(bank_id)
+                        from consensus import RaftConsensus
+                        bank_consensus = RaftConsensus(bank_db, node_id=f"BANK_{bank_id}")
+                        bank_consensus.simulate_cbr_recovery()
+                    except Exception as e:
+                        import logging
+                        logging.warning(f"Ошибка при восстановлении для банка {bank_id}: {e}")
             
-            self.refresh_all()
+            self._schedule_refresh()
             self._start_consensus_animation()
         except Exception as exc:
             import logging
@@ -3302,8 +3868,7 @@ class DigitalRubleApp(tk.Tk):
             for bank in banks:
                 bank_id = bank["id"]
                 try:
-                    from database import DatabaseManager
-                    bank_db = DatabaseManager(f"bank_{bank_id}.db")
+                    bank_db = self._bank_db(bank_id)
                     from consensus import RaftConsensus
                     bank_consensus = RaftConsensus(bank_db, node_id=f"BANK_{bank_id}")
                     bank_log = bank_consensus.get_failure_recovery_log()
@@ -3626,7 +4191,6 @@ class DigitalRubleApp(tk.Tk):
                 output_lines.append("")
                 
                 try:
-                    from database import DatabaseManager
                     cbr_db = self.platform.db
                     temp_leader_blocks = cbr_db.execute(
                         """
@@ -3691,65 +4255,33 @@ class DigitalRubleApp(tk.Tk):
 
     def _start_consensus_animation(self) -> None:
         if self._consensus_anim_job is not None:
-            self.after_cancel(self._consensus_anim_job)
+            try:
+                self.after_cancel(self._consensus_anim_job)
+            except tk.TclError:
+                pass
             self._consensus_anim_job = None
-        if getattr(self, "_forced_consensus_job", None):
+        if self._forced_consensus_job:
             try:
                 self.after_cancel(self._forced_consensus_job)
-            except Exception:
+            except tk.TclError:
                 pass
         self._forced_consensus_stage = None
         self._forced_consensus_job = None
-        stats = self.platform.consensus.stats()
-        last_block = stats.get("last_block")
-        
-        if not last_block or last_block == "-":
-            rows = self.platform.db.execute(
-                """
-                SELECT block_hash, event, actor, state, created_at
-                FROM consensus_events
-                ORDER BY id DESC
-                LIMIT 100
-                """,
-                fetchall=True,
-            )
-            if rows:
-                last_block = rows[-1]["block_hash"]
-                self._consensus_anim_events = [dict(r) for r in reversed(rows)]
-            else:
-                self._consensus_anim_events = []
-        else:
-            rows = self.platform.db.execute(
-                """
-                SELECT block_hash, event, actor, state, created_at
-                FROM consensus_events
-                WHERE block_hash = ?
-                ORDER BY id ASC
-                """,
-                (last_block,),
-                fetchall=True,
-            )
-            self._consensus_anim_events = [dict(r) for r in rows] if rows else []
-        
-        self._consensus_anim_index = 0
+        self._consensus_anim_iter = self._iter_consensus_events()
+        self._consensus_seen_events = []
         self._consensus_active_actor = None
         self._consensus_active_state = None
         self._consensus_active_event = None
         self._consensus_active_nodes = set()
         self._ledger_active_height = None
         
-        if self._consensus_anim_events:
-            self._run_consensus_animation_step()
-        else:
-            self._refresh_consensus_canvas()
+        self._run_consensus_animation_step()
 
         self._forced_consensus_stage = 1
         self._refresh_consensus_canvas()
         self._schedule_next_forced_stage()
 
     def _schedule_next_forced_stage(self) -> None:
-        if not hasattr(self, "_forced_consensus_stage"):
-            self._forced_consensus_stage = 1
         if self._forced_consensus_stage is None:
             return
         if self._forced_consensus_stage >= 6:
@@ -3765,32 +4297,62 @@ class DigitalRubleApp(tk.Tk):
 
         self._forced_consensus_job = self.after(3000, advance)
 
+    def _iter_consensus_events(self):
+        last_event = self.platform.db.execute(
+            "SELECT block_hash FROM consensus_events ORDER BY id DESC LIMIT 1",
+            fetchone=True,
+        )
+        last_block = last_event["block_hash"] if last_event else None
+        
+        if not last_block or last_block == "-":
+            rows = self.platform.db.execute(
+                """
+                SELECT block_hash, event, actor, state, created_at
+                FROM consensus_events
+                ORDER BY id DESC
+                LIMIT 100
+                """,
+                fetchall=True,
+            )
+            rows = reversed(rows) if rows else []
+        else:
+            rows = self.platform.db.execute(
+                """
+                SELECT block_hash, event, actor, state, created_at
+                FROM consensus_events
+                WHERE block_hash = ?
+                ORDER BY id ASC
+                """,
+                (last_block,),
+                fetchall=True,
+            ) or []
+        
+        yield from rows
+
     def _run_consensus_animation_step(self) -> None:
         if not self.consensus_canvas:
             self._consensus_anim_job = None
             return
         
-        if not self._consensus_anim_events:
-            self._consensus_active_actor = None
-            self._consensus_active_state = None
-            self._consensus_active_event = None
-            self._consensus_active_nodes = set()
+        try:
+            event = next(self._consensus_anim_iter)
+        except StopIteration:
+            if not self._consensus_seen_events:
+                self._consensus_active_actor = None
+                self._consensus_active_state = None
+                self._consensus_active_event = None
+                self._consensus_active_nodes = set()
             self._refresh_consensus_canvas()
             self._consensus_anim_job = None
             return
         
-        if self._consensus_anim_index >= len(self._consensus_anim_events):
-            self._consensus_anim_index = 0
-        
-        event = self._consensus_anim_events[self._consensus_anim_index]
-        self._consensus_active_actor = event.get("actor")
-        self._consensus_active_state = event.get("state")
-        self._consensus_active_event = event.get("event")
+        self._consensus_seen_events.append(event)
+        self._consensus_active_actor = event["actor"]
+        self._consensus_active_state = event["state"]
+        self._consensus_active_event = event["event"]
         
         self._refresh_consensus_canvas()
         
-        self._consensus_anim_index = (self._consensus_anim_index + 1) % len(self._consensus_anim_events)
-        
         self._consensus_anim_job = self.after(800, self._run_consensus_animation_step)
 
     def _selected_id(self, value: str) -> int:
@@ -3804,8 +4366,9 @@ class DigitalRubleApp(tk.Tk):
             user = self.platform.get_user(user_id)
             
             already_open = user["wallet_status"] == "OPEN"
-            self.platform.open_digital_wallet(user_id)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.open_digital_wallet(user_id)
+            self._schedule_refresh()
             if already_open:
                 messagebox.showinfo("Цифровой кошелек", f"У пользователя {user['name']} кошелек уже открыт")
             else:
@@ -3819,8 +4382,9 @@ class DigitalRubleApp(tk.Tk):
             user = self.platform.get_user(user_id)
             selected_bank_id = user["bank_id"]
             amount = float(self.convert_amount.get())
-            self.platform.exchange_to_digital(user_id, amount, bank_id=selected_bank_id)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.exchange_to_digital(user_id, amount, bank_id=selected_bank_id)
+            self._schedule_refresh()
             messagebox.showinfo(
                 "Конвертация средств",
                 f"Цифровой кошелек пользователя {user['name']} пополнен на {amount:.2f} ЦР",
@@ -3833,8 +4397,9 @@ class DigitalRubleApp(tk.Tk):
             user_id = self._selected_id(self.offline_user_combo.get())
             user = self.platform.get_user(user_id)
             already_open = user["offline_status"] == "OPEN"
-            self.platform.open_offline_wallet(user_id)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.open_offline_wallet(user_id)
+            self._schedule_refresh()
             if already_open:
                 messagebox.showinfo("Оффлайн-кошелек", f"Оффлайн-кошелек пользователя {user['name']} уже активен")
             else:
@@ -3846,8 +4411,9 @@ class DigitalRubleApp(tk.Tk):
         try:
             user_id = self._selected_id(self.offline_user_combo.get())
             amount = float(self.offline_amount.get())
-            self.platform.fund_offline_wallet(user_id, amount)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.fund_offline_wallet(user_id, amount)
+            self._schedule_refresh()
             user = self.platform.get_user(user_id)
             messagebox.showinfo(
                 "Оффлайн-кошелек",
@@ -3865,8 +4431,9 @@ class DigitalRubleApp(tk.Tk):
             receiver_id = self._selected_id(self.offline_receiver_combo.get())
             bank_id = self._selected_id(self.offline_bank_combo.get()) if self.offline_bank_combo else None
             amount = float(self.offline_tx_amount.get())
-            self.platform.create_offline_transaction(sender_id, receiver_id, amount, bank_id=bank_id)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.create_offline_transaction(sender_id, receiver_id, amount, bank_id=bank_id)
+            self._schedule_refresh()
             messagebox.showinfo("Оффлайн-транзакция", "Оффлайн-транзакция создана и сохранена локально")
         except Exception as exc:
             messagebox.showerror("Ошибка", str(exc))
@@ -3878,8 +4445,9 @@ class DigitalRubleApp(tk.Tk):
             amount = float(self.online_amount.get())
             channel = self.channel_combo.get()
             bank_id = self._selected_id(self.online_bank_combo.get()) if self.online_bank_combo else None
-            self.platform.create_online_transaction(sender_id, receiver_id, amount, channel, bank_id=bank_id)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.create_online_transaction(sender_id, receiver_id, amount, channel, bank_id=bank_id)
+            self._schedule_refresh()
             messagebox.showinfo("Онлайн транзакция", "Онлайн транзакция успешно выполнена и записана в реестр")
         except Exception as exc:
             messagebox.showerror("Ошибка", str(exc))
@@ -3901,25 +4469,38 @@ class DigitalRubleApp(tk.Tk):
                     next_execution = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
                 except ValueError:
                     raise ValueError("Неверный формат даты/времени. Используйте YYYY-MM-DD HH:MM:SS")
-            self.platform.create_smart_contract(
-                sender_id, receiver_id, bank_id, amount, description, next_execution
-            )
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.create_smart_contract(
+                    sender_id, receiver_id, bank_id, amount, description, next_execution
+                )
+            self._schedule_refresh()
             messagebox.showinfo("Смарт-контракт", "Контракт создан")
         except Exception as exc:
             messagebox.showerror("Ошибка", str(exc))
 
     def _ui_run_contracts(self) -> None:
-        executed = self.platform.execute_due_contracts(force=True)
-        self.refresh_all()
-        messagebox.showinfo("Смарт-контракты", f"Исполнено контрактов: {len(executed)}")
+        def run_contracts():
+            with self._platform_lock:
+                return self.platform.execute_due_contracts(force=True)
+
+        def on_done(future) -> None:
+            self._schedule_refresh()
+            try:
+                executed = future.result()
+            except Exception as exc:
+                messagebox.showerror("Ошибка", str(exc))
+                return
+            messagebox.showinfo("Смарт-контракты", f"Исполнено контрактов: {len(executed)}")
+
+        self._run_in_background(run_contracts, on_done)
 
     def _ui_request_emission(self) -> None:
         try:
             bank_id = self._selected_id(self.bank_combo.get())
             amount = float(self.emission_amount.get())
-            req_id = self.platform.request_emission(bank_id, amount)
-            self.refresh_all()
+            with self._platform_operation():
+                req_id = self.platform.request_emission(bank_id, amount)
+            self._schedule_refresh()
             messagebox.showinfo("Эмиссия", f"Запрос отправлен: {req_id}")
         except Exception as exc:
             messagebox.showerror("Ошибка", str(exc))
@@ -3933,14 +4514,20 @@ class DigitalRubleApp(tk.Tk):
         req_id = item["values"][0]
         reason = "" if approve else "Не выполнены условия резерва"
         try:
-            self.platform.process_emission(req_id, approve, reason)
-            self.refresh_all()
+            with self._platform_operation():
+                self.platform.process_emission(req_id, approve, reason)
+            self._schedule_refresh()
         except Exception as exc:
             messagebox.showerror("Ошибка", str(exc))
 
     def _ui_sync_offline(self) -> None:
-        stats = self.platform.sync_offline_transactions()
-        self.refresh_all()
+        try:
+            with self._platform_operation():
+                stats = self.platform.sync_offline_transactions()
+        except Exception as exc:
+            messagebox.showerror("Ошибка", str(exc))
+            return
+        self._schedule_refresh()
         messagebox.showinfo(
             "Оффлайн синхронизация",
             f"Обработано: {stats['processed']}, Конфликты: {stats['conflicts']}",
@@ -3950,111 +4537,115 @@ class DigitalRubleApp(tk.Tk):
         if not self.bank_tx_table:
             return
         
+        detached = [iid for iids in self._bank_client_iids.values() for iid in iids]
+        detached.extend(("no-bank", "__error__"))
+        self.bank_tx_table.delete(*[iid for iid in detached if self.bank_tx_table.exists(iid)])
         self._clear_tree(self.bank_tx_table)
-        
-        selected_bank = self.bank_filter_combo.get() if self.bank_filter_combo else None
-        bank_id = None
-        if selected_bank:
-            bank_id = self._selected_id(selected_bank)
-        
-        if not bank_id:
-            self.bank_tx_table.insert(
-                "",
-                tk.END,
-                values=(
-                    "-",
-                    "-",
-                    "-",
-                    "Выберите финансовую организацию для просмотра данных",
-                    "-",
-                ),
-            )
-            return
+        self._bank_client_iids = {}
+        self.bank_tx_table.insert(
+            "",
+            tk.END,
+            iid="no-bank",
+            values=(
+                "-",
+                "-",
+                "-",
+                "Выберите финансовую организацию для просмотра данных",
+                "-",
+            ),
+        )
         
         try:
             users = self.platform.list_users()
-            bank_users = [u for u in users if u.get("bank_id") == bank_id]
-            
-            if not bank_users:
-                self.bank_tx_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        "-",
-                        "-",
-                        "-",
-                        "Нет клиентов в данной финансовой организации",
-                        "-",
-                    ),
-                )
-                return
+            all_transactions = self.platform.get_transactions()
             
-            all_transactions = self.platform.get_transactions(bank_id=bank_id)
-            
-            for user in bank_users:
-                user_id = user["id"]
-                user_name = user["name"]
-                user_type = self._user_type_label(user["user_type"])
-                
-                user_txs = [
-                    tx for tx in all_transactions 
-                    if (tx.get("sender_id") == user_id or tx.get("receiver_id") == user_id)
-                ]
+            for bank in self.platform.list_banks():
+                bank_id = bank["id"]
+                bank_tag = f"bank-{bank_id}"
+                bank_iids = self._bank_client_iids.setdefault(bank_id, [])
+                bank_users = [u for u in users if u.get("bank_id") == bank_id]
                 
-                try:
-                    from database import DatabaseManager
-                    bank_db = DatabaseManager(f"bank_{bank_id}.db")
-                    bank_tx_rows = bank_db.execute(
-                        """
-                        SELECT DISTINCT t.id 
-                        FROM transactions t
-                        WHERE (t.sender_id = ? OR t.receiver_id = ?)
-                        """,
-                        (user_id, user_id),
-                        fetchall=True
+                if not bank_users:
+                    iid = f"empty-{bank_id}"
+                    self.bank_tx_table.insert(
+                        "",
+                        tk.END,
+                        iid=iid,
+                        values=(
+                            "-",
+                            "-",
+                            "-",
+                            "Нет клиентов в данной финансовой организации",
+                            "-",
+                        ),
+                        tags=(bank_tag,),
                     )
-                    existing_tx_ids = {tx.get("id") for tx in user_txs}
-                    for row in bank_tx_rows:
-                        if row["id"] not in existing_tx_ids:
-                            tx_row = bank_db.execute(
-                                "SELECT * FROM transactions WHERE id = ?",
-                                (row["id"],),
-                                fetchone=True
-                            )
-                            if tx_row:
-                                user_txs.append(dict(tx_row))
-                except Exception as e:
-                    pass
-                
-                tx_count = len(user_txs)
-                
-                tx_types = {}
-                for tx in user_txs:
-                    tx_type = tx.get("tx_type", "UNKNOWN")
-                    tx_types[tx_type] = tx_types.get(tx_type, 0) + 1
+                    bank_iids.append(iid)
+                    continue
                 
-                if tx_types:
-                    predominant_type = max(tx_types.items(), key=lambda x: x[1])[0]
-                    predominant_label = {
-                        "ONLINE": "Онлайн",
-                        "OFFLINE": "Оффлайн",
-                        "EXCHANGE": "Обмен",
-                        "CONTRACT": "Смарт-контракт",
-                    }.get(predominant_type, predominant_type)
-                else:
-                    predominant_label = "Нет транзакций"
+                bank_transactions = [tx for tx in all_transactions if tx.get("bank_id") == bank_id]
+                try:
+                    bank_db = self._bank_db(bank_id)
+                except Exception:
+                    bank_db = None
                 
-                self.bank_tx_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        user_id,
-                        user_name,
-                        user_type,
-                        tx_count,
-                        predominant_label,
-                    ),
-                )
+                for user in bank_users:
+                    user_id = user["id"]
+                    user_name = user["name"]
+                    user_type = self._user_type_label(user["user_type"])
+                    
+                    user_txs = [
+                        tx for tx in bank_transactions
+                        if (tx.get("sender_id") == user_id or tx.get("receiver_id") == user_id)
+                    ]
+                    
+                    if bank_db is not None:
+                        try:
+                            bank_tx_rows = bank_db.execute(
+                                """
+                                SELECT t.id, t.tx_type
+                                FROM transactions t
+                                WHERE (t.sender_id = ? OR t.receiver_id = ?)
+                                """,
+                                (user_id, user_id),
+                                fetchall=True
+                            )
+                            existing_tx_ids = {tx.get("id") for tx in user_txs}
+                            for row in bank_tx_rows:
+                                if row["id"] not in existing_tx_ids:
+                                    existing_tx_ids.add(row["id"])
+                                    user_txs.append({"id": row["id"], "tx_type": row["tx_type"]})
+                        except Exception as e:
+                            pass
+                    
+                    tx_count = len(user_txs)
+                    
+                    tx_types = {}
+                    for tx in user_txs:
+                        tx_type = tx.get("tx_type", "UNKNOWN")
+                        tx_types[tx_type] = tx_types.get(tx_type, 0) + 1
+                    
+                    if tx_types:
+                        predominant_type = max(tx_types.items(), key=lambda x: x[1])[0]
+                        predominant_label = _TX_TYPE_LABELS.get(predominant_type, predominant_type)
+                    else:
+                        predominant_label = "Нет транзакций"
+                    
+                    iid = f"client-{bank_id}-{user_id}"
+                    self.bank_tx_table.insert(
+                        "",
+                        tk.END,
+                        iid=iid,
+                        values=(
+                            user_id,
+                            user_name,
+                            user_type,
+                            tx_count,
+                            predominant_label,
+                        ),
+                        tags=(bank_tag,),
+                    )
+                    bank_iids.append(iid)
                 
         except Exception as e:
             import traceback
@@ -4063,6 +4654,7 @@ class DigitalRubleApp(tk.Tk):
             self.bank_tx_table.insert(
                 "",
                 tk.END,
+                iid="__error__",
                 values=(
                     "-",
                     "Ошибка",
@@ -4071,6 +4663,24 @@ class DigitalRubleApp(tk.Tk):
                     "-",
                 ),
             )
+        
+        self._apply_bank_filter()
+    
+    def _apply_bank_filter(self) -> None:
+        if not self.bank_tx_table:
+            return
+        
+        selected_bank = self.bank_filter_combo.get() if self.bank_filter_combo else None
+        bank_id = self._selected_id(selected_bank) if selected_bank else None
+        
+        all_iids = [iid for iids in self._bank_client_iids.values() for iid in iids]
+        self.bank_tx_table.detach("no-bank", *all_iids)
+        for index, iid in enumerate(self._bank_client_iids.get(bank_id) or ["no-bank"]):
+            self.bank_tx_table.move(iid, "", index)
+    
+    def _on_bank_filter_change(self, event=None) -> None:
+        self._apply_bank_filter()
+        self._refresh_bank_blocks()
     
     def _refresh_bank_data_and_blocks(self) -> None:
         self._refresh_bank_data()
@@ -4080,49 +4690,40 @@ class DigitalRubleApp(tk.Tk):
         if not self.bank_blocks_table:
             return
         
-        self._clear_tree(self.bank_blocks_table)
-        
         selected_bank = self.bank_filter_combo.get() if self.bank_filter_combo else None
         bank_id = None
         if selected_bank:
             bank_id = self._selected_id(selected_bank)
         
         if not bank_id:
+            self._clear_tree(self.bank_blocks_table)
             return
         
         try:
-            from database import DatabaseManager
-            bank_db = DatabaseManager(f"bank_{bank_id}.db")
+            bank_db = self._bank_db(bank_id)
             
             rows = bank_db.execute(
-                "SELECT * FROM blocks ORDER BY height ASC", fetchall=True
+                """
+                SELECT b.height,
+                       substr(b.hash, 1, 16) || '...' AS hash_short,
+                       (
+                           SELECT COUNT(*) FROM block_transactions bt
+                           JOIN blocks hb ON hb.id = bt.block_id
+                           WHERE hb.height = b.height
+                       ) AS tx_count,
+                       b.timestamp
+                FROM blocks b
+                ORDER BY b.height ASC
+                """,
+                fetchall=True,
             )
             
-            for row in rows:
-                tx_count_row = bank_db.execute(
-                    """
-                    SELECT COUNT(*) as count FROM block_transactions bt 
-                    JOIN blocks b ON b.id = bt.block_id 
-                    WHERE b.height = ?
-                    """,
-                    (row["height"],),
-                    fetchone=True,
-                )
-                tx_count = tx_count_row["count"] if tx_count_row else 0
-                
-                replication_status = "Реплицирован"
-                
-                self.bank_blocks_table.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        row["height"],
-                        row["hash"][:16] + "...",
-                        tx_count,
-                        row["timestamp"],
-                        replication_status,
-                    ),
-                )
+            replication_status = "Реплицирован"
+            table_rows = [
+                (row["height"], (*row, replication_status))
+                for row in rows
+            ]
+            self._set_table_rows(self.bank_blocks_table, table_rows)
         except Exception as e:
             import traceback
             print(f"Ошибка при загрузке блоков ФО: {e}")
@@ -4203,8 +4804,7 @@ class DigitalRubleApp(tk.Tk):
             ]
             
             try:
-                from database import DatabaseManager
-                bank_db = DatabaseManager(f"bank_{bank_id}.db")
+                bank_db = self._bank_db(bank_id)
                 bank_tx_rows = bank_db.execute(
                     """
                     SELECT DISTINCT t.id 
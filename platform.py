@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import random
 import sys
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -33,6 +35,7 @@ except ImportError:
     BATCH_PROCESSING_AVAILABLE = False
 
 DEFAULT_BANK_COUNT = 4
+BANKS_CACHE_TTL = 2.0
 
 def _runtime_data_dir() -> Path:
     data_dir = os.getenv("DR_DATA_DIR")
@@ -90,6 +93,7 @@ def _get_keypair(owner_type: str, owner_id: int) -> CryptoKeyPair:
     return CryptoKeyPair(owner_type, owner_id)
 
 
+@functools.lru_cache(maxsize=8192)
 def _hash_str(value: str) -> str:
     from streebog import streebog_256_hex
     return streebog_256_hex(value.encode("utf-8"))
@@ -163,6 +167,8 @@ class MetricsCollector:
 class DigitalRublePlatform:
     def __init__(self, node_id: str = "CBR_0", db_path: str = "digital_ruble.db") -> None:
         self.db = DatabaseManager(db_path)
+        self.db_ro = DatabaseManager(db_path, read_only=True)
+        self._banks_cache: Optional[Tuple[float, List[Dict]]] = None
         self.ledger = DistributedLedger(self.db)
         self.consensus = MasterchainConsensus(self.db, node_id=node_id)
         self.metrics = MetricsCollector(self.db)
@@ -243,11 +249,12 @@ class DigitalRublePlatform:
                 with open(marker_file, 'r') as f:
                     for line in f:
                         db_path = Path(line.strip())
-                        if db_path.exists():
-                            try:
-                                db_path.unlink()
-                            except Exception:
-                                pass
+                        for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+                            if path.exists():
+                                try:
+                                    path.unlink()
+                                except Exception:
+                                    pass
                 marker_file.unlink()
             except Exception:
                 pass
@@ -277,6 +284,7 @@ class DigitalRublePlatform:
                 "INSERT INTO banks(name) VALUES(?)",
                 (name,),
             )
+            self._invalidate_banks_cache()
             
             row = self.db.execute(
                 "SELECT id FROM banks WHERE name = ?",
@@ -289,7 +297,6 @@ class DigitalRublePlatform:
             
             bank_id = row["id"]
             
-            from database import DatabaseManager
             db_path = f"bank_{bank_id}.db"
             DatabaseManager(db_path)
             
@@ -342,7 +349,6 @@ class DigitalRublePlatform:
             bank_db_path = f"bank_{bank_id}.db"
             if Path(bank_db_path).exists():
                 try:
-                    from database import DatabaseManager
                     bank_db = DatabaseManager(bank_db_path)
                     bank_db_connections.append((bank_db, bank_db_path))
                 except Exception as e:
@@ -351,7 +357,7 @@ class DigitalRublePlatform:
         
         for bank_db, bank_db_path in bank_db_connections:
             try:
-                bank_db._conn.close()
+                bank_db.close()
                 del bank_db
             except Exception:
                 pass
@@ -359,7 +365,7 @@ class DigitalRublePlatform:
         import gc
         gc.collect()
         
-        for bank_db_file in glob.glob("bank_*.db"):
+        for bank_db_file in glob.glob("bank_*.db") + glob.glob("bank_*.db-wal") + glob.glob("bank_*.db-shm"):
             try:
                 db_path = Path(bank_db_file)
                 if db_path.exists():
@@ -393,6 +399,7 @@ class DigitalRublePlatform:
                 except Exception:
                     pass
             _safe_delete("banks")
+            self._invalidate_banks_cache()
             
             if self._distributed_enabled and self.node_manager:
                 try:
@@ -434,12 +441,12 @@ class DigitalRublePlatform:
                 "INSERT INTO banks(name) VALUES(?)",
                 (name,),
             )
+            self._invalidate_banks_cache()
             row = self.db.execute(
                 "SELECT id FROM banks WHERE name = ?", (name,), fetchone=True
             )
             bank_id = row["id"]
             bank_ids.append(bank_id)
-            from database import DatabaseManager
             from pathlib import Path
 
             db_path = f"bank_{bank_id}.db"
@@ -495,7 +502,6 @@ class DigitalRublePlatform:
         if not banks:
             raise RuntimeError("Нет доступных финансовых организаций")
         
-        from database import DatabaseManager
         from pathlib import Path
         
         max_user_id = 0
@@ -609,7 +615,6 @@ class DigitalRublePlatform:
         return users
 
     def create_government_institutions(self, count: int) -> List[int]:
-        from database import DatabaseManager
         ids = self.create_users(count, "GOVERNMENT")
         for user_id in ids:
             user = self.get_user(user_id)
@@ -632,11 +637,18 @@ class DigitalRublePlatform:
         return ids
 
     def list_banks(self) -> List[Dict]:
+        cached = self._banks_cache
+        if cached is not None and time.monotonic() - cached[0] < BANKS_CACHE_TTL:
+            return [dict(bank) for bank in cached[1]]
         rows = self.db.execute("SELECT * FROM banks", fetchall=True)
-        return [dict(row) for row in rows] if rows else []
+        banks = [dict(row) for row in rows] if rows else []
+        self._banks_cache = (time.monotonic(), banks)
+        return [dict(bank) for bank in banks]
+
+    def _invalidate_banks_cache(self) -> None:
+        self._banks_cache = None
 
     def list_users(self, user_type: str | None = None) -> List[Dict]:
-        from database import DatabaseManager
         all_users = []
         banks = self.list_banks()
         
@@ -660,7 +672,6 @@ class DigitalRublePlatform:
         return all_users
 
     def get_user(self, user_id: int) -> Dict:
-        from database import DatabaseManager
         banks = self.list_banks()
         
         for bank in banks:
@@ -773,6 +784,23 @@ class DigitalRublePlatform:
         )
         return [dict(row) for row in rows] if rows else []
 
+    def search_activity_log(self, contexts: Optional[Tuple[str, ...]] = None, limit: int = 200) -> List[Dict]:
+        if not contexts:
+            return self.get_activity_log(limit=limit)
+        placeholders = ", ".join("?" for _ in contexts)
+        rows = self.db.execute(
+            f"""
+            SELECT actor, stage, details, context, created_at
+            FROM activity_log
+            WHERE context IN ({placeholders})
+            ORDER BY id ASC
+            LIMIT ?
+            """,
+            (*contexts, limit),
+            fetchall=True,
+        )
+        return [dict(row) for row in rows] if rows else []
+
     def get_failed_transactions(self) -> List[Dict]:
         try:
             rows = self.db.execute(
@@ -837,7 +865,6 @@ class DigitalRublePlatform:
             return False
 
     def open_digital_wallet(self, user_id: int, bank_id: Optional[int] = None) -> None:
-        from database import DatabaseManager
         from pathlib import Path
         
         def find_user_in_any_bank(user_id: int) -> Optional[Dict]:
@@ -935,7 +962,6 @@ class DigitalRublePlatform:
         )
 
     def exchange_to_digital(self, user_id: int, amount: float, bank_id: Optional[int] = None) -> None:
-        from database import DatabaseManager
         if amount <= 0:
             raise ValueError("Сумма должна быть положительной")
         
@@ -1012,7 +1038,6 @@ class DigitalRublePlatform:
             raise
 
     def open_offline_wallet(self, user_id: int) -> None:
-        from database import DatabaseManager
         user = self.get_user(user_id)
         if user["offline_status"] == "OPEN":
             return
@@ -1079,7 +1104,6 @@ class DigitalRublePlatform:
         if utxo_balance < amount:
             deficit = amount - utxo_balance
             
-            from database import DatabaseManager
             bank_db = DatabaseManager(f"bank_{user['bank_id']}.db")
             bank_db.execute(
                 "UPDATE users SET digital_balance = digital_balance - ? WHERE id = ?",
@@ -1125,7 +1149,6 @@ class DigitalRublePlatform:
             self._spend_utxos(user_id, amount, tx["id"])
             self._create_utxo(user_id, amount, tx["id"])
             
-            from database import DatabaseManager
             bank_db = DatabaseManager(f"bank_{user['bank_id']}.db")
             
             if utxo_balance >= amount:
@@ -1445,7 +1468,6 @@ class DigitalRublePlatform:
                     conflict=False,
                 )
                 
-                from database import DatabaseManager
                 
                 sender_wallet_id = sender.get("wallet_id")
                 
@@ -1579,7 +1601,6 @@ class DigitalRublePlatform:
             raise ValueError(error_msg)
         
         wallet_balance = float(wallet["balance"] if wallet["balance"] is not None else 0.0)
-        from database import DatabaseManager
         sender_bank_db = DatabaseManager(f"bank_{bank_id}.db")
         bank_balance_row = sender_bank_db.execute(
             "SELECT digital_balance FROM users WHERE id = ?",
@@ -1679,7 +1700,6 @@ class DigitalRublePlatform:
                             (context.amount, receiver_wallet_id),
                         )
                     
-                    from database import DatabaseManager
                     sender_bank_db = DatabaseManager(f"bank_{sender['bank_id']}.db")
                     sender_bank_balance_row = sender_bank_db.execute(
                         "SELECT digital_balance FROM users WHERE id = ?",
@@ -1725,7 +1745,6 @@ class DigitalRublePlatform:
             
             if self.tx_logger:
                 for bank in self.list_banks():
-                    from database import DatabaseManager
                     bank_db = DatabaseManager(f"bank_{bank['id']}.db")
                     tx_exists = bank_db.execute(
                         "SELECT id FROM transactions WHERE id = ?",
@@ -1842,7 +1861,6 @@ class DigitalRublePlatform:
     def _apply_balances(
         self, sender_id: int, receiver_id: int, amount: float, mode: str
     ) -> None:
-        from database import DatabaseManager
         sender = self.get_user(sender_id)
         receiver = self.get_user(receiver_id)
         sender_bank_db = DatabaseManager(f"bank_{sender['bank_id']}.db")
@@ -2102,7 +2120,6 @@ class DigitalRublePlatform:
         banks = self.list_banks()
         if not banks:
             return
-        from database import DatabaseManager
 
         tx_ids = [t["id"] for t in txs]
         full_txs = []
@@ -2221,7 +2238,6 @@ class DigitalRublePlatform:
                     pass
 
     def _replicate_full_ledger_to_bank(self, bank_db, blocks: List) -> None:
-        from database import DatabaseManager
         
         bank_db.execute("PRAGMA foreign_keys = OFF")
         try:
@@ -2351,6 +2367,7 @@ class DigitalRublePlatform:
                 "UPDATE banks SET digital_reserve = digital_reserve + ?, correspondent_balance = correspondent_balance - ? WHERE id = ?",
                 (req["amount"], req["amount"], req["bank_id"]),
             )
+            self._invalidate_banks_cache()
             self._log_activity(
                 actor="ЦБ РФ",
                 stage="Эмиссия подтверждена",